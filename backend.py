@@ -1,36 +1,15 @@
 
 import datetime as dt
+import os
 
 from flask import Flask, Blueprint,request, jsonify
 from flask_cors import CORS
 from utils.helpers import make_response
 from config import JWT_EXPIRE_MIN, db
-from routes.auth import auth_bp
-from routes.village import village_bp
-from routes.family import family_bp
-from routes.maati import maati_bp
-from routes.meeting import meeting_bp
-from routes.admin.community import building_bp
-from routes.document import s3_bp
-
-from routes.app.plotsVerification import plots_verification_BP
-from routes.app.plots import plots_BP
-
-from routes.app.optionStageVerification import option_verification_BP
-from routes.options import options_BP
-from routes.admin.villageStages import villageStages_BP
-from routes.admin.employee import emp_bp
-from routes.admin.admin import admin_BP
-
-from routes.admin.analytics import analytics_BP
-from routes.complaints import feedback_bp
-from routes.admin.material import materials_bp
-from routes.admin.facilities import facilities_bp
-from routes.app.facilityVerification import facility_verifications_bp
-from routes.app.materialUpdates import material_updates_bp
-from routes.admin.facilities import facilities_bp
-from routes.logs import logs_bp
-from routes.ai_agent import ai_bp
+from utils import resources
+from routes.registry import register_blueprints
+from utils.indexes import sync_indexes_in_background
+from utils.notifications import OUTBOX_WORKER, start_outbox_worker
 from datetime import datetime
 
 app = Flask(__name__)
@@ -42,7 +21,8 @@ CORS(app,
              "origins": [
                  "http://localhost:5173",
                  "https://villagerelocation-kkot.onrender.com"
-             ]
+             ],
+             "expose_headers": ["X-Next-Cursor", "X-Prev-Cursor", "ETag", "Server-Timing"]
          }
      })
 
@@ -55,29 +35,30 @@ stages = db.stages
 families = db.families
 core = db.core
 
-app.register_blueprint(auth_bp,url_prefix="/")
-app.register_blueprint(village_bp,url_prefix="/")
-app.register_blueprint(family_bp,url_prefix="/")
-app.register_blueprint(maati_bp,url_prefix="/")
-app.register_blueprint(meeting_bp,url_prefix="/")
-app.register_blueprint(building_bp,url_prefix="/")
-app.register_blueprint(plots_verification_BP,url_prefix="/")
-app.register_blueprint(plots_BP,url_prefix="/")
-
-app.register_blueprint(options_BP,url_prefix="/")
-app.register_blueprint(emp_bp,url_prefix="/")
-app.register_blueprint(villageStages_BP,url_prefix="/")
-app.register_blueprint(option_verification_BP,url_prefix="/")
-app.register_blueprint(analytics_BP,url_prefix="/")
-app.register_blueprint(s3_bp,url_prefix="/")
-app.register_blueprint(feedback_bp,url_prefix="/")
-app.register_blueprint(materials_bp,url_prefix="/")
-app.register_blueprint(material_updates_bp,url_prefix="/")
-app.register_blueprint(facility_verifications_bp,url_prefix="/")
-app.register_blueprint(facilities_bp,url_prefix="/")
-app.register_blueprint(admin_BP,url_prefix="/admin")
-app.register_blueprint(logs_bp,url_prefix="/")
-app.register_blueprint(ai_bp,url_prefix="/")
+register_blueprints(app)
+
+if os.getenv("SYNC_INDEXES_ON_STARTUP", "0") == "1":
+    sync_indexes_in_background(db)
+
+if OUTBOX_WORKER:
+    @app.before_request
+    def _ensure_outbox_worker():
+        # started from the first request so each (post-fork) worker process gets its own thread
+        start_outbox_worker()
+
+
+@app.route("/health", methods=["GET"])
+def health():
+    """
+    Mongo ping (always) plus S3 / Gemini checks with ?deep=1.
+    503 if any checked dependency is down.
+    """
+    deep = request.args.get("deep") == "1"
+    report = resources.check_health(["mongo"], create=True)
+    if deep:
+        report.update(resources.check_health(["s3", "genai"], create=True))
+    ok = all(r["ok"] for r in report.values())
+    return make_response(not ok, "ok" if ok else "degraded", result=report, status=200 if ok else 503)
 
 
 @app.route("/", methods=["GET"])
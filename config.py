@@ -3,6 +3,8 @@ import certifi
 from dotenv import load_dotenv
 from pymongo import MongoClient
 
+from utils import resources
+
 load_dotenv()
 
 MONGO_URI = os.getenv("MONGO_URI")
@@ -21,10 +23,81 @@ GEMINI_API=os.getenv("GEMINI_API")
 GEMINI_MODEL=os.getenv("GEMINI_MODEL")
 BUCKET_NAME = os.getenv("BUCKET_NAME")
 MAX_FILE_SIZE_MB = 1  # max allowed file size in MB
-client = MongoClient(
-    MONGO_URI,
-    tls=True,
-    tlsCAFile=certifi.where()
+# Direct-to-S3 uploads (POST /upload/presign): the file never passes through the worker
+UPLOAD_MAX_FILE_SIZE_MB = int(os.getenv("UPLOAD_MAX_FILE_SIZE_MB", "25"))
+UPLOAD_PRESIGN_EXPIRES = int(os.getenv("UPLOAD_PRESIGN_EXPIRES", "900"))  # seconds
+UPLOAD_PART_SIZE_MB = int(os.getenv("UPLOAD_PART_SIZE_MB", "8"))  # larger files upload in parts of this size
+S3_ENDPOINT_URL = os.getenv("S3_ENDPOINT_URL")  # e.g. a local MinIO for development
+
+# Connection pools. Clients are built lazily, once per process (utils/resources.py).
+MONGO_MAX_POOL_SIZE = int(os.getenv("MONGO_MAX_POOL_SIZE", "50"))
+MONGO_MIN_POOL_SIZE = int(os.getenv("MONGO_MIN_POOL_SIZE", "0"))
+MONGO_MAX_IDLE_TIME_MS = int(os.getenv("MONGO_MAX_IDLE_TIME_MS", "300000"))
+MONGO_CONNECT_TIMEOUT_MS = int(os.getenv("MONGO_CONNECT_TIMEOUT_MS", "10000"))
+MONGO_SERVER_SELECTION_TIMEOUT_MS = int(os.getenv("MONGO_SERVER_SELECTION_TIMEOUT_MS", "10000"))
+MONGO_SOCKET_TIMEOUT_MS = int(os.getenv("MONGO_SOCKET_TIMEOUT_MS", "30000"))
+S3_MAX_POOL_CONNECTIONS = int(os.getenv("S3_MAX_POOL_CONNECTIONS", "20"))
+S3_CONNECT_TIMEOUT = float(os.getenv("S3_CONNECT_TIMEOUT", "5"))
+S3_READ_TIMEOUT = float(os.getenv("S3_READ_TIMEOUT", "30"))
+
+
+def _make_mongo_client():
+    return MongoClient(
+        MONGO_URI,
+        tls=True,
+        tlsCAFile=certifi.where(),
+        maxPoolSize=MONGO_MAX_POOL_SIZE,
+        minPoolSize=MONGO_MIN_POOL_SIZE,
+        maxIdleTimeMS=MONGO_MAX_IDLE_TIME_MS,
+        connectTimeoutMS=MONGO_CONNECT_TIMEOUT_MS,
+        serverSelectionTimeoutMS=MONGO_SERVER_SELECTION_TIMEOUT_MS,
+        socketTimeoutMS=MONGO_SOCKET_TIMEOUT_MS,
+    )
+
+
+def _make_s3_client():
+    import boto3
+    from botocore.config import Config
+
+    return boto3.client(
+        "s3",
+        aws_access_key_id=AWS_ACCESS_KEY_ID,
+        aws_secret_access_key=AWS_SECRET_ACCESS_KEY,
+        region_name=AWS_DEFAULT_REGION,
+        endpoint_url=S3_ENDPOINT_URL or None,
+        config=Config(
+            max_pool_connections=S3_MAX_POOL_CONNECTIONS,
+            connect_timeout=S3_CONNECT_TIMEOUT,
+            read_timeout=S3_READ_TIMEOUT,
+            retries={"max_attempts": 3, "mode": "standard"},
+        ),
+    )
+
+
+def _make_genai_client():
+    from google import genai
+
+    return genai.Client(api_key=GEMINI_API)
+
+
+resources.register(
+    "mongo",
+    _make_mongo_client,
+    close=lambda c: c.close(),
+    health=lambda c: c.admin.command("ping"),
+)
+resources.register(
+    "s3",
+    _make_s3_client,
+    health=lambda c: c.head_bucket(Bucket=BUCKET_NAME),
+)
+resources.register(
+    "genai",
+    _make_genai_client,
+    health=lambda c: c.models.get(model=GEMINI_MODEL or "gemini-2.0-flash"),
 )
 
-db = client[DB_NAME]
+client = resources.LazyProxy("mongo")
+db = resources.LazyDatabase("mongo", DB_NAME)
+s3_client = resources.LazyProxy("s3")
+genai_client = resources.LazyProxy("genai")
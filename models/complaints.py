@@ -1,7 +1,7 @@
 from enum import Enum, IntEnum
 from pydantic import BaseModel, Field, HttpUrl, EmailStr, field_validator
 from typing import List, Optional
-from utils.helpers import s3_url_pattern
+from utils.helpers import validate_doc_urls
 
 
 class StatusHistory(BaseModel):
@@ -39,15 +39,7 @@ class FeedbackInsert(BaseModel):
     @field_validator("docs")
     @classmethod
     def validate_urls(cls, v: List[str]) -> List[str]:
-        if v is []:
-            return v
-        for url in v:
-            # Check for both http/https and s3 schemas
-            if not isinstance(url, str) or not (
-                url.startswith(("http://", "https://")) or s3_url_pattern.match(url)
-            ):
-                raise ValueError(f"Invalid URL: {url}")
-        return v    
+        return validate_doc_urls(v)
 
 class Feedback(FeedbackInsert):
     feedbackId:str
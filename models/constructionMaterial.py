@@ -1,7 +1,7 @@
 from pydantic import BaseModel, Field, HttpUrl, field_validator, model_validator, root_validator, validator
 from typing import List, Optional
 from models.stages import statusHistory
-from utils.helpers import s3_url_pattern
+from utils.helpers import validate_doc_urls
 
 class MaterialInsert(BaseModel):
     name:str
@@ -41,15 +41,7 @@ class MaterialUpdateInsert(BaseModel):
     @field_validator("docs")
     @classmethod
     def validate_urls(cls, v: List[str]) -> List[str]:
-        if v is []:
-            return v
-        for url in v:
-            # Check for both http/https and s3 schemas
-            if not isinstance(url, str) or not (
-                url.startswith(("http://", "https://")) or s3_url_pattern.match(url)
-            ):
-                raise ValueError(f"Invalid URL: {url}")
-        return v 
+        return validate_doc_urls(v)
 
 class MaterialUpdateUpdate(BaseModel):
     type:Optional[str] # (house or plot)
@@ -71,15 +63,7 @@ class MaterialUpdateUpdate(BaseModel):
     @field_validator("docs")
     @classmethod
     def validate_urls(cls, v: List[str]) -> List[str]:
-        if v is []:
-            return v
-        for url in v:
-            # Check for both http/https and s3 schemas
-            if not isinstance(url, str) or not (
-                url.startswith(("http://", "https://")) or s3_url_pattern.match(url)
-            ):
-                raise ValueError(f"Invalid URL: {url}")
-        return v 
+        return validate_doc_urls(v)
 
 class MaterialUpdates(MaterialUpdateInsert):
     updateId:str
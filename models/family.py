@@ -1,6 +1,6 @@
 from pydantic import BaseModel, Field, HttpUrl, field_validator, validator
 from typing import Optional, List
-from utils.helpers import s3_url_pattern
+from utils.helpers import validate_doc_urls
 
 from pydantic_core import ValidationError
 
@@ -21,15 +21,7 @@ class UpdatesInsert(BaseModel):
     @field_validator("docs")
     @classmethod
     def validate_urls(cls, v: List[str]) -> List[str]:
-        if v is []:
-            return v
-        for url in v:
-            # Check for both http/https and s3 schemas
-            if not isinstance(url, str) or not (
-                url.startswith(("http://", "https://")) or s3_url_pattern.match(url)
-            ):
-                raise ValueError(f"Invalid URL: {url}")
-        return v    
+        return validate_doc_urls(v)
 
 class UpdatesUpdate(BaseModel):
   #  currentStage:Optional[str]=None
@@ -42,15 +34,7 @@ class UpdatesUpdate(BaseModel):
     @field_validator("docs")
     @classmethod
     def validate_urls(cls, v: Optional[List[str]]) -> Optional[List[str]]:
-        if v is None:
-            return v
-        for url in v:
-            # Check for both http/https and s3 schemas
-            if not isinstance(url, str) or not (
-                url.startswith(("http://", "https://")) or s3_url_pattern.match(url)
-            ):
-                raise ValueError(f"Invalid URL: {url}")
-        return v
+        return validate_doc_urls(v)
 
 
 class Updates(UpdatesInsert):
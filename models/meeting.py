@@ -4,7 +4,7 @@ from typing import List, Optional
 from pydantic import BaseModel, field_validator
 from typing import List, Optional
 import re
-from utils.helpers import s3_url_pattern
+from utils.helpers import validate_doc_urls
 
 
 class MeetingInsert(BaseModel):
@@ -38,15 +38,7 @@ class MeetingInsert(BaseModel):
     @field_validator("photos", "docs")
     @classmethod
     def validate_urls(cls, v: Optional[List[str]]) -> Optional[List[str]]:
-        if v is None:
-            return v
-        for url in v:
-            # Check for both http/https and s3 schemas
-            if not isinstance(url, str) or not (
-                url.startswith(("http://", "https://")) or s3_url_pattern.match(url)
-            ):
-                raise ValueError(f"Invalid URL: {url}")
-        return v
+        return validate_doc_urls(v)
 
 
 class MeetingUpdate(BaseModel):
@@ -70,15 +62,7 @@ class MeetingUpdate(BaseModel):
     @field_validator("photos", "docs")
     @classmethod
     def validate_urls(cls, v: Optional[List[str]]) -> Optional[List[str]]:
-        if v is None:
-            return v
-        for url in v:
-            # Check for both http/https and s3 schemas
-            if not isinstance(url, str) or not (
-                url.startswith(("http://", "https://")) or s3_url_pattern.match(url)
-            ):
-                raise ValueError(f"Invalid URL: {url}")
-        return v
+        return validate_doc_urls(v)
 
 
 class Meeting(MeetingInsert):
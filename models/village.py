@@ -2,7 +2,7 @@ from pydantic import BaseModel, Field, HttpUrl, ValidationError, field_validator
 from typing import Literal, Optional, List
 
 
-from utils.helpers import s3_url_pattern
+from utils.helpers import validate_doc_urls
 
 
 # class StatusHistory(BaseModel):
@@ -21,15 +21,7 @@ class VillageUpdatesInsert(BaseModel):
     @field_validator("docs")
     @classmethod
     def validate_urls(cls, v: List[str]) -> List[str]:
-        if v is []:
-            return v
-        for url in v:
-            # Check for both http/https and s3 schemas
-            if not isinstance(url, str) or not (
-                url.startswith(("http://", "https://")) or s3_url_pattern.match(url)
-            ):
-                raise ValueError(f"Invalid URL: {url}")
-        return v   
+        return validate_doc_urls(v)
 
 class VillageUpdatesUpdate(BaseModel):
     # currentStage:Optional[str]=None
@@ -44,15 +36,7 @@ class VillageUpdatesUpdate(BaseModel):
     @field_validator("docs")
     @classmethod
     def validate_urls(cls, v: Optional[List[str]]) -> Optional[List[str]]:
-        if v is None:
-            return v
-        for url in v:
-            # Check for both http/https and s3 schemas
-            if not isinstance(url, str) or not (
-                url.startswith(("http://", "https://")) or s3_url_pattern.match(url)
-            ):
-                raise ValueError(f"Invalid URL: {url}")
-        return v
+        return validate_doc_urls(v)
 
 
 class VillageUpdates(VillageUpdatesInsert):
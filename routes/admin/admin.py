@@ -2,6 +2,8 @@ from flask import Blueprint, Config,request
 from models.maati import SystemType
 from utils.tokenAuth import auth_required
 from utils.helpers import authorizationDD, detect_system_from_ua, make_response, nowIST
+from utils.passwords import password_metrics
+from utils.responseCache import cached_response, invalidate_cache
 from config import  db
 
 admin=db.admin
@@ -40,21 +42,23 @@ def update_system_config(decoded_data):
         )
 
 
+        invalidate_cache("adminConfig")
         return make_response(False, "System config updated", result=system_cfg.dict(), status=200)
 
     except Exception as e:
         return make_response(True, str(e), status=500)
 
 
+def _requested_system():
+    # ?system=..., falling back to the User-Agent
+    return request.args.get("system") or detect_system_from_ua(request.headers.get("User-Agent", ""))
+
+
 @admin_BP.route("/config", methods=["GET"])
+@cached_response("adminConfig", vary=_requested_system, vary_header="User-Agent")
 def get_system_config():
     try:
-        system = request.args.get("system")
-
-        # Fallback to User-Agent
-        if not system:
-            ua = request.headers.get("User-Agent", "")
-            system = detect_system_from_ua(ua)
+        system = _requested_system()
 
         # ---- If system detected → return single config ----
         if system:
@@ -80,3 +84,13 @@ def get_system_config():
 
     except Exception as e:
         return make_response(True, str(e), status=500)
+
+
+@admin_BP.route("/metrics/passwords", methods=["GET"])
+@auth_required
+def get_password_metrics(decoded_data):
+    error = authorizationDD(decoded_data)
+    if error:
+        return make_response(True, error["message"], status=error["status"])
+
+    return make_response(False, "Password hashing metrics", result=password_metrics(), status=200)
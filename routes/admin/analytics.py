@@ -7,6 +7,8 @@ from pydantic import ValidationError
 from utils.tokenAuth import auth_required
 from models.village import FamilyCount
 from utils.helpers import authorizationDD, get_last_12_months_bounds, make_response
+from utils.activityRollup import ACTIVITY_MAX_MONTHS, activity_counts, is_valid_month, months_between
+from utils.villageStats import get_village_stats
 from config import  db
 
 from pymongo import errors  
@@ -22,6 +24,28 @@ logs = db.logs
 analytics_BP = Blueprint("analytics",__name__)
 
 
+@analytics_BP.route("/analytics/village/<villageId>/stats", methods=["GET"])
+@auth_required
+def get_village_dashboard_stats(decoded_data, villageId):
+    """
+    Everything the village dashboard shows, from the materialized
+    `village_stats` document (see utils/villageStats.py). ?refresh=1 rebuilds it.
+    """
+    try:
+        error = authorizationDD(decoded_data)
+        if error:
+            return make_response(True, message=error["message"], status=error["status"])
+
+        if not villages.find_one({"villageId": villageId}, {"_id": 1}):
+            return make_response(True, "Village not found", status=404)
+
+        stats = get_village_stats(villageId, refresh=request.args.get("refresh") == "1")
+        return make_response(False, "Village stats fetched", result=stats, status=200)
+
+    except Exception as e:
+        return make_response(True, f"Internal server error: {str(e)}", status=500)
+
+
 @analytics_BP.route("/analytics/options/<option_id>", methods=["GET"])
 @auth_required
 def get_option_analytics(decoded_data, option_id):
@@ -218,6 +242,23 @@ def get_family_count(village_id):
             "result": None
         }), 500
 
+def _requested_months(fromMonth, toMonth):
+    """
+    Months covered by fromMonth/toMonth, or the last 12 months when not given.
+    Raises ValueError for a malformed month or a span over ACTIVITY_MAX_MONTHS.
+    """
+    if fromMonth and toMonth:
+        if not is_valid_month(fromMonth) or not is_valid_month(toMonth):
+            raise ValueError("fromMonth/toMonth must be YYYY-MM")
+        months = months_between(fromMonth, toMonth)
+        if len(months) > ACTIVITY_MAX_MONTHS:
+            raise ValueError(f"fromMonth/toMonth may span at most {ACTIVITY_MAX_MONTHS} months")
+        return months
+
+    start, end = get_last_12_months_bounds()
+    return months_between(start[:7], end[:7])
+
+
 @analytics_BP.route("/analytics/activity/monthly", methods=["GET"]) #monthly activity sum count
 @auth_required
 def monthly_activity(decoded_data):
@@ -233,27 +274,18 @@ def monthly_activity(decoded_data):
     if userId:
         match["userId"] = userId
 
-    if fromMonth and toMonth:
-        match["updateTime"] = {
-            "$gte": f"{fromMonth}-01 00:00:00",
-            "$lte": f"{toMonth}-31 23:59:59"
-        }
-    else:
-        start, end = get_last_12_months_bounds()
-        match["updateTime"] = {"$gte": start, "$lte": end}
+    try:
+        months = _requested_months(fromMonth, toMonth)
+    except ValueError as e:
+        return make_response(True, str(e), status=400)
 
-    pipeline = [
-        {"$match": match},
-        {
-            "$group": {
-                "_id": {"$substr": ["$updateTime", 0, 7]},
-                "count": {"$sum": 1}
-            }
-        },
-        {"$sort": {"_id": 1}}
-    ]
+    rows = activity_counts(months, match, ("month",))
+    result = sorted(
+        ({"_id": r["_id"]["month"], "count": r["count"]} for r in rows),
+        key=lambda r: r["_id"]
+    )
 
-    return make_response(False, "Monthly activity", result=list(logs.aggregate(pipeline)))
+    return make_response(False, "Monthly activity", result=result)
 
 @analytics_BP.route("/analytics/activity/month-detail", methods=["GET"]) #month breakdown
 @auth_required
@@ -265,39 +297,22 @@ def month_detail(decoded_data):
 
     if not month or not (villageId or userId):
         return make_response(True, "month + villageId/userId required", status=400)
+    if not is_valid_month(month):
+        return make_response(True, "month must be YYYY-MM", status=400)
 
-    match = {
-        "updateTime": {
-            "$gte": f"{month}-01 00:00:00",
-            "$lte": f"{month}-31 23:59:59"
-        }
-    }
-
+    match = {}
     if villageId:
         match["villageId"] = villageId
     if userId:
         match["userId"] = userId
 
-    pipeline = [
-        {"$match": match},
-        {
-            "$group": {
-                "_id": {"type": "$type", "action": "$action"},
-                "count": {"$sum": 1}
-            }
-        },
-        {
-            "$project": {
-                "_id": 0,
-                "type": "$_id.type",
-                "action": "$_id.action",
-                "count": 1
-            }
-        },
-        {"$sort": {"count": -1}}
-    ]
+    rows = activity_counts([month], match, ("type", "action"))
+    result = sorted(
+        ({"type": r["_id"]["type"], "action": r["_id"]["action"], "count": r["count"]} for r in rows),
+        key=lambda r: -r["count"]
+    )
 
-    return make_response(False, "Month breakdown", result=list(logs.aggregate(pipeline)))
+    return make_response(False, "Month breakdown", result=result)
 
 @analytics_BP.route("/analytics/activity/action-trend", methods=["GET"]) #type -> actions breakdown
 @auth_required
@@ -320,30 +335,12 @@ def action_trend(decoded_data):
     if userId:
         match["userId"] = userId
 
-    if fromMonth and toMonth:
-        match["updateTime"] = {
-            "$gte": f"{fromMonth}-01 00:00:00",
-            "$lte": f"{toMonth}-31 23:59:59"
-        }
-    else:
-        start, end = get_last_12_months_bounds()
-        match["updateTime"] = {"$gte": start, "$lte": end}
-
-    pipeline = [
-        {"$match": match},
-        {
-            "$group": {
-                "_id": {
-                    "month": {"$substr": ["$updateTime", 0, 7]},
-                    "action": "$action"
-                },
-                "count": {"$sum": 1}
-            }
-        },
-        {"$sort": {"_id.month": 1}}
-    ]
+    try:
+        months = _requested_months(fromMonth, toMonth)
+    except ValueError as e:
+        return make_response(True, str(e), status=400)
 
-    raw = list(logs.aggregate(pipeline))
+    raw = sorted(activity_counts(months, match, ("month", "action")), key=lambda r: r["_id"]["month"])
 
     result = {}
     for r in raw:
@@ -7,6 +7,8 @@ from pydantic import ValidationError
 from models.stages import Building, BuildingInsert, BuildingStages, BuildingStagesInsert, BuildingStagesUpdate, BuildingUpdate
 from models.counters import get_next_building_type_id, get_next_stage_id
 from utils.helpers import make_response
+from utils.responseCache import cached_response, invalidate_cache
+from utils.stageGraph import invalidate_stage_graphs
 from config import  db
 
 from pymongo import errors  
@@ -68,6 +70,8 @@ def insert_building():
 
         buildings.insert_one(building_dict)
 
+        invalidate_cache("buildings")
+        invalidate_stage_graphs(buildings.name)
         return make_response(
             False,
             "Building inserted successfully",
@@ -102,6 +106,8 @@ def update_building(buildingId, villageId):
             return make_response(True, "No valid fields to update", status=400)
 
         buildings.update_one({"typeId": buildingId}, {"$set": update_dict})
+        invalidate_cache("buildings")
+        invalidate_stage_graphs(buildings.name)
         return make_response(False, "Building updated successfully", result=update_dict)
     except Exception as e:
         return make_response(True, f"Error updating building: {str(e)}", status=500)
@@ -116,11 +122,14 @@ def delete_building(buildingId, villageId):
         if result.matched_count == 0:
             return make_response(True, "Building not found", status=404)
 
+        invalidate_cache("buildings")
+        invalidate_stage_graphs(buildings.name)
         return make_response(False, "Building deleted successfully")
     except Exception as e:
         return make_response(True, f"Error deleting building: {str(e)}", status=500)
 
 @building_bp.route("/buildings/<villageId>", methods=["GET"])
+@cached_response("buildings")
 def get_buildings(villageId):
     try:
         type_id = request.args.get("typeId")
@@ -235,6 +244,8 @@ def insert_stage(buildingId, villageId):
             {"$set": {"stages": stages}}
         )
 
+        invalidate_cache("buildings")
+        invalidate_stage_graphs(buildings.name)
         return make_response(False, "Stage inserted successfully", result=stage_complete)
     except Exception as e:
         return make_response(True, f"Error inserting stage: {str(e)}", status=500)
@@ -272,6 +283,8 @@ def update_stage(buildingId, villageId, stageId):
             {"typeId": buildingId, "stages.stageId": stageId},
             {"$set": {f"stages.$.{k}": v for k, v in update_dict.items()}}
         )
+        invalidate_cache("buildings")
+        invalidate_stage_graphs(buildings.name)
         return make_response(False, "Stage updated successfully", result=update_dict)
     except Exception as e:
         return make_response(True, f"Error updating stage: {str(e)}", status=500)
@@ -286,6 +299,8 @@ def delete_stage(buildingId, villageId, stageId):
         if result.matched_count == 0:
             return make_response(True, "Stage not found", status=404)
 
+        invalidate_cache("buildings")
+        invalidate_stage_graphs(buildings.name)
         return make_response(False, "Stage deleted successfully")
     except Exception as e:
         return make_response(True, f"Error deleting stage: {str(e)}", status=500)
\ No newline at end of file
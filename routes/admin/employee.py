@@ -4,8 +4,9 @@ from flask_cors import CORS
 from pydantic import ValidationError
 from pymongo import  ASCENDING, DESCENDING, ReturnDocument,errors as mongo_errors
 from models.village import Logs
-from utils.tokenAuth import auth_required
+from utils.tokenAuth import auth_required, invalidate_user_status
 from utils.helpers import authorizationDD, hash_password, make_response, nowIST, validation_error_response
+from utils.validation import validate_batch
 from models.counters import get_next_user_id
 from models.emp import  UserInsert, UserUpdate, Users
 from config import JWT_EXPIRE_MIN, db
@@ -18,12 +19,16 @@ villages = db.villages
 logs = db.logs
 emp_bp = Blueprint("emp",__name__)
 
-def validate_village_ids(village_ids: list):
+def known_village_ids() -> set:
+    return set(v["villageId"] for v in villages.find({}, {"villageId": 1, "_id": 0}))
+
+def validate_village_ids(village_ids: list, valid_villages: set = None):
     if not village_ids:
         return True, []
     
-    # Fetch all valid village IDs from villages collection
-    valid_villages = set(v["villageId"] for v in villages.find({}, {"villageId": 1, "_id": 0}))
+    # Fetch all valid village IDs from villages collection (bulk callers pass them in)
+    if valid_villages is None:
+        valid_villages = known_village_ids()
     
     # Find invalid IDs
     invalid_ids = [vid for vid in village_ids if vid not in valid_villages]
@@ -117,18 +122,31 @@ def bulk_add_employees(decoded_data):
         
         inserted, skipped, errors_list = [], [], []
 
+        forbidden_fields = {"password"}
+        candidates = []
         for emp_payload in employees:
+            if isinstance(emp_payload, dict) and any(f in emp_payload for f in forbidden_fields):
+                errors_list.append({
+                    "employee_name": emp_payload.get("name"),
+                    "error": f"Fields {forbidden_fields} not allowed at insert"
+                })
+            else:
+                candidates.append(emp_payload)
+
+        # validate the whole batch in one call, then report failures per employee
+        valid, invalid = validate_batch(UserInsert, candidates)
+        for index, item_errors in invalid.items():
+            emp_payload = candidates[index]
+            errors_list.append({
+                "employee_name": emp_payload.get("name") if isinstance(emp_payload, dict) else None,
+                "error": [str(error) for error in item_errors]
+            })
+        valid_villages = known_village_ids() if valid else set()
+
+        for index, emp in valid.items():
+            emp_payload = candidates[index]
             try:
-                forbidden_fields = {"password"}
-                if any(f in emp_payload for f in forbidden_fields):
-                    errors_list.append({
-                        "employee_name": emp_payload.get("name"),
-                        "error": f"Fields {forbidden_fields} not allowed at insert"
-                    })
-                    continue
-
-                emp = UserInsert(**emp_payload)  # validate first
-                is_valid, invalid_ids = validate_village_ids(emp.villageID)
+                is_valid, invalid_ids = validate_village_ids(emp.villageID, valid_villages)
                 if not is_valid:
                     errors_list.append({
                         "employee_name": emp.name,
@@ -143,28 +161,19 @@ def bulk_add_employees(decoded_data):
                     skipped.append({"mobile": emp.mobile, "reason": "Mobile already exists"})
                     continue
 
-                emp_dict = emp.model_dump(exclude={"password","activated"})
                 userId = get_next_user_id(db)
 
-                comp_emp = Users(
-                    userId=userId,
-                    activated=True,
-                    verified=False,
-
-                    password="",
-                    #userCounters = {v: UserCounters().model_dump() for v in emp.villageID},
-                    **emp_dict
-                )
-
-                users.insert_one(comp_emp.model_dump(exclude_none=True))
-                inserted.append(comp_emp.name)
+                # the Users document, without validating emp again
+                comp_emp = {
+                    **emp.model_dump(exclude_none=True),
+                    "activated": True,
+                    "userId": userId,
+                    "password": "",
+                    "verified": False,
+                }
 
-            except ValidationError as ve:
-                error_messages = [str(error) for error in ve.errors()]
-                errors_list.append({
-                    "employee_name": emp_payload.get("name"),
-                    "error": error_messages
-                })
+                users.insert_one(comp_emp)
+                inserted.append(emp.name)
 
             except DuplicateKeyError as dk:
                 skipped.append({"email": emp_payload.get("email"), "reason": "Duplicate key error"})
@@ -238,6 +247,7 @@ def update_employee(decoded_data,emp_id):
 
         if not result:
             return make_response(True, "Employee not found", status=404)
+        invalidate_user_status(emp_id)
         log=Logs(
             userId=decoded_data.get("userId"),
             updateTime=nowIST(),
@@ -277,6 +287,7 @@ def activate_employee(decoded_data,emp_id):
 
         if not result:
             return make_response(True, "Employee not found or deleted", status=404)
+        invalidate_user_status(emp_id)
         log=Logs(
             userId=decoded_data.get("userId"),
             updateTime=nowIST(),
@@ -312,6 +323,7 @@ def deactivate_employee(decoded_data,emp_id):
 
         if not result:
             return make_response(True, "Employee not found or deleted", status=404)
+        invalidate_user_status(emp_id)
         log=Logs(
             userId=decoded_data.get("userId"),
             updateTime=nowIST(),
@@ -341,6 +353,7 @@ def delete_employee(decoded_data,emp_id):
         result = users.delete_one({"userId": emp_id})
         if result.deleted_count == 0:
             return make_response(True, "Employee not found", status=404)
+        invalidate_user_status(emp_id)
         log=Logs(
             userId=decoded_data.get("userId"),
             updateTime=nowIST(),
@@ -369,6 +382,7 @@ def delete_all_employees(decoded_data):
         if error:
             return make_response(True, message=error["message"], status=error["status"])
         result=users.delete_many({})
+        invalidate_user_status()
         log=Logs(
             userId=decoded_data.get("userId"),
             updateTime=nowIST(),
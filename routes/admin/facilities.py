@@ -4,6 +4,7 @@ from models.village import Logs
 from utils.tokenAuth import auth_required
 from models.facilities import Facility, FacilityInsert, FacilityUpdate
 from utils.helpers import authorizationDD, make_response, nowIST, validation_error_response
+from utils.responseCache import cached_response, invalidate_cache
 from config import db
 from models.constructionMaterial import MaterialInsert, MaterialUpdate, Material  # your Pydantic models
 from models.counters import get_next_facility_id, get_next_material_id
@@ -52,6 +53,7 @@ def insert_facility(decoded_data):
 
         # Insert into DB
         logs.insert_one(log.model_dump())
+        invalidate_cache("facilities")
         return make_response(
             False,
             "Facility inserted successfully",
@@ -99,6 +101,7 @@ def update_facility(decoded_data,facilityId):
 
         # Insert into DB
         logs.insert_one(log.model_dump())
+        invalidate_cache("facilities")
         return make_response(False, "Facility updated successfully", result=update_dict)
     except Exception as e:
         return make_response(True, f"Error updating facility: {str(e)}", status=500)
@@ -131,12 +134,14 @@ def delete_facility(decoded_data,facilityId):
 
         # Insert into DB
         logs.insert_one(log.model_dump())
+        invalidate_cache("facilities")
         return make_response(False, "Facility deleted successfully (soft delete)")
     except Exception as e:
         return make_response(True, f"Error deleting facility: {str(e)}", status=500)
 
 
 @facilities_bp.route("/facilities", methods=["GET"])
+@cached_response("facilities")
 def get_facilities():
     try:
         docs = list(facilities.find({"deleted": False}, {"_id": 0}))
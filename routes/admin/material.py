@@ -3,6 +3,7 @@ from pydantic import ValidationError
 from models.village import Logs
 from utils.tokenAuth import auth_required
 from utils.helpers import authorizationDD, make_response, nowIST, validation_error_response
+from utils.responseCache import cached_response, invalidate_cache
 from config import db
 from models.constructionMaterial import MaterialInsert, MaterialUpdate, Material  # your Pydantic models
 from models.counters import get_next_material_id
@@ -49,6 +50,7 @@ def insert_material(decoded_data):
 
         # Insert into DB
         logs.insert_one(log.model_dump())
+        invalidate_cache("materials")
         return make_response(False, "Material inserted successfully", result=material_complete.model_dump(exclude_none=True), status=200)
     except Exception as e:
         return make_response(True, f"Error inserting material: {str(e)}", status=500)
@@ -91,6 +93,7 @@ def update_material(decoded_data,materialId):
 
         # Insert into DB
         logs.insert_one(log.model_dump())
+        invalidate_cache("materials")
         return make_response(False, "Material updated successfully", result=update_dict)
     except Exception as e:
         return make_response(True, f"Error updating material: {str(e)}", status=500)
@@ -122,6 +125,7 @@ def delete_material(decoded_data,materialId):
 
         # Insert into DB
         logs.insert_one(log.model_dump())
+        invalidate_cache("materials")
         return make_response(False, "Material deleted successfully")
     except Exception as e:
         return make_response(True, f"Error deleting material: {str(e)}", status=500)
@@ -129,6 +133,7 @@ def delete_material(decoded_data,materialId):
 
 # ================= GET MATERIALS =================
 @materials_bp.route("/materials", methods=["GET"])
+@cached_response("materials")
 def get_materials():
     try:
         docs = list(materials.find({}, {"_id": 0}))
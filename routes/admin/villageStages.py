@@ -7,11 +7,16 @@ from pydantic import ValidationError
 from models.village import StageInsert,Stages,SubStage,SubStageInsert,SubStageUpdate,StageUpdate, VillageUpdates, VillageUpdatesInsert, VillageUpdatesUpdate
 from models.counters import get_next_villageStage_id, get_next_villageStageUpdate_id, get_next_villageSubStage_id
 from utils.helpers import make_response, validation_error_response
+from utils.pagination import paginate
+from utils.counts import count_for, invalidate_counts
+from utils.responseCache import cached_response, invalidate_cache
+from utils.stageGraph import invalidate_stage_graphs, village_substages
 from config import  db
 
-from pymongo import errors  
+from pymongo import DESCENDING, errors
 buildings = db.buildings
 villages = db.villages
+village_updates = db.villageUpdates
 plots = db.plots
 families = db.testing
 #stages = db.stages
@@ -80,6 +85,8 @@ def insert_stage():
 
         stages.insert_one(option_dict)
 
+        invalidate_cache("stages")
+        invalidate_stage_graphs(stages.name)
         return make_response(
             False,
             "Stage inserted successfully",
@@ -136,6 +143,8 @@ def update_Stage(stageId):
             )
         stages.update_one({"stageId": str(stageId)}, {"$set": update_dict})
 
+        invalidate_cache("stages")
+        invalidate_stage_graphs(stages.name)
         return make_response(False, "Stage updated successfully", result=update_dict)
 
     except Exception as e:
@@ -163,6 +172,8 @@ def delete_Stage(stageId):
             {"$inc": {"position": -1}}
         )
 
+        invalidate_cache("stages")
+        invalidate_stage_graphs(stages.name)
         return make_response(False, "Stage deleted successfully")
 
     except Exception as e:
@@ -170,6 +181,7 @@ def delete_Stage(stageId):
 
 
 @villageStages_BP.route("/stages", methods=["GET"])
+@cached_response("stages")
 def get_Stages():
     try:
         docs = list(stages.find({"deleted": False}, {"_id": 0}).sort("position", 1))
@@ -259,6 +271,8 @@ def insert_substage(stageId):
             {"$set": {"stages": stages_}}
         )
 
+        invalidate_cache("stages")
+        invalidate_stage_graphs(stages.name)
         return make_response(False, "Sub stage inserted successfully", result=stage_complete)
     except Exception as e:
         return make_response(True, f"Error inserting sub stage: {str(e)}", status=500)
@@ -316,6 +330,8 @@ def update_substage(stageId, subStageId):
                 {"$set": {"stages": stages_}}
             )
 
+        invalidate_cache("stages")
+        invalidate_stage_graphs(stages.name)
         return make_response(False, "Sub stage updated successfully", result={**update_dict, **({"position": payload.get("position")} if "position" in payload else {})})
 
     except Exception as e:
@@ -331,6 +347,8 @@ def delete_sub_stage(stageId, subStageId):
         if result.matched_count == 0:
             return make_response(True, "Stage not found", status=404)
 
+        invalidate_cache("stages")
+        invalidate_stage_graphs(stages.name)
         return make_response(False, "sub stage deleted successfully")
     except Exception as e:
         return make_response(True, f"Error deleting sub stage: {str(e)}", status=500)
@@ -344,18 +362,16 @@ def insert_village_update(villageId):
         data = VillageUpdatesInsert(**payload)
 
         # -------- Fetch village --------
-        village = villages.find_one({"villageId": villageId}, {"_id": 0})
+        village = villages.find_one({"villageId": villageId}, {"_id": 0, "completed_substages": 1})
         if not village:
             return make_response(True, f"Village {villageId} not found", status=404)
 
-        # -------- Validate Stage --------
-        stage_doc = stages.find_one({"stageId": data.currentStage,"deleted":False}, {"_id": 0})
-        if not stage_doc:
+        # -------- Validate Stage / SubStage --------
+        graph = village_substages(stages)
+        sub_stage_ids = graph.groups.get(data.currentStage)
+        if sub_stage_ids is None:
             return make_response(True, f"Stage {data.currentStage} not found", status=400)
 
-        # -------- Extract subStageIds for current stage --------
-        sub_stage_ids = [s.get("subStageId") for s in stage_doc.get("stages", []) if not s.get("deleted", False)]
-
         if data.currentSubStage not in sub_stage_ids:
             return make_response(
                 True,
@@ -363,37 +379,26 @@ def insert_village_update(villageId):
                 status=400
             )
 
-        # -------- Flatten All SubStages across all stages --------
-        all_stages = list(stages.find({"deleted":False}, {"_id": 0, "stageId": 1, "stages.subStageId": 1, "stages.deleted": 1}))
-        flattened = [
-            sub.get("subStageId")
-            for st in all_stages
-            for sub in st.get("stages", [])
-            if not sub.get("deleted", False)
-        ]
-
-        if data.currentSubStage not in flattened:
-            return make_response(True, f"Invalid SubStage {data.currentSubStage}", status=400)
-
         # -------- Pre-requisite check --------
-        idx = flattened.index(data.currentSubStage)
-        prereqs = flattened[:idx]
-
-        completed = set(village.get("completed_substages", []))
-        missing = [p for p in prereqs if p not in completed]
+        missing = graph.missing(data.currentSubStage, village.get("completed_substages", []))
         if missing:
             return make_response(True, f"Missing prerequisite SubStages: {missing}", status=400)
 
         # -------- Create Update Record --------
         new_update_id = get_next_villageStageUpdate_id(db, villageId=villageId)
+        now = datetime.utcnow().isoformat()
         update_obj = VillageUpdates(
             **data.dict(),
             updateId=new_update_id,
             verifiedBy="system",   # later replace with auth user
-            verifiedAt=datetime.utcnow().isoformat()
+            verifiedAt=now,
+            insertedAt=now,
         ).dict()
 
-        # -------- Update Village --------
+        # -------- Store Update, then move the Village forward --------
+        village_updates.insert_one({**update_obj, "villageId": villageId, "deleted": False})
+        invalidate_counts(village_updates.name)
+
         villages.update_one(
             {"villageId": villageId},
             {
@@ -402,10 +407,10 @@ def insert_village_update(villageId):
                     "currentSubStage": data.currentSubStage,
                 },
                 "$addToSet": {"completed_substages": data.currentSubStage},
-                "$push": {"updates": update_obj},
             },
         )
 
+        invalidate_cache("villages")
         return make_response(False, "Village update inserted successfully", status=201)
 
     except ValidationError as ve:
@@ -430,32 +435,34 @@ def update_village_update(villageId, updateId):
         # if update_obj.currentStage or update_obj.currentSubStage:
         #     return make_response(True, "Updating stage/subStage not allowed", status=400)
 
-        # Fetch village and target update
-        village = villages.find_one({"villageId": villageId})
-        if not village:
-            return make_response(True, "Village not found", status=404)
-
-        update_item = next((u for u in village.get("updates", []) if u["updateId"] == updateId), None)
-        if not update_item:
-            return make_response(True, "Update not found", status=404)
-        if update_item.get("deleted", False):
-            return make_response(True, "Cannot update deleted update", status=400)
-
         # Build update dict
         now = datetime.utcnow().isoformat()
         update_dict = update_obj.model_dump(exclude_none=True)
         update_dict.update({"verifiedAt": now, "verifiedBy": userId})
 
-        villages.update_one(
-            {"villageId": villageId, "updates.updateId": updateId},
-            {"$set": {f"updates.$.{k}": v for k, v in update_dict.items()}},
+        result = village_updates.update_one(
+            {"villageId": villageId, "updateId": updateId, "deleted": False},
+            {"$set": update_dict},
         )
+        if result.matched_count == 0:
+            return _missing_update_response(villageId, updateId, "Cannot update deleted update")
 
+        invalidate_cache("villages")
         return make_response(False, "Village update modified successfully", result=update_dict)
     except Exception as e:
         return make_response(True, f"Error updating village update: {str(e)}", status=500)
 
 
+def _missing_update_response(villageId, updateId, deleted_message):
+    """404/400 for an update that could not be changed: unknown village, unknown update, or already deleted."""
+    existing = village_updates.find_one({"villageId": villageId, "updateId": updateId}, {"_id": 0, "deleted": 1})
+    if existing:
+        return make_response(True, deleted_message, status=400)
+    if not villages.find_one({"villageId": villageId}, {"_id": 1}):
+        return make_response(True, "Village not found", status=404)
+    return make_response(True, "Update not found", status=404)
+
+
 @villageStages_BP.route("/village_updates/<villageId>/<updateId>", methods=["DELETE"])
 def delete_village_update(villageId, updateId):
     try:
@@ -465,62 +472,41 @@ def delete_village_update(villageId, updateId):
         if not userId:
             return make_response(True, "Missing userId in request body", status=400)
 
-        village = villages.find_one({"villageId": villageId})
-        if not village:
-            return make_response(True, "Village not found", status=404)
-
-        update_item = next(
-            (u for u in village.get("updates", []) if u["updateId"] == updateId and not u.get("deleted", False)),
-            None
+        update_item = village_updates.find_one_and_update(
+            {"villageId": villageId, "updateId": updateId, "deleted": False},
+            {"$set": {"deleted": True}},
+            projection={"_id": 0, "currentStage": 1, "currentSubStage": 1},
         )
         if not update_item:
-            return make_response(True, "Update not found", status=404)
+            return _missing_update_response(villageId, updateId, "Update not found")
+        invalidate_counts(village_updates.name)
+
+        village_ops = {}
 
-        # Check if this is the only non-deleted update for that stage/substage
+        # Was this the only non-deleted update for that stage/substage?
         stage = update_item["currentStage"]
         substage = update_item["currentSubStage"]
-
-        non_deleted_count = sum(
-            1 for u in village.get("updates", [])
-            if u.get("currentStage") == stage and u.get("currentSubStage") == substage and not u.get("deleted", False)
+        others = village_updates.count_documents(
+            {"villageId": villageId, "currentStage": stage, "currentSubStage": substage, "deleted": False},
+            limit=1,
         )
-
-        update_ops = {"$set": {"updates.$.deleted": True}}
-
-        if non_deleted_count == 1:
+        if not others:
             # Remove substage from completed_substages
-            update_ops["$pull"] = {"completed_substages": substage}
+            village_ops["$pull"] = {"completed_substages": substage}
 
-        # Apply deletion update
-        villages.update_one(
-            {"villageId": villageId, "updates.updateId": updateId},
-            update_ops
+        # Now recalculate currentStage/currentSubStage from the latest remaining update
+        latest_update = village_updates.find_one(
+            {"villageId": villageId, "deleted": False},
+            {"_id": 0, "currentStage": 1, "currentSubStage": 1},
+            sort=[("verifiedAt", DESCENDING)],
         )
+        village_ops["$set"] = {
+            "currentStage": latest_update["currentStage"] if latest_update else None,
+            "currentSubStage": latest_update["currentSubStage"] if latest_update else None,
+        }
+        villages.update_one({"villageId": villageId}, village_ops)
 
-        # Now recalculate currentStage/currentSubStage
-        remaining_updates = [
-            u for u in village.get("updates", []) if not u.get("deleted", False) and u["updateId"] != updateId
-        ]
-
-        if remaining_updates:
-            # Take latest by verifiedAt (or fall back to order)
-            latest_update = sorted(
-                remaining_updates, key=lambda x: x.get("verifiedAt", ""), reverse=True
-            )[0]
-            villages.update_one(
-                {"villageId": villageId},
-                {"$set": {
-                    "currentStage": latest_update["currentStage"],
-                    "currentSubStage": latest_update["currentSubStage"]
-                }}
-            )
-        else:
-            # Reset stage/substage if no updates left
-            villages.update_one(
-                {"villageId": villageId},
-                {"$set": {"currentStage": None, "currentSubStage": None}}
-            )
-
+        invalidate_cache("villages")
         return make_response(False, "Village update deleted successfully")
 
     except Exception as e:
@@ -531,26 +517,35 @@ def delete_village_update(villageId, updateId):
 @villageStages_BP.route("/village_updates/<villageId>", methods=["GET"])
 def get_village_updates(villageId):
     try:
-        # --------- Fetch Village ---------
-        village = villages.find_one({"villageId": villageId}, {"_id": 0})
-        if not village:
-            return make_response(True, "Village not found",result={"count": 0, "items": []}, status=404)
-
         # --------- Filter by Deleted Flag ---------
         flag = request.args.get("deleted", "false").lower()  # default = false
         if flag not in ["true", "false"]:
             return make_response(True, "Invalid 'deleted' flag. Use true or false.",result={"count": 0, "items": []}, status=400)
 
-        deleted = flag == "true"
-        updates = [u for u in village.get("updates", []) if u.get("deleted", False) == deleted]
-
-        if not updates:
+        query = {"villageId": villageId, "deleted": flag == "true"}
+        try:
+            items, page_info = paginate(village_updates, query, {"_id": 0}, [("insertedAt", DESCENDING)], request.args)
+            total = count_for(village_updates, query, request.args)
+        except ValueError as ve:
+            return make_response(True, str(ve), result={"count": 0, "items": []}, status=400)
+
+        if not items:
+            if not villages.find_one({"villageId": villageId}, {"_id": 1}):
+                return make_response(True, "Village not found",result={"count": 0, "items": []}, status=404)
             return make_response(True, "No updates found", result={"count": 0, "items": []},status=404)
 
         return make_response(
             False,
             "Village updates fetched successfully",
-            result={"count": len(updates), "items": updates},
+            result={
+                "count": total["count"],
+                "countIsLowerBound": total["countIsLowerBound"],
+                "page": page_info["page"],
+                "limit": page_info["limit"],
+                "next": page_info["next"],
+                "prev": page_info["prev"],
+                "items": items,
+            },
         )
 
     except Exception as e:
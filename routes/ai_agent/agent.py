@@ -1,13 +1,13 @@
 """Single-agent executor for the Village Relocation Management System AI."""
 
-from google.genai import types
-
 from .prompt_agent import AGENT_PROMPT
 from .protocol import EnvelopeError, parse_agent_envelope
 
 
 def call_agent(client, model: str, contents: list) -> tuple[dict, str]:
     """Call Gemini with the single-agent prompt and return parsed output."""
+    from google.genai import types  # heavy; loaded on first AI request
+
     response = client.models.generate_content(
         model=model,
         contents=contents,
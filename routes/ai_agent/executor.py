@@ -12,7 +12,6 @@ from typing import Any
 
 from bson import ObjectId
 from bson.decimal128 import Decimal128
-from google.genai import types
 
 from config import db
 
@@ -130,6 +129,8 @@ def _run_query_batch(queries: list) -> list[dict]:
 
 def _to_contents(history_messages: list, user_prompt: str) -> list:
     """Convert clean DB history + the new user prompt into Gemini Content list."""
+    from google.genai import types  # heavy; loaded on first AI request
+
     contents = [_message_to_content(m) for m in history_messages]
     contents.append(
         types.Content(role="user", parts=[types.Part(text=user_prompt)])
@@ -157,6 +158,8 @@ def run_conversation(
                         caller (assistantText, sessionId, sessionTitle).
         trace         — list of query trace entries.
     """
+    from google.genai import types
+
     contents = _to_contents(history_messages, user_prompt)
     trace: list = []
 
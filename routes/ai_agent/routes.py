@@ -4,9 +4,7 @@ import random
 import time
 
 from flask import Blueprint, request, jsonify, abort
-from google import genai
-
-from config import GEMINI_API, GEMINI_MODEL, db
+from config import GEMINI_API, GEMINI_MODEL, db, genai_client
 from utils.helpers import make_response
 from utils.tokenAuth import auth_required
 
@@ -93,7 +91,7 @@ def ai_chat(claims):
         }), 503
 
     try:
-        client = genai.Client(api_key=GEMINI_API)
+        client = genai_client
         model_name = GEMINI_MODEL or "gemini-2.0-flash"
 
         if not chat_id:
@@ -1,7 +1,6 @@
 import datetime as dt
 
 from bson import ObjectId
-from google.genai import types
 
 from config import db
 
@@ -33,6 +32,8 @@ def _normalize_chat_messages(messages):
 
 
 def _message_to_content(message):
+    from google.genai import types  # heavy; loaded on first AI request
+
     role = message["role"]
     if role == "assistant":
         role = "model"
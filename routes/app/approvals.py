@@ -0,0 +1,112 @@
+import os
+
+from flask import Blueprint, request
+from pymongo import errors
+
+from utils.tokenAuth import auth_required
+from utils.helpers import STATUS_TRANSITIONS, authorization, make_response
+from utils.approvals import apply_batch
+from utils.signedUrls import embed_signed_urls
+from utils.workQueue import approver_villages, parse_kinds, pending_counts, pending_items
+
+APPROVAL_BATCH_LIMIT = int(os.getenv("APPROVAL_BATCH_LIMIT", "500"))
+
+approvals_bp = Blueprint("approvals", __name__)
+
+
+# ================= WORK QUEUE =================
+@approvals_bp.route("/approvals/queue", methods=["GET"])
+@auth_required
+def work_queue(decoded_data):
+    """
+    Records waiting for the caller's role in the caller's villages, newest first,
+    across families, materials, facilities and plots.
+    Query: kind=family,material,... villageId=<one of mine> limit, cursor | page, count.
+    """
+    try:
+        error = authorization(decoded_data)
+        if error:
+            return make_response(True, message=error["message"], status=error["status"])
+
+        user_role = decoded_data.get("role")
+        if user_role not in STATUS_TRANSITIONS:
+            return make_response(True, f"Unauthorized: {user_role} has no approval queue", status=403)
+
+        args = request.args
+        village_ids = approver_villages(decoded_data.get("userId"))
+        villageId = args.get("villageId")
+        if villageId:
+            if villageId not in village_ids:
+                return make_response(True, "Unauthorized access", status=403)
+            village_ids = [villageId]
+
+        try:
+            kinds = parse_kinds(args.get("kind"))
+            items, page_info = pending_items(user_role, village_ids, args, kinds)
+            counts = pending_counts(user_role, village_ids, args, kinds)
+            embed_signed_urls(items, args)
+        except ValueError as ve:
+            return make_response(True, str(ve), result={"count": 0, "items": []}, status=400)
+
+        known = [c["count"] for c in counts.values() if c["count"] is not None]
+        return make_response(
+            False,
+            "Pending items fetched successfully",
+            result={
+                "count": sum(known) if len(known) == len(counts) else None,
+                "countIsLowerBound": any(c["countIsLowerBound"] for c in counts.values()),
+                "counts": {kind: c["count"] for kind, c in counts.items()},
+                "page": page_info["page"],
+                "limit": page_info["limit"],
+                "next": page_info["next"],
+                "prev": page_info["prev"],
+                "items": items,
+            },
+        )
+
+    except errors.PyMongoError as e:
+        return make_response(True, f"Database error: {str(e)}", status=500)
+    except Exception as e:
+        return make_response(True, f"Error fetching work queue: {str(e)}", status=500)
+
+
+# ================= BATCH APPROVE / SEND BACK =================
+@approvals_bp.route("/approvals/batch", methods=["POST"])
+@auth_required
+def batch_approve(decoded_data):
+    """
+    Body: {"userId", "items": [{"kind": "family" | "material" | "facility" | "plot",
+    <id fields of that kind's /verify endpoint>, "status": 1 | -1, "comments"}]}.
+    Items are applied independently; result.items has one entry per item.
+    """
+    try:
+        payload = request.get_json(force=True) or {}
+        userId = payload.get("userId")
+        items = payload.get("items")
+
+        if not userId or not isinstance(items, list) or not items:
+            return make_response(True, "Missing userId or items", status=400)
+        if len(items) > APPROVAL_BATCH_LIMIT:
+            return make_response(True, f"At most {APPROVAL_BATCH_LIMIT} items per batch", status=400)
+
+        error = authorization(decoded_data, userId)
+        if error:
+            return make_response(True, message=error["message"], status=error["status"])
+
+        user_role = decoded_data.get("role")
+        if user_role not in STATUS_TRANSITIONS:
+            return make_response(True, f"Unauthorized: {user_role} cannot verify", status=403)
+
+        results = apply_batch(items, userId, user_role)
+        applied = sum(1 for r in results if r["ok"])
+        return make_response(
+            applied == 0,
+            f"{applied} of {len(results)} items updated",
+            result={"applied": applied, "failed": len(results) - applied, "items": results},
+            status=200,
+        )
+
+    except errors.PyMongoError as e:
+        return make_response(True, f"Database error: {str(e)}", status=500)
+    except Exception as e:
+        return make_response(True, f"Error applying batch: {str(e)}", status=500)
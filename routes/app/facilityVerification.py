@@ -9,6 +9,12 @@ from utils.tokenAuth import auth_required
 from models.stages import statusHistory
 from config import db
 from utils.helpers import STATUS_TRANSITIONS, authorization, make_response, nowIST, validation_error_response
+from utils.pagination import paginate
+from utils.counts import count_for, invalidate_counts
+from utils.approvals import TransitionError, transition_one
+from utils.villageStats import mark_village_stats_stale
+from utils.search import HIDE_SEARCH_KEYS, search_filter, set_search_keys, with_search_keys
+from utils.signedUrls import embed_signed_urls
 from models.counters import get_next_facilityVerification_id, get_next_material_id, get_next_materialUpdate_id
 from datetime import datetime
 
@@ -72,7 +78,8 @@ def insert_facility_verification(decoded_data):
             statusHistory=[history.model_dump()]
         )
 
-        facility_updates.insert_one(verification_doc.model_dump(exclude_none=True))
+        facility_updates.insert_one(with_search_keys(verification_doc.model_dump(exclude_none=True), "name"))
+        invalidate_counts(facility_updates.name)
         log=Logs(
             userId=userId,
             updateTime=nowIST(),
@@ -85,6 +92,7 @@ def insert_facility_verification(decoded_data):
 
         # Insert into DB
         logs.insert_one(log.model_dump())
+        mark_village_stats_stale(villageId)
         return make_response(False, "Facility verification inserted successfully", result=verification_doc.model_dump(exclude_none=True))
 
     except Exception as e:
@@ -130,8 +138,9 @@ def update_facility_verification(decoded_data, verificationId):
 
         facility_updates.update_one(
             {"verificationId": verificationId},
-            {"$set": update_dict, "$push": {"statusHistory": history.model_dump(exclude_none=True)}}
+            {"$set": set_search_keys(update_dict, "name"), "$push": {"statusHistory": history.model_dump(exclude_none=True)}}
         )
+        invalidate_counts(facility_updates.name)
         log=Logs(
             userId=userId,
             updateTime=nowIST(),
@@ -144,6 +153,7 @@ def update_facility_verification(decoded_data, verificationId):
 
         # Insert into DB
         logs.insert_one(log.model_dump())
+        mark_village_stats_stale(villageId)
         return make_response(False, "Facility verification updated successfully", result=update_dict)
 
     except Exception as e:
@@ -172,6 +182,7 @@ def delete_facility_verification(decoded_data, verificationId):
 
         # Hard delete
         facility_updates.delete_one({"verificationId": verificationId})
+        invalidate_counts(facility_updates.name)
         log=Logs(
             userId=userId,
             updateTime=nowIST(),
@@ -184,6 +195,7 @@ def delete_facility_verification(decoded_data, verificationId):
 
         # Insert into DB
         logs.insert_one(log.model_dump())
+        mark_village_stats_stale(villageId)
         return make_response(False, "Facility verification deleted successfully")
 
     except Exception as e:
@@ -194,7 +206,7 @@ def delete_facility_verification(decoded_data, verificationId):
 @auth_required
 def get_facility_verification(decoded_data,verificationId):
     try:
-        doc = facility_updates.find_one({"verificationId":verificationId}, {"_id": 0})
+        doc = facility_updates.find_one({"verificationId":verificationId}, {"_id": 0, **HIDE_SEARCH_KEYS})
         if not doc:
             return make_response(True, "No facility verification found", status=404)
         return make_response(False, "Facility verification fetched successfully", result=doc)
@@ -213,8 +225,6 @@ def get_facility_verifications_all(decoded_data,villageId,facilityId):
         user_role = decoded_data.get("role")  # Optional user role/status
         from_date = args.get("fromDate")
         to_date = args.get("toDate")
-        page = int(args.get("page", 1))
-        limit = int(args.get("limit", 15))
         # --- Build MongoDB filter query dynamically ---
         query = {"facilityId": facilityId,"villageId":villageId}
 
@@ -223,7 +233,7 @@ def get_facility_verifications_all(decoded_data,villageId,facilityId):
         elif user_role in STATUS_TRANSITIONS:
             query["status"] = STATUS_TRANSITIONS[user_role]
         if name:
-            query["name"] = {"$regex": name, "$options": "i"}
+            query.update(search_filter("name", name, args.get("match")))
         # --- Date Range Filtering ---
         if from_date or to_date:
             date_filter = {}
@@ -234,20 +244,15 @@ def get_facility_verifications_all(decoded_data,villageId,facilityId):
             query["insertedAt"] = date_filter
 
         # --- Projection (exclude heavy fields) ---
-        projection = {"_id": 0, "statusHistory": 0}
+        projection = {"_id": 0, **HIDE_SEARCH_KEYS, "statusHistory": 0}
 
         # --- Sorting & Pagination ---
-        skip = (page - 1) * limit
-
-        cursor = (
-            facility_updates.find(query, projection)
-            .sort("insertedAt", -1)  # latest first
-            .skip(skip)
-            .limit(limit)
-        )
-
-        verifications = list(cursor)
-        total_count = facility_updates.count_documents(query)
+        try:
+            verifications, page_info = paginate(facility_updates, query, projection, [("insertedAt", -1)], args)
+            total = count_for(facility_updates, query, args)
+            embed_signed_urls(verifications, args)
+        except ValueError as ve:
+            return make_response(True, str(ve), result={"count": 0, "items": []}, status=400)
 
         if not verifications:
             return make_response(
@@ -261,9 +266,12 @@ def get_facility_verifications_all(decoded_data,villageId,facilityId):
             False,
             "Verifications fetched successfully",
             result={
-                "count": total_count,
-                "page": page,
-                "limit": limit,
+                "count": total["count"],
+                "countIsLowerBound": total["countIsLowerBound"],
+                "page": page_info["page"],
+                "limit": page_info["limit"],
+                "next": page_info["next"],
+                "prev": page_info["prev"],
                 "items": verifications,
             },
         )
@@ -304,42 +312,12 @@ def verify_verification(decoded_data):
             return make_response(True, message=error["message"], status=error["status"])
         user_role = decoded_data.get("role")
 
-        update = facility_updates.find_one({"facilityId":facilityId,"verificationId":verificationId}, {"_id": 0})
-
-        if not update:
-            return make_response(True, "Update not found", status=404)
-        previous_status = update.get("status", 1) 
-        villageId=update.get("villageId")
-
-        
-        required_status = STATUS_TRANSITIONS.get(user_role)
-        if not required_status or previous_status != required_status:
-            return make_response(True, f"Unauthorized: {user_role} cannot verify status {previous_status}", status=403)
-
-
-        # Update status
-        now = nowIST()
-        final_status = min(max(previous_status + status, 1), 4)
-        new_history=StatusHistory(
-            status=1,
-            comments=comments,
-            verifier=userId,
-            time=str(now)
-        )
-
-
-        facility_updates.update_one(
-            {"verificationId": verificationId, "facilityId": facilityId},
-            {
-                "$set": {
-                    "status": final_status,
-                    "verifiedBy": userId,
-                    "verifiedAt": now,
-                },
-                "$push": {"statusHistory": new_history.model_dump(exclude_none=True)}
-            },
-            upsert=False
-        )
+        try:
+            update = transition_one("facility", facilityId, verificationId, status, comments, userId, user_role)
+        except TransitionError as e:
+            return make_response(True, e.message, status=e.status)
+        villageId = update.get("villageId")
+        new_history = update["statusHistory"][-1]
         log=Logs(
             userId=userId,
             updateTime=nowIST(),
@@ -352,7 +330,8 @@ def verify_verification(decoded_data):
 
         # Insert into DB
         logs.insert_one(log.model_dump())
-        return make_response(False, "Verification status updated successfully", result=new_history.model_dump())
+        mark_village_stats_stale(villageId)
+        return make_response(False, "Verification status updated successfully", result=new_history)
 
     except Exception as e:
         return make_response(True, f"Error verifying update: {str(e)}", status=500)
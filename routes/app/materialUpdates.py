@@ -6,6 +6,12 @@ from utils.tokenAuth import auth_required
 from models.stages import statusHistory
 from config import db
 from utils.helpers import STATUS_TRANSITIONS, authorization, make_response, nowIST, validation_error_response
+from utils.pagination import paginate
+from utils.counts import count_for, invalidate_counts
+from utils.approvals import TransitionError, transition_one
+from utils.villageStats import mark_village_stats_stale
+from utils.search import HIDE_SEARCH_KEYS, search_filter, set_search_keys, with_search_keys
+from utils.signedUrls import embed_signed_urls
 from models.constructionMaterial import MaterialUpdateInsert, MaterialUpdateUpdate, MaterialUpdates
 from models.counters import get_next_material_id, get_next_materialUpdate_id
 from datetime import datetime
@@ -65,7 +71,8 @@ def insert_material_update(decoded_data):
             statusHistory=[history.model_dump()]
         )
 
-        material_updates.insert_one(update_doc.model_dump(exclude_none=True))
+        material_updates.insert_one(with_search_keys(update_doc.model_dump(exclude_none=True), "name"))
+        invalidate_counts(material_updates.name)
         log=Logs(
             userId=userId,
             updateTime=nowIST(),
@@ -78,6 +85,7 @@ def insert_material_update(decoded_data):
 
         # Insert into DB
         logs.insert_one(log.model_dump())
+        mark_village_stats_stale(update_obj.villageId)
         return make_response(False, "Material update inserted successfully", result=update_doc.model_dump(exclude_none=True))
 
     except Exception as e:
@@ -118,8 +126,9 @@ def update_material_update(decoded_data,updateId):
         )
         material_updates.update_one(
             {"updateId": updateId},
-            {"$set": update_dict,
+            {"$set": set_search_keys(update_dict, "name"),
             "$push": {"statusHistory": history.model_dump(exclude_none=True)}})
+        invalidate_counts(material_updates.name)
         
         log=Logs(
             userId=userId,
@@ -133,6 +142,7 @@ def update_material_update(decoded_data,updateId):
 
         # Insert into DB
         logs.insert_one(log.model_dump())
+        mark_village_stats_stale(villageId)
         return make_response(False, "Material update updated successfully", result=update_dict)
 
     except Exception as e:
@@ -161,6 +171,7 @@ def delete_material_update(decoded_data,updateId):
 
         # Hard delete
         material_updates.delete_one({"updateId": updateId})
+        invalidate_counts(material_updates.name)
         log=Logs(
             userId=userId,
             updateTime=nowIST(),
@@ -173,6 +184,7 @@ def delete_material_update(decoded_data,updateId):
 
         # Insert into DB
         logs.insert_one(log.model_dump())
+        mark_village_stats_stale(villageId)
         return make_response(False, "Material update deleted successfully")
 
     except Exception as e:
@@ -184,7 +196,7 @@ def delete_material_update(decoded_data,updateId):
 @auth_required
 def get_material_update(decoded_data,updateId):
     try:
-        docs = material_updates.find_one({"updateId":updateId}, {"_id": 0})
+        docs = material_updates.find_one({"updateId":updateId}, {"_id": 0, **HIDE_SEARCH_KEYS})
         if not docs:
             return make_response(True, "Material updates not found",status=404)
         return make_response(False, "Material update fetched successfully", result=docs,status=200)
@@ -205,13 +217,10 @@ def get_updates(decoded_data, villageId, materialId):
         to_date = args.get("toDate")
         user_role = decoded_data.get("role")
 
-        page = int(args.get("page", 1))
-        limit = int(args.get("limit", 15))
-
         # Build query
         query = {"villageId": villageId, "materialId": materialId}
         if name:
-            query["name"] = {"$regex": name, "$options": "i"}
+            query.update(search_filter("name", name, args.get("match")))
         if type:
             query["type"] = type
         if status:
@@ -228,18 +237,13 @@ def get_updates(decoded_data, villageId, materialId):
                 date_filter["$lte"] = to_date
             query["insertedAt"] = date_filter
 
-        projection = {"_id": 0, "statusHistory": 0}
-        skip = (page - 1) * limit
-
-        cursor = (
-            material_updates.find(query, projection)
-            .sort("insertedAt", -1)
-            .skip(skip)
-            .limit(limit)
-        )
-
-        update_items = list(cursor)
-        total_count = material_updates.count_documents(query)
+        projection = {"_id": 0, **HIDE_SEARCH_KEYS, "statusHistory": 0}
+        try:
+            update_items, page_info = paginate(material_updates, query, projection, [("insertedAt", -1)], args)
+            total = count_for(material_updates, query, args)
+            embed_signed_urls(update_items, args)
+        except ValueError as ve:
+            return make_response(True, str(ve), result={"count": 0, "items": []}, status=400)
 
         if not update_items:
             return make_response(
@@ -253,9 +257,12 @@ def get_updates(decoded_data, villageId, materialId):
             False,
             "Updates fetched successfully",
             result={
-                "count": total_count,
-                "page": page,
-                "limit": limit,
+                "count": total["count"],
+                "countIsLowerBound": total["countIsLowerBound"],
+                "page": page_info["page"],
+                "limit": page_info["limit"],
+                "next": page_info["next"],
+                "prev": page_info["prev"],
                 "items": update_items,
             },
         )
@@ -288,41 +295,12 @@ def verify_update(decoded_data):
             return make_response(True, message=error["message"], status=error["status"])
         user_role = decoded_data.get("role")
 
-        update = material_updates.find_one({"materialId":materialId,"updateId":updateId}, {"_id": 0})
-
-        if not update:
-            return make_response(True, "Update not found", status=404)
-        villageId=update.get("villageId")
-        previous_status = update.get("status", 1) 
-        
-        required_status = STATUS_TRANSITIONS.get(user_role)
-        if not required_status or previous_status != required_status:
-            return make_response(True, f"Unauthorized: {user_role} cannot verify status {previous_status}", status=403)
-
-
-        # Update status
-        now = nowIST()
-        final_status = min(max(previous_status + status, 1), 4)
-        new_history=StatusHistory(
-            status=1,
-            comments=comments,
-            verifier=userId,
-            time=str(now)
-        )
-
-
-        material_updates.update_one(
-            {"updateId": updateId, "materialId": materialId},
-            {
-                "$set": {
-                    "status": final_status,
-                    "verifiedBy": userId,
-                    "verifiedAt": now,
-                },
-                "$push": {"statusHistory": new_history.model_dump(exclude_none=True)}
-            },
-            upsert=False
-        )
+        try:
+            update = transition_one("material", materialId, updateId, status, comments, userId, user_role)
+        except TransitionError as e:
+            return make_response(True, e.message, status=e.status)
+        villageId = update.get("villageId")
+        new_history = update["statusHistory"][-1]
 
         log=Logs(
             userId=userId,
@@ -336,7 +314,8 @@ def verify_update(decoded_data):
 
         # Insert into DB
         logs.insert_one(log.model_dump())
-        return make_response(False, "Verification status updated successfully", result=new_history.model_dump())
+        mark_village_stats_stale(villageId)
+        return make_response(False, "Verification status updated successfully", result=new_history)
 
     except Exception as e:
         return make_response(True, f"Error verifying update: {str(e)}", status=500)
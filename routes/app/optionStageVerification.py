@@ -10,6 +10,14 @@ from models.village import Logs
 from utils.tokenAuth import auth_required
 from models.counters import get_next_family_update_id, get_next_member_update_id
 from utils.helpers import STATUS_TRANSITIONS, authorization, make_response, nowIST, validation_error_response
+from utils.pagination import paginate
+from utils.counts import count_for, invalidate_counts
+from utils.approvals import TransitionError, transition_one
+from utils.villageStats import mark_village_stats_stale
+from utils.search import HIDE_SEARCH_KEYS, search_filter, set_search_keys, with_search_keys
+from utils.signedUrls import embed_signed_urls
+from utils.stageGraph import option_stages
+from utils.stageState import remaining_stage_state, stage_state_update
 from models.family import StatusHistory, Updates, UpdatesInsert, UpdatesUpdate
 from config import JWT_EXPIRE_MIN, db
 
@@ -40,37 +48,26 @@ def insert_family_update(decoded_data,familyId):
         except ValidationError as ve:
             return validation_error_response(ve)
 
-        family = families.find_one({"familyId": familyId}, {"_id": 0})
+        family = families.find_one({"familyId": familyId}, {"_id": 0, **HIDE_SEARCH_KEYS})
         if not family:
             return make_response(True, "Family not found", status=404)
 
         fam = family
 
 
-        # 2️⃣ Fetch option details
-        option = options.find_one({"optionId": fam.get("relocationOption"),"deleted":False}, {"_id": 0})
-        if not option:
+        # 2️⃣ Fetch option stages
+        option_id = fam.get("relocationOption")
+        graph = option_stages(options, option_id)
+        if graph is None:
             return make_response(True, "Relocation option not found", status=404)
 
-        stages = [s for s in option.get("stages", []) if not s.get("deleted", False)]
-        stage_ids = [s["stageId"] for s in stages]
-       
         current_stage = verification_obj.currentStage
-        if current_stage not in stage_ids:
+        if current_stage not in graph:
             return make_response(True, f"Invalid stageId: {current_stage}", status=400)
 
-        stagesCompleted = fam.get("stagesCompleted", [])
-        current_index = stage_ids.index(current_stage)
-
-        # Collect all stages before this one
-        required_stages = stage_ids[:current_index]
-
-        # 3️⃣ Determine required stage
-        missing_stages = [s for s in required_stages if s not in stagesCompleted]
-        if missing_stages:
-            missing_names = [
-                stage["name"] for stage in stages if stage["stageId"] in missing_stages
-            ]
+        # 3️⃣ All stages before this one must be completed
+        missing_names = graph.missing_names(current_stage, fam.get("stagesCompleted", []))
+        if missing_names:
             return make_response(
                 True,
                 f"Cannot verify {current_stage} yet. Missing previous stages: {', '.join(missing_names)}",
@@ -79,7 +76,7 @@ def insert_family_update(decoded_data,familyId):
 
         # 4️⃣ Generate updateId
         update_id = get_next_family_update_id(
-            db, fam.get("villageId"), option["optionId"]
+            db, fam.get("villageId"), option_id
         )
         now = nowIST()
         history=StatusHistory(
@@ -114,8 +111,9 @@ def insert_family_update(decoded_data,familyId):
             },
         )
         updates.insert_one(
-            fam_update.model_dump(exclude_none=True)
+            with_search_keys(fam_update.model_dump(exclude_none=True), "name")
         )
+        invalidate_counts(updates.name)
         log=Logs(
             userId=userId,
             updateTime=nowIST(),
@@ -128,6 +126,7 @@ def insert_family_update(decoded_data,familyId):
 
         # Insert into DB
         logs.insert_one(log.model_dump())
+        mark_village_stats_stale(fam.get("villageId"))
         return make_response(
             False,
             f"Family update {update_id} inserted successfully",
@@ -163,7 +162,7 @@ def update_family_update(decoded_data,familyId, updateId):
         #     return make_response(True, "Family not found", status=404)
 
 
-        update_item = updates.find_one({"familyId":familyId,"updateId":updateId}, {"_id": 0})
+        update_item = updates.find_one({"familyId":familyId,"updateId":updateId}, {"_id": 0, **HIDE_SEARCH_KEYS})
 
         if not update_item:
             return make_response(True, "Update not found", status=404)
@@ -197,9 +196,10 @@ def update_family_update(decoded_data,familyId, updateId):
         )
         updates.update_one(
             {"updateId":updateId,"familyId":familyId},
-            {"$set":update_dict,
+            {"$set": set_search_keys(update_dict, "name"),
             "$push": {"statusHistory": history.model_dump(exclude_none=True)}}
         )
+        invalidate_counts(updates.name)
 
         # Optional: Recompute currentStage if needed
         # If the update being modified changes its status, you may want to recompute
@@ -216,6 +216,7 @@ def update_family_update(decoded_data,familyId, updateId):
 
         # Insert into DB
         logs.insert_one(log.model_dump())
+        mark_village_stats_stale(villageId)
         return make_response(
             False,
             f"Family update {updateId} modified successfully",
@@ -247,49 +248,23 @@ def delete_update(decoded_data):
             return make_response(True, message=error["message"], status=error["status"])
 
         
-        update_item = updates.find_one({"familyId":familyId,"updateId":updateId}, {"_id": 0})
-
+        # frozen (status >= 2) verifications stay; the check and the delete are one operation
+        update_item = updates.find_one_and_delete(
+            {"familyId": familyId, "updateId": updateId, "status": {"$not": {"$gte": 2}}},
+            projection={"_id": 0, "villageId": 1, "currentStage": 1},
+        )
         if not update_item:
+            if updates.find_one({"familyId": familyId, "updateId": updateId}, {"_id": 1}):
+                return make_response(True, "Cannot delete freezed verifications.", status=400)
             return make_response(True, "Update not found", status=404)
         villageId=update_item.get("villageId")
-        previous_status = update_item.get("status", 1) 
-        if previous_status >=2:
-            return make_response(True, "Cannot delete freezed verifications.", status=400)
-        stage_to_remove = update_item.get("currentStage")
-
-        # Count non-deleted updates for this stage
-        non_deleted_count = updates.count_documents({
-            "familyId": familyId,
-            "currentStage": stage_to_remove
-        })
-
-        update_ops={}
-        #update_ops = {"$set": {"updates.$.deleted": True}}
-
-
-        remaining_updates = list(
-            updates.find(
-                {
-                    "familyId": familyId,
-                    "updateId": {"$ne": updateId}
-                },
-                {"currentStage": 1, "verifiedAt": 1, "_id": 0}
-            ).sort("verifiedAt", 1)  # sort by time or insertion order if available
-        )
-
-        # 2️⃣ Determine the latest currentStage from the remaining updates
-        new_current_stage = remaining_updates[-1]["currentStage"] if remaining_updates else None
-        if non_deleted_count == 1:
-            update_ops["$pull"] = {"stagesCompleted": stage_to_remove}
-            update_ops["$set"]={"currentStage":new_current_stage}
 
+        state = remaining_stage_state(updates, {"familyId": familyId})
         families.update_one(
             {"familyId": familyId},
-            update_ops
-        )
-        updates.delete_one(
-            {"updateId": updateId}
+            stage_state_update(state, update_item.get("currentStage"))
         )
+        invalidate_counts(updates.name)
         log=Logs(
             userId=userId,
             updateTime=nowIST(),
@@ -302,6 +277,7 @@ def delete_update(decoded_data):
 
         # Insert into DB
         logs.insert_one(log.model_dump())
+        mark_village_stats_stale(villageId)
         return make_response(False, f" update {updateId} deleted successfully")
 
     except Exception as e:
@@ -327,41 +303,12 @@ def verify_update(decoded_data):
             return make_response(True, message=error["message"], status=error["status"])
         user_role = decoded_data.get("role")
 
-        update = updates.find_one({"familyId":familyId,"updateId":updateId}, {"_id": 0})
-
-        if not update:
-            return make_response(True, "Update not found", status=404)
-        villageId=update.get("villageId")
-        previous_status = update.get("status", 1) 
-        
-        required_status = STATUS_TRANSITIONS.get(user_role)
-        if not required_status or previous_status != required_status:
-            return make_response(True, f"Unauthorized: {user_role} cannot verify status {previous_status}", status=403)
-
-
-        # Update status
-        now = nowIST()
-        final_status = min(max(previous_status + status, 1), 4)
-        new_history=StatusHistory(
-            status=1,
-            comments=comments,
-            verifier=userId,
-            time=str(now)
-        )
-
-
-        updates.update_one(
-            {"updateId": updateId, "familyId": familyId},
-            {
-                "$set": {
-                    "status": final_status,
-                    "verifiedBy": userId,
-                    "verifiedAt": now,
-                },
-                "$push": {"statusHistory": new_history.model_dump(exclude_none=True)}
-            },
-            upsert=False
-        )
+        try:
+            update = transition_one("family", familyId, updateId, status, comments, userId, user_role)
+        except TransitionError as e:
+            return make_response(True, e.message, status=e.status)
+        villageId = update.get("villageId")
+        new_history = update["statusHistory"][-1]
         log=Logs(
             userId=userId,
             updateTime=nowIST(),
@@ -374,7 +321,8 @@ def verify_update(decoded_data):
 
         # Insert into DB
         logs.insert_one(log.model_dump())
-        return make_response(False, "Verification status updated successfully", result=new_history.model_dump())
+        mark_village_stats_stale(villageId)
+        return make_response(False, "Verification status updated successfully", result=new_history)
 
     except Exception as e:
         return make_response(True, f"Error verifying update: {str(e)}", status=500)
@@ -387,7 +335,7 @@ def get_update(decoded_data,updateId):
     try:
 
         # 2️⃣ Determine updates source
-        update = updates.find_one({"updateId":updateId}, {"_id": 0})
+        update = updates.find_one({"updateId":updateId}, {"_id": 0, **HIDE_SEARCH_KEYS})
 
         # 3️⃣ Return response
         if not update:
@@ -416,8 +364,6 @@ def get_updates(decoded_data, villageId, familyId):
         to_date = args.get("toDate")
         user_role = decoded_data.get("role")
         name=args.get("name")
-        page = int(args.get("page", 1))
-        limit = int(args.get("limit", 15))
 
         # Build query
         query = {"villageId": villageId, "familyId": familyId}
@@ -425,7 +371,7 @@ def get_updates(decoded_data, villageId, familyId):
         if current_stage:
             query["currentStage"] = current_stage
         if name:
-            query["name"] = {"$regex": name, "$options": "i"}
+            query.update(search_filter("name", name, args.get("match")))
         if status:
             query["status"] = int(status)
         elif user_role and user_role.lower() in STATUS_TRANSITIONS:
@@ -440,18 +386,13 @@ def get_updates(decoded_data, villageId, familyId):
                 date_filter["$lte"] = to_date
             query["insertedAt"] = date_filter
 
-        projection = {"_id": 0, "statusHistory": 0}
-        skip = (page - 1) * limit
-
-        cursor = (
-            updates.find(query, projection)
-            .sort("insertedAt", -1)
-            .skip(skip)
-            .limit(limit)
-        )
-
-        update_items = list(cursor)
-        total_count = updates.count_documents(query)
+        projection = {"_id": 0, **HIDE_SEARCH_KEYS, "statusHistory": 0}
+        try:
+            update_items, page_info = paginate(updates, query, projection, [("insertedAt", -1)], args)
+            total = count_for(updates, query, args)
+            embed_signed_urls(update_items, args)
+        except ValueError as ve:
+            return make_response(True, str(ve), result={"count": 0, "items": []}, status=400)
 
         if not update_items:
             return make_response(
@@ -465,9 +406,12 @@ def get_updates(decoded_data, villageId, familyId):
             False,
             "Updates fetched successfully",
             result={
-                "count": total_count,
-                "page": page,
-                "limit": limit,
+                "count": total["count"],
+                "countIsLowerBound": total["countIsLowerBound"],
+                "page": page_info["page"],
+                "limit": page_info["limit"],
+                "next": page_info["next"],
+                "prev": page_info["prev"],
                 "items": update_items,
             },
         )
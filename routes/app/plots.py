@@ -7,6 +7,11 @@ from utils.tokenAuth import auth_required
 from models.stages import FieldLevelVerification, FieldLevelVerificationInsert, FieldLevelVerificationUpdate, House, HouseInsert, HouseUpdate, Plots, PlotsInsert, PlotsUpdate, statusHistory
 from models.counters import get_next_house_id, get_next_plot_id, get_next_verification_id
 from utils.helpers import STATUS_TRANSITIONS, authorization, make_response, nowIST, validation_error_response
+from utils.pagination import paginate
+from utils.counts import count_for, invalidate_counts
+from utils.villageStats import mark_village_stats_stale
+from utils.search import HIDE_SEARCH_KEYS, search_filter, set_search_keys, with_search_keys
+from utils.signedUrls import embed_signed_urls
 from config import  db
 from pymongo import UpdateOne
 from config import client
@@ -78,7 +83,8 @@ def insert_plot(decoded_data):
 
         # Insert into Mongo
         plot_dict = plot_complete.model_dump(exclude_none=True)
-        plots.insert_one(plot_dict)
+        plots.insert_one(with_search_keys(plot_dict, "name"))
+        invalidate_counts(plots.name)
         plot_dict.pop("_id", None)
         log=Logs(
             userId=userId,
@@ -92,6 +98,7 @@ def insert_plot(decoded_data):
 
         # Insert into DB
         logs.insert_one(log.model_dump())
+        mark_village_stats_stale(plot_obj.villageId)
         # # If familyId exists, update family with this plotId
         # if plot_obj.familyId:
         #     families.update_one(
@@ -169,7 +176,8 @@ def insert_house(decoded_data):
         with client.start_session() as session:
             with session.start_transaction():
                 # Insert the house
-                houses.insert_one(plot_dict, session=session)
+                houses.insert_one(with_search_keys(plot_dict, "mukhiyaName"), session=session)
+                invalidate_counts(houses.name)
 
                 # Update all families in one bulk operation
                 bulk_ops = [
@@ -195,6 +203,7 @@ def insert_house(decoded_data):
 
         # Insert into DB
         logs.insert_one(log.model_dump())
+        mark_village_stats_stale(house_obj.villageId)
         return make_response(False, "House inserted successfully", result=plot_dict, status=200)
 
     except ValidationError as ve:
@@ -246,7 +255,8 @@ def update_plot(decoded_data,plotId):
         if not update_dict:
             return make_response(True, "No valid fields to update", status=400)
 
-        plots.update_one({"plotId": plotId}, {"$set": update_dict})
+        plots.update_one({"plotId": plotId}, {"$set": set_search_keys(update_dict, "name")})
+        invalidate_counts(plots.name)
         log=Logs(
             userId=userId,
             updateTime=nowIST(),
@@ -259,6 +269,7 @@ def update_plot(decoded_data,plotId):
 
         # Insert into DB
         logs.insert_one(log.model_dump())
+        mark_village_stats_stale(villageId, update_dict.get("villageId"))
         return make_response(False, "Plot updated successfully", result=update_dict)
 
     except Exception as e:
@@ -315,9 +326,10 @@ def update_house(decoded_data,plotId):
                 if update_dict:
                     houses.update_one(
                         {"plotId": plotId},
-                        {"$set": update_dict},
+                        {"$set": set_search_keys(update_dict, "mukhiyaName")},
                         session=session
                     )
+                    invalidate_counts(houses.name)
 
                 # Update each home individually
                 for updated_home in home_updates:
@@ -339,6 +351,7 @@ def update_house(decoded_data,plotId):
                         {"$set": updated_fields},
                         session=session
                     )
+                    invalidate_counts(houses.name)
 
                     # Update family's plotId if needed
                     families.update_one(
@@ -359,6 +372,7 @@ def update_house(decoded_data,plotId):
 
         # Insert into DB
         logs.insert_one(log.model_dump())
+        mark_village_stats_stale(villageId)
         return make_response(False, "House updated successfully", result=update_dict)
 
     except ValidationError as ve:
@@ -380,6 +394,7 @@ def delete_plot(decoded_data,plotId):
         villageId=plot.get("villageId")
 
         plots.update_one({"plotId": plotId}, {"$set": {"deleted": True}})
+        invalidate_counts(plots.name)
         # if result.matched_count == 0:
         #     return make_response(True, "Plot not found", status=404)
         log=Logs(
@@ -394,6 +409,7 @@ def delete_plot(decoded_data,plotId):
 
         # Insert into DB
         logs.insert_one(log.model_dump())
+        mark_village_stats_stale(villageId)
         return make_response(False, "Plot deleted successfully")
     
     except Exception as e:
@@ -413,6 +429,7 @@ def delete_house(decoded_data,plotId):
         villageId=house.get("villageId")
 
         houses.update_one({"plotId": plotId}, {"$set": {"deleted": True}})
+        invalidate_counts(houses.name)
         # if result.matched_count == 0:
         #     return make_response(True, "house not found", status=404)
         log=Logs(
@@ -427,6 +444,7 @@ def delete_house(decoded_data,plotId):
 
         # Insert into DB
         logs.insert_one(log.model_dump())
+        mark_village_stats_stale(villageId)
         return make_response(False, "House deleted successfully")
     except Exception as e:
         return make_response(True, f"Error deleting house: {str(e)}", status=500)
@@ -438,7 +456,7 @@ def get_plot_complete(decoded_data,plotId):
     try:
         query = {"plotId":plotId,"deleted": False}
 
-        docs = plots.find_one(query, {"_id": 0})
+        docs = plots.find_one(query, {"_id": 0, **HIDE_SEARCH_KEYS})
 
         if not docs:
             return make_response(True, "Plot not found", status=404)
@@ -454,7 +472,7 @@ def get_house_complete(decoded_data,plotId):
     try:
         query = {"plotId":plotId,"deleted": False}
 
-        docs = houses.find_one(query, {"_id": 0})
+        docs = houses.find_one(query, {"_id": 0, **HIDE_SEARCH_KEYS})
 
         if not docs:
             return make_response(True, "house not found", status=404)
@@ -473,8 +491,6 @@ def get_plots(decoded_data, villageId):
         deleted = args.get("deleted")
         current_stage = args.get("currentStage")
         type_id = args.get("typeId")
-        page = int(args.get("page", 1))
-        limit = int(args.get("limit", 15))
 
         query = {"villageId": villageId}
 
@@ -487,24 +503,20 @@ def get_plots(decoded_data, villageId):
             else:
                 return make_response(True, "Deleted must be 0 or 1", status=400)
         if name:
-            query["name"] = {"$regex": name, "$options": "i"}
+            query.update(search_filter("name", name, args.get("match")))
         if type_id:
             query["typeId"] = type_id
         if current_stage:
             query["currentStage"] = current_stage
 
 
-        projection = {"_id": 0}
-        skip = (page - 1) * limit
-
-        plots_cursor = (
-            plots.find(query, projection)
-            .skip(skip)
-            .limit(limit)
-        )
-
-        plots_list = list(plots_cursor)
-        total_count = plots.count_documents(query)
+        projection = {"_id": 0, **HIDE_SEARCH_KEYS}
+        try:
+            plots_list, page_info = paginate(plots, query, projection, [], args)
+            total = count_for(plots, query, args)
+            embed_signed_urls(plots_list, args)
+        except ValueError as ve:
+            return make_response(True, str(ve), result={"count": 0, "items": []}, status=400)
 
         if not plots_list:
             return make_response(True, "No plots found", result={"count": 0, "items": []}, status=404)
@@ -513,9 +525,12 @@ def get_plots(decoded_data, villageId):
             False,
             "Plots fetched successfully",
             result={
-                "count": total_count,
-                "page": page,
-                "limit": limit,
+                "count": total["count"],
+                "countIsLowerBound": total["countIsLowerBound"],
+                "page": page_info["page"],
+                "limit": page_info["limit"],
+                "next": page_info["next"],
+                "prev": page_info["prev"],
                 "items": plots_list,
             },
         )
@@ -535,8 +550,6 @@ def get_house(decoded_data, villageId):
         num_homes = args.get("numberOfHome")
         family_id = args.get("familyId")
 
-        page = int(args.get("page", 1))
-        limit = int(args.get("limit", 15))
 
         query = {"villageId": villageId}
 
@@ -550,7 +563,7 @@ def get_house(decoded_data, villageId):
                 return make_response(True, "Deleted must be 0 or 1", status=400)
 
         if mukhiya_name:
-            query["mukhiyaName"] = {"$regex": mukhiya_name, "$options": "i"}
+            query.update(search_filter("mukhiyaName", mukhiya_name, args.get("match")))
         if family_id:
             query["familyId"] = family_id
         if num_homes:
@@ -560,17 +573,13 @@ def get_house(decoded_data, villageId):
                 return make_response(True, "numberOfHome must be 1, 2, or 3", status=400)
 
 
-        projection = {"_id": 0}
-        skip = (page - 1) * limit
-
-        houses_cursor = (
-            houses.find(query, projection)
-            .skip(skip)
-            .limit(limit)
-        )
-
-        houses_list = list(houses_cursor)
-        total_count = houses.count_documents(query)
+        projection = {"_id": 0, **HIDE_SEARCH_KEYS}
+        try:
+            houses_list, page_info = paginate(houses, query, projection, [], args)
+            total = count_for(houses, query, args)
+            embed_signed_urls(houses_list, args)
+        except ValueError as ve:
+            return make_response(True, str(ve), result={"count": 0, "items": []}, status=400)
 
         if not houses_list:
             return make_response(
@@ -584,9 +593,12 @@ def get_house(decoded_data, villageId):
             False,
             "Houses fetched successfully",
             result={
-                "count": total_count,
-                "page": page,
-                "limit": limit,
+                "count": total["count"],
+                "countIsLowerBound": total["countIsLowerBound"],
+                "page": page_info["page"],
+                "limit": page_info["limit"],
+                "next": page_info["next"],
+                "prev": page_info["prev"],
                 "items": houses_list,
             },
         )
@@ -9,6 +9,14 @@ from utils.tokenAuth import auth_required
 from models.stages import FieldLevelVerification, FieldLevelVerificationInsert, FieldLevelVerificationUpdate, House, HouseInsert, Plots, PlotsInsert, PlotsUpdate, statusHistory
 from models.counters import get_next_house_id, get_next_plot_id, get_next_verification_id
 from utils.helpers import STATUS_TRANSITIONS, authorization, make_response, nowIST, str_to_ist_datetime, validation_error_response
+from utils.pagination import paginate
+from utils.counts import count_for, invalidate_counts
+from utils.approvals import TransitionError, transition_one
+from utils.villageStats import mark_village_stats_stale
+from utils.search import HIDE_SEARCH_KEYS, search_filter, set_search_keys, with_search_keys
+from utils.signedUrls import embed_signed_urls
+from utils.stageGraph import building_stages
+from utils.stageState import remaining_stage_state, stage_state_update
 from config import  db
 from pymongo import UpdateOne
 from config import client
@@ -72,21 +80,12 @@ def insert_verification(decoded_data, plotId):
         villageId = target["villageId"]
         typeId = target["typeId"]
 
-        building = buildings.find_one({"typeId": typeId, "villageId": villageId, "deleted": False})
-        if not building:
+        graph = building_stages(buildings, villageId, typeId)
+        if graph is None:
             return make_response(True, "Building type not found", status=404)
 
-        stages = [s for s in building.get("stages", []) if not s.get("deleted", False)]
-        stage_ids = [s["stageId"] for s in stages]
-        stage_map = {
-            s["stageId"]: {
-                "name": s["name"],
-                "desc": s.get("desc", "")
-            }
-            for s in stages
-        }
         current_stage = verification_obj.currentStage
-        if current_stage not in stage_ids:
+        if current_stage not in graph:
             return make_response(True, f"Invalid stageId: {current_stage}", status=400)
 
         # ✅ Check stage dependencies
@@ -98,19 +97,15 @@ def insert_verification(decoded_data, plotId):
         else:
             completed_stages = target.get("stagesCompleted", [])
 
-        current_index = stage_ids.index(current_stage)
-        required_stages = stage_ids[:current_index]
-        missing_stages = [s for s in required_stages if s not in completed_stages]
-
-        if missing_stages:
-            missing_names = [stage["name"] for stage in stages if stage["stageId"] in missing_stages]
+        missing_names = graph.missing_names(current_stage, completed_stages)
+        if missing_names:
             return make_response(True, f"Cannot verify {current_stage}. Missing previous: {', '.join(missing_names)}", status=400)
 
         # ✅ Passed validation → Create verification record
         pipeline_result = run_verification_pipeline(
-            verification_doc.model_dump(),
+            verification_obj.model_dump(),
             target,
-            stage_map
+            graph.stage_map
         )
         new_verification_id = get_next_verification_id(db, villageId, typeId)
         now = nowIST()
@@ -144,7 +139,8 @@ def insert_verification(decoded_data, plotId):
         # verification_data = verification_doc.model_dump(exclude_none=True)
         # verification_data.update(pipeline_result)
 
-        updates.insert_one(verification_doc.model_dump(exclude_none=True))
+        updates.insert_one(with_search_keys(verification_doc.model_dump(exclude_none=True), "name"))
+        invalidate_counts(updates.name)
         #print("OK hai yaha tak")
         # ✅ Update the related entity (house or plot)
         if type_ == "house":
@@ -159,6 +155,7 @@ def insert_verification(decoded_data, plotId):
                     }
                 },
             )
+            invalidate_counts(houses.name)
         else:
             plots.update_one(
                 {"plotId": plotId},
@@ -167,6 +164,7 @@ def insert_verification(decoded_data, plotId):
                     "$addToSet": {"stagesCompleted": current_stage},
                 },
             )
+            invalidate_counts(plots.name)
         #print("OK")
         if type_ == "plot":
             log_type = "Community Facilities"
@@ -185,6 +183,7 @@ def insert_verification(decoded_data, plotId):
 
         # Insert into DB
         logs.insert_one(log.model_dump())
+        mark_village_stats_stale(villageId)
         return make_response(
             False,
             f"Verification for {type_} inserted successfully",
@@ -225,9 +224,9 @@ def update_verification(decoded_data,plotId, verificationId):
 
         if type_ == "house":
 
-            update_item = updates.find_one({"verificationId":verificationId,"plotId":plotId,"homeId":homeId}, {"_id": 0})
+            update_item = updates.find_one({"verificationId":verificationId,"plotId":plotId,"homeId":homeId}, {"_id": 0, **HIDE_SEARCH_KEYS})
         else:
-            update_item = updates.find_one({"verificationId":verificationId,"plotId":plotId}, {"_id": 0})
+            update_item = updates.find_one({"verificationId":verificationId,"plotId":plotId}, {"_id": 0, **HIDE_SEARCH_KEYS})
 
         if not update_item:
             return make_response(True, "Update not found", status=404)
@@ -249,9 +248,10 @@ def update_verification(decoded_data,plotId, verificationId):
         # Perform the update
         updates.update_one(
             {"verificationId":verificationId,"plotId":plotId},
-            {"$set":update_dict,
+            {"$set": set_search_keys(update_dict, "name"),
             "$push": {"statusHistory": history.model_dump(exclude_none=True)}}
         )
+        invalidate_counts(updates.name)
         if type_ == "plot":
             log_type = "Community Facilities"
         elif type_ == "house":
@@ -269,6 +269,7 @@ def update_verification(decoded_data,plotId, verificationId):
 
         # Insert into DB
         logs.insert_one(log.model_dump())
+        mark_village_stats_stale(villageId)
         return make_response(False, "Verification updated successfully", result=update_dict)
     except Exception as e:
         return make_response(True, f"Error updating verification: {str(e)}", status=500)
@@ -293,42 +294,14 @@ def verify_verification(decoded_data):
 
         user_role = decoded_data.get("role")
 
-        verification = updates.find_one({"plotId":plotId,"verificationId":verificationId}, {"_id": 0})
-
-        if not verification:
-            return make_response(True, "verification not found", status=404)
-        previous_status = verification.get("status", 1) 
-        villageId=verification.get("villageId")
-        type_=verification.get("type")
-        
-        required_status = STATUS_TRANSITIONS.get(user_role)
-        if not required_status or previous_status != required_status:
-            return make_response(True, f"Unauthorized: {user_role} cannot verify status {previous_status}", status=403)
-
-        final_status = min(max(previous_status + status, 1), 4)
-
-        now = nowIST()
-        new_history=statusHistory(
-            status=final_status,
-            comments=comments,
-            verifier=userId,
-            time=str(now)
-        )
-
-
-        updates.update_one(
-            {"verificationId": verificationId, "plotId": plotId},
-            {
-                "$set": {
-                    "status":final_status,
-                    "verifiedBy": userId,
-                    "verifiedAt": now,
-                },
-                "$push": {"statusHistory": new_history.model_dump(exclude_none=True)}
-            },
-            upsert=False
-
-        )
+        try:
+            verification = transition_one("plot", plotId, verificationId, status, comments, userId, user_role, not_found="verification not found")
+        except TransitionError as e:
+            return make_response(True, e.message, status=e.status)
+        villageId = verification.get("villageId")
+        new_history = verification["statusHistory"][-1]
+        type_ = verification.get("type")
+        now = verification["verifiedAt"]
         if type_ == "plot":
             log_type = "Community Facilities"
         elif type_ == "house":
@@ -346,7 +319,8 @@ def verify_verification(decoded_data):
 
         # Insert into DB
         logs.insert_one(log.model_dump())
-        return make_response(False, "Verification status updated successfully", result=new_history.model_dump())
+        mark_village_stats_stale(villageId)
+        return make_response(False, "Verification status updated successfully", result=new_history)
 
     except Exception as e:
         return make_response(True, f"Error verifying verification: {str(e)}", status=500)
@@ -380,65 +354,33 @@ def delete_verification(decoded_data,plotId, verificationId):
         # if not plot:
         #     return make_response(True, "Plot not found", status=404)
 
-        verification = updates.find_one({"plotId":plotId,"verificationId":verificationId}, {"_id": 0})
+        # frozen (status >= 2) verifications stay; the check and the delete are one operation
+        verification = updates.find_one_and_delete(
+            {"plotId": plotId, "verificationId": verificationId, "status": {"$not": {"$gte": 2}}},
+            projection={"_id": 0, "villageId": 1, "currentStage": 1},
+        )
         if not verification:
+            if updates.find_one({"plotId": plotId, "verificationId": verificationId}, {"_id": 1}):
+                return make_response(True, "Cannot update freezed verifications.", status=400)
             return make_response(True, "Verification not found", status=404)
         villageId=verification.get("villageId")
-        previous_status = verification.get("status", 1) 
-        if previous_status >=2:
-            return make_response(True, "Cannot update freezed verifications.", status=400)
-        
         stage_to_remove = verification.get("currentStage")
-        if type_ == "house":
-            non_deleted_count = updates.count_documents({
-                "plotId": plotId,
-                "homeId":homeId,
-                "currentStage": stage_to_remove
-            })
-        else:
-            non_deleted_count = updates.count_documents({
-                "plotId": plotId,
-                "currentStage": stage_to_remove
-            })
-        update_ops={}
-
-
-        remaining_updates = list(
-            updates.find(
-                {
-                    "plotId": plotId,
-                    "verificationId": {"$ne": verificationId}
-                },
-                {"currentStage": 1, "verifiedAt": 1, "_id": 0}
-            ).sort("verifiedAt", 1)  # sort by time or insertion order if available
-        )
-        new_current_stage = remaining_updates[-1]["currentStage"] if remaining_updates else None
 
-        if non_deleted_count == 1:
-            update_ops["$pull"] = {"stagesCompleted": stage_to_remove}
-            update_ops["$set"]={"currentStage":new_current_stage}
+        # plot verifications are stored with homeId None
+        state = remaining_stage_state(updates, {"plotId": plotId, "homeId": homeId if type_ == "house" else None})
         if type_ == "house":
             houses.update_one(
                 {"plotId": plotId, "homeDetails.homeId": homeId},
-                {
-                    "$set": {
-                        "homeDetails.$.currentStage": new_current_stage
-                    },
-                    "$pull": {
-                        "homeDetails.$.stagesCompleted": stage_to_remove
-                    }
-                }
+                stage_state_update(state, stage_to_remove, prefix="homeDetails.$.")
             )
-
+            invalidate_counts(houses.name)
         else:
             plots.update_one(
-                {"plotId":plotId},
-                update_ops,
-                upsert=False
+                {"plotId": plotId},
+                stage_state_update(state, stage_to_remove)
             )
-        updates.delete_one(
-            {"verificationId": verificationId}
-        )
+            invalidate_counts(plots.name)
+        invalidate_counts(updates.name)
         if type_ == "plot":
             log_type = "Community Facilities"
         elif type_ == "house":
@@ -456,6 +398,7 @@ def delete_verification(decoded_data,plotId, verificationId):
 
         # Insert into DB
         logs.insert_one(log.model_dump())
+        mark_village_stats_stale(villageId)
         return make_response(False, "Verification deleted successfully")
 
     except Exception as e:
@@ -466,7 +409,7 @@ def delete_verification(decoded_data,plotId, verificationId):
 @auth_required
 def get_verification(decoded_data,verificationId):
     try:
-        verification = updates.find_one({"verificationId": verificationId}, {"_id": 0})
+        verification = updates.find_one({"verificationId": verificationId}, {"_id": 0, **HIDE_SEARCH_KEYS})
 
         if not verification:
             return make_response(True, "verification not found",result=None, status=404)
@@ -490,15 +433,13 @@ def get_field_verifications(decoded_data,villageId,plotId):
         user_role = decoded_data.get("role")  # Optional user role/status
         from_date = args.get("fromDate")
         to_date = args.get("toDate")
-        page = int(args.get("page", 1))
-        limit = int(args.get("limit", 15))
         # --- Build MongoDB filter query dynamically ---
         query = {"plotId": plotId,"villageId":villageId}
 
         if current_stage:
             query["currentStage"] = current_stage
         if name:
-            query["name"] = {"$regex": name, "$options": "i"}
+            query.update(search_filter("name", name, args.get("match")))
         if home_id:
             query["homeId"] = home_id
         if status:
@@ -516,20 +457,15 @@ def get_field_verifications(decoded_data,villageId,plotId):
             query["insertedAt"] = date_filter
 
         # --- Projection (exclude heavy fields) ---
-        projection = {"_id": 0, "statusHistory": 0}
+        projection = {"_id": 0, **HIDE_SEARCH_KEYS, "statusHistory": 0}
 
         # --- Sorting & Pagination ---
-        skip = (page - 1) * limit
-
-        cursor = (
-            updates.find(query, projection)
-            .sort("insertedAt", -1)  # latest first
-            .skip(skip)
-            .limit(limit)
-        )
-
-        verifications = list(cursor)
-        total_count = updates.count_documents(query)
+        try:
+            verifications, page_info = paginate(updates, query, projection, [("insertedAt", -1)], args)
+            total = count_for(updates, query, args)
+            embed_signed_urls(verifications, args)
+        except ValueError as ve:
+            return make_response(True, str(ve), result={"count": 0, "items": []}, status=400)
 
         if not verifications:
             return make_response(
@@ -543,9 +479,12 @@ def get_field_verifications(decoded_data,villageId,plotId):
             False,
             "Verifications fetched successfully",
             result={
-                "count": total_count,
-                "page": page,
-                "limit": limit,
+                "count": total["count"],
+                "countIsLowerBound": total["countIsLowerBound"],
+                "page": page_info["page"],
+                "limit": page_info["limit"],
+                "next": page_info["next"],
+                "prev": page_info["prev"],
                 "items": verifications,
             },
         )
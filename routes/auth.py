@@ -1,24 +1,29 @@
 
 from datetime import datetime as dt, timedelta
-from email.mime.text import MIMEText
 import random
-import smtplib
-import bcrypt
 from bson import ObjectId
 from flask import Flask, Blueprint,request, jsonify
 from pydantic import ValidationError
 from models.emp import Users, UsersForApp
-from config import JWT_EXPIRE_MIN, db,OTP_EXPIRE_MIN,RECIEVER_EMAIL,SENDER_EMAIL,APP_PASSWORD
+from config import JWT_EXPIRE_MIN, db,OTP_EXPIRE_MIN,RECIEVER_EMAIL
 from utils.helpers import hash_password, is_time_past, make_response, nowIST, str_to_ist_datetime, verify_password
-from utils.tokenAuth import auth_required,make_jwt
+from utils.notifications import enqueue
+from utils.passwordHistory import is_reused, record_password
+from utils.passwords import PASSWORD_RETRY_AFTER, PasswordPoolBusy, needs_rehash, rehash_in_background
+from utils.tokenAuth import auth_required, invalidate_user_status, make_jwt
 from pymongo import errors as mongo_errors
 users = db.users
-password_history=db.passwords
 
 
 auth_bp = Blueprint("auth",__name__)
 
 
+def busy_response():
+    """429 while the password hashing pool is saturated."""
+    resp, status = make_response(True, "Too many login attempts right now. Please retry shortly.", status=429)
+    resp.headers["Retry-After"] = str(PASSWORD_RETRY_AFTER)
+    return resp, status
+
 
 @auth_bp.route('/register', methods=['POST'])
 def register():
@@ -71,15 +76,13 @@ def register():
         )
 
         # -------- Insert Password History -------- #
-        password_history.insert_one({
-            "userId": emp_id,
-            "previous_password": hashed_password,
-            "changed_at": now
-        })
+        record_password(emp_id, hashed_password, now)
         return make_response(error=True,message="Registration successful. Please login.",status=200)
 
         #return jsonify({"message": "Registration successful. Please login."}), 200
 
+    except PasswordPoolBusy:
+        return busy_response()
     except mongo_errors.PyMongoError as e:
         return make_response(True, f"Database error: {str(e)}", status=500)
 
@@ -119,9 +122,20 @@ def login():
             return make_response(True, "Not yet Registered", status=404)
 
         # -------- Password Check -------- #
-        if not verify_password(raw_password, emp_doc.get("password")):
+        stored_hash = emp_doc.get("password")
+        if not verify_password(raw_password, stored_hash):
             return make_response(True, "Invalid credentials", status=401)
 
+        # Upgrade hashes made with an older cost; only if the password hasn't changed meanwhile
+        if needs_rehash(stored_hash):
+            rehash_in_background(raw_password, lambda new_hash: users.update_one(
+                {"userId": emp_id, "password": stored_hash},
+                {"$set": {"password": new_hash}}
+            ))
+
+        # the new token should be checked against this account state, not a cached one
+        invalidate_user_status(emp_id)
+
         # -------- Pydantic Validation -------- #
         #emp_doc.pop("password", None)  # remove before validation
         try:
@@ -170,6 +184,8 @@ def login():
             )
             return response, 200
 
+    except PasswordPoolBusy:
+        return busy_response()
     except mongo_errors.PyMongoError as e:
         return make_response(True, f"Database error: {str(e)}", status=500)
     except Exception as e:
@@ -277,21 +293,9 @@ def update_password(decoded_data):
         if not otp_doc or not otp_doc.get("used") or not otp_doc.get("passed") or is_time_past(now, otp_doc.get("expiresAt")):
             return jsonify({"error": "OTP verification required"}), 403
 
-        prev_hashes = []
-
-        for row in password_history.find({"userId": emp_id}):
-            if row.get("previous_password"):
-                prev_hashes.append(row["previous_password"])
-
-        # Check if new password matches any previous password
-        for old_h in prev_hashes:
-            try:
-                if verify_password(raw_password,old_h):
-                    return make_response({"error": "New password cannot be the same as any previous passwords."}, 400)
-
-            except Exception:
-                # If stored format is unexpected, skip that entry but log in real app
-                continue
+        # Check the new password against the last PASSWORD_HISTORY_SIZE passwords
+        if is_reused(emp_id, raw_password):
+            return make_response({"error": "New password cannot be the same as any previous passwords."}, 400)
 
         # Hash the new password
         new_hashed = hash_password(raw_password)
@@ -302,15 +306,13 @@ def update_password(decoded_data):
             {"$set": {"password": new_hashed}}
         )
 
-        # Store password in password_history (audit)
-        password_history.insert_one({
-            "userId": emp_id,
-            "previous_password": new_hashed,
-            "changed_at": now
-        })
+        # Store password in password_history (keeps the newest PASSWORD_HISTORY_SIZE)
+        record_password(emp_id, new_hashed, now)
 
         return make_response({"message": "Password updated successfully. Please login."}, 200)
 
+    except PasswordPoolBusy:
+        return busy_response()
     except mongo_errors.PyMongoError as e:
         return make_response({"error": f"Database error: {str(e)}"}, 500)
     except Exception as e:
@@ -419,9 +421,7 @@ def verify_otp():
         return make_response(True, "OTP verification failed", status=401)
 
 def send_email_otp(receiver_email, otp, userId, name, mobile_number):
-    sender_email = SENDER_EMAIL
-    app_password = APP_PASSWORD # Gmail app password
-
+    """Queues the OTP mail on the outbox; delivery happens off the request (utils/notifications.py)."""
     # Get current IST as datetime
     now_dt = str_to_ist_datetime(nowIST())  # use your helper to convert string to datetime
 
@@ -444,11 +444,4 @@ def send_email_otp(receiver_email, otp, userId, name, mobile_number):
     Please do not share this OTP with anyone. It is valid for {OTP_EXPIRE_MIN} minutes only.
     """
 
-    msg = MIMEText(msg_body)
-    msg["Subject"] = "OTP for MAATI"
-    msg["From"] = sender_email
-    msg["To"] = receiver_email
-
-    with smtplib.SMTP_SSL("smtp.gmail.com", 465) as server:
-        server.login(sender_email, app_password)
-        server.sendmail(sender_email, receiver_email, msg.as_string())
+    return enqueue("email", receiver_email, msg_body, subject="OTP for MAATI", kind="otp")
@@ -1,6 +1,4 @@
 from datetime import timedelta
-from email.mime.text import MIMEText
-import smtplib
 from flask import Blueprint, request, jsonify
 from pydantic import ValidationError
 from models.village import Logs
@@ -9,7 +7,11 @@ from models.complaints import STATUS, FeedbackInsert, Type, StatusHistory
 from models.counters import get_next_feedback_id
 from models.emp import UserRole
 from utils.helpers import make_response, nowIST, str_to_ist_datetime, validation_error_response
-from config import db, SENDER_EMAIL, APP_PASSWORD, OTP_EXPIRE_MIN
+from utils.pagination import paginate
+from utils.counts import count_for, invalidate_counts
+from utils.search import HIDE_SEARCH_KEYS, search_filter, with_search_keys
+from utils.notifications import enqueue
+from config import db, OTP_EXPIRE_MIN
 
 # MongoDB collections
 users = db.users
@@ -25,9 +27,6 @@ feedback_bp = Blueprint("feedback", __name__)
 def send_email_feedback(receiver_email: str, name: str, feedbackId: str, villageId: str, feedbackType: str, feedbackCategory: str):
     """Send confirmation email to the user after feedback submission."""
 
-    sender_email = SENDER_EMAIL
-    app_password = APP_PASSWORD
-
     now_dt = str_to_ist_datetime(nowIST())
     expires_dt = now_dt + timedelta(minutes=OTP_EXPIRE_MIN)
     expires_at = expires_dt.strftime("%Y-%m-%d %H:%M:%S")
@@ -53,17 +52,16 @@ def send_email_feedback(receiver_email: str, name: str, feedbackId: str, village
     MAATI Support Team
     """
 
-    msg = MIMEText(msg_body)
-    msg["Subject"] = f"MAATI | {feedbackType.capitalize()} Submitted Successfully"
-    msg["From"] = sender_email
-    msg["To"] = receiver_email
-
     try:
-        with smtplib.SMTP_SSL("smtp.gmail.com", 465) as server:
-            server.login(sender_email, app_password)
-            server.sendmail(sender_email, receiver_email, msg.as_string())
+        enqueue(
+            "email",
+            receiver_email,
+            msg_body,
+            subject=f"MAATI | {feedbackType.capitalize()} Submitted Successfully",
+            kind="feedback",
+        )
     except Exception as e:
-        print(f"Error sending email: {e}")  # log only, don't fail the request
+        print(f"Error queueing email: {e}")  # log only, don't fail the request
 
 
 @feedback_bp.route("/feedback", methods=["POST"])
@@ -111,7 +109,8 @@ def insert_feedback():
             "statusHistory": [status_history.dict()],
         }
 
-        feedback.insert_one(doc)
+        feedback.insert_one(with_search_keys(doc, "name"))
+        invalidate_counts(feedback.name)
 
         # ✅ Send email confirmation (non-blocking best practice)
         # send_email_feedback(
@@ -180,6 +179,7 @@ def take_action(decoded_data,feedbackId):
                 "$push": {"statusHistory": status_history.dict()},
             },
         )
+        invalidate_counts(feedback.name)
         log=Logs(
             userId=userId,
             updateTime=now,
@@ -213,12 +213,10 @@ def get_all_feedbacks(decoded_data,villageId):
 
         from_date = args.get("fromDate")
         to_date = args.get("toDate")
-        page = int(args.get("page", 1))
-        limit = int(args.get("limit", 15))
         query = {"villageId":villageId}
 
         if name:
-            query["name"] = {"$regex": name, "$options": "i"}
+            query.update(search_filter("name", name, args.get("match")))
         if familyId:
             query["familyId"] = familyId
         if plotId:
@@ -236,20 +234,14 @@ def get_all_feedbacks(decoded_data,villageId):
             query["insertedAt"] = date_filter
 
         # --- Projection (exclude heavy fields) ---
-        projection = {"_id": 0, "statusHistory": 0, "docs": 0}
+        projection = {"_id": 0, **HIDE_SEARCH_KEYS, "statusHistory": 0, "docs": 0}
 
         # --- Sorting & Pagination ---
-        skip = (page - 1) * limit
-
-        cursor = (
-            feedback.find(query, projection)
-            .sort("insertedAt", -1)  # latest first
-            .skip(skip)
-            .limit(limit)
-        )
-
-        verifications = list(cursor)
-        total_count = feedback.count_documents(query)
+        try:
+            verifications, page_info = paginate(feedback, query, projection, [("insertedAt", -1)], args)
+            total = count_for(feedback, query, args)
+        except ValueError as ve:
+            return make_response(True, str(ve), result={"count": 0, "items": []}, status=400)
 
         if not verifications:
             return make_response(
@@ -263,9 +255,12 @@ def get_all_feedbacks(decoded_data,villageId):
             False,
             "feedbacks fetched successfully",
             result={
-                "count": total_count,
-                "page": page,
-                "limit": limit,
+                "count": total["count"],
+                "countIsLowerBound": total["countIsLowerBound"],
+                "page": page_info["page"],
+                "limit": page_info["limit"],
+                "next": page_info["next"],
+                "prev": page_info["prev"],
                 "items": verifications,
             },
         )
@@ -292,7 +287,7 @@ def get_feedback(feedbackId):
         if not feedbackId:
             return make_response(True, message="Missing parameter: feedbackId", result=None, status=400)
 
-        fb = feedback.find_one({"feedbackId": feedbackId}, {"_id": 0})
+        fb = feedback.find_one({"feedbackId": feedbackId}, {"_id": 0, **HIDE_SEARCH_KEYS})
         if not fb:
             return make_response(True, message="Feedback not found", result={"feedbackId": feedbackId}, status=404)
 
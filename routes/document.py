@@ -1,34 +1,37 @@
-import uuid
 from urllib.parse import urlparse
 
-import boto3
-from botocore.exceptions import ClientError
 from flask import Blueprint, request, jsonify
-from config import AWS_ACCESS_KEY_ID,AWS_SECRET_ACCESS_KEY,AWS_DEFAULT_REGION,BUCKET_NAME,MAX_FILE_SIZE_MB
+from config import BUCKET_NAME,MAX_FILE_SIZE_MB,s3_client
 import os
 from utils.helpers import make_response
+from utils.images import ImageError, all_keys, rendition_key
+from utils.signedUrls import SIGN_BATCH_LIMIT, sign_key, sign_many
+from utils.uploads import (CONTENT_TYPES, UploadError, check_file, complete_upload, delete_keys, new_upload_key,
+                           presign_upload, record_uploads, s3_uri, upload_many)
 
 s3_bp = Blueprint("s3_bp", __name__)
 
 #BUCKET_NAME = "wethink-storage"
-ALLOWED_EXTENSIONS = {"jpg", "jpeg", "pdf","csv","png"}
+ALLOWED_EXTENSIONS = set(CONTENT_TYPES)
 
 def allowed_file(filename):
     return '.' in filename and filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
 
 
-s3_client = boto3.client(
-    "s3",
-    aws_access_key_id=AWS_ACCESS_KEY_ID,
-    aws_secret_access_key=AWS_SECRET_ACCESS_KEY,
-    region_name=AWS_DEFAULT_REGION
-)
+def server_timing(results):
+    """Server-Timing header value with one entry per uploaded file."""
+    def desc(name):
+        return name.encode("ascii", "replace").decode("ascii").replace('"', "'").replace("\\", "/")
+    return ", ".join(f'file{i};desc="{desc(r["name"])}";dur={r["ms"]}' for i, r in enumerate(results))
+
 
 @s3_bp.route("/upload", methods=["POST"])
 def upload_files():
     """
     Upload multiple files to S3 with name mapping and rollback on failure.
-    Validates file types and size.
+    Validates file types and size of every file first, then uploads them
+    concurrently (utils/uploads.py). Per-file upload times are reported in
+    the Server-Timing header.
     Expected FormData:
         files[aadhar_front]: <File>
         files[aadhar_back]: <File>
@@ -41,8 +44,8 @@ def upload_files():
     if not request.files:
         return make_response(error=True, message="No files provided", status=400)
 
-    uploaded_map = {}
-    uploaded_keys = []
+    max_size_bytes = MAX_FILE_SIZE_MB * 1024 * 1024
+    batch = []
 
     for key, file in request.files.items():
         # Validate key format: files[name]
@@ -67,7 +70,6 @@ def upload_files():
         file.seek(0, 2)  # move to end of file
         file_length = file.tell()
         file.seek(0)  # reset pointer to start
-        max_size_bytes = MAX_FILE_SIZE_MB * 1024 * 1024
 
         if file_length > max_size_bytes:
             return make_response(
@@ -77,44 +79,116 @@ def upload_files():
             )
 
         ext = file.filename.rsplit('.', 1)[1].lower()
-        unique_name = f"{uuid.uuid4()}.{ext}"
-        s3_key = f"uploads/{unique_name}"
+        batch.append((name, file, new_upload_key(ext), file.content_type))
+
+    results = upload_many(batch)
+    failed = [r for r in results if r["error"]]
+
+    if failed:
+        # Rollback everything that did upload (renditions too), in one delete_objects call
+        delete_keys([k for r in results for k in r["keys"]])
+        invalid = [r["name"] for r in failed if isinstance(r["error"], ImageError)]
+        response = make_response(
+            error=True,
+            message=f"Invalid image for {', '.join(invalid)}" if invalid else f"Failed to upload {', '.join(r['name'] for r in failed)}",
+            status=400 if invalid else 500
+        )
+    else:
+        record_uploads(results)
+        response = make_response(
+            error=False,
+            message="All files uploaded successfully",
+            result={r["name"]: s3_uri(r["key"]) for r in results},
+            status=201
+        )
 
-        try:
-            s3_client.upload_fileobj(
-                file,
-                BUCKET_NAME,
-                s3_key,
-                ExtraArgs={
-                    "ContentType": file.content_type
-                }
-            )
-            s3_uri = f"s3://{BUCKET_NAME}/{s3_key}"
-            uploaded_map[name] = s3_uri
-            uploaded_keys.append(s3_key)
+    response[0].headers["Server-Timing"] = server_timing(results)
+    return response
 
-        except ClientError as e:
-            # Rollback previously uploaded files
-            for uploaded_key in uploaded_keys:
-                try:
-                    s3_client.delete_object(Bucket=BUCKET_NAME, Key=uploaded_key)
-                except ClientError:
-                    pass  # ignore rollback failures
-            print(str(e))
+
+
+
+@s3_bp.route("/upload/presign", methods=["POST"])
+def presign_files():
+    """
+    Issue direct-to-S3 upload slots (utils/uploads.py).
+    Body (JSON):
+        { "files": { "aadhar_front": {"filename": "front.jpg", "contentType": "image/jpeg", "size": 183422} } }
+    Returns, per name, either a presigned POST ("method": "POST", "url", "fields")
+    or a multipart upload ("method": "MULTIPART", "uploadId", "partSize", "parts": [{partNumber, url}]),
+    plus the "key" to send to /upload/complete.
+    """
+    from botocore.exceptions import ClientError  # botocore loads on first S3 request
+    try:
+        data = request.get_json(silent=True) or {}
+        files = data.get("files")
+        if not isinstance(files, dict) or not files:
+            return make_response(error=True, message="No files provided", status=400)
+
+        # reject the whole request before signing anything, like /upload
+        for name, meta in files.items():
+            if not isinstance(meta, dict):
+                return make_response(error=True, message=f"files.{name} must be an object", status=400)
+            check_file(meta.get("filename"), meta.get("contentType"), meta.get("size"))
+
+        slots = {
+            name: presign_upload(name, meta["filename"], meta.get("contentType"), meta["size"])
+            for name, meta in files.items()
+        }
+        return make_response(error=False, message="Upload URLs generated successfully", result=slots, status=200)
+
+    except UploadError as e:
+        return make_response(error=True, message=e.message, status=e.status)
+    except ClientError as e:
+        print(str(e))
+        return make_response(error=True, message="Failed to generate upload URLs", status=500)
+    except Exception as e:
+        return make_response(error=True, message=f"Unexpected error: {str(e)}", status=500)
+
+
+@s3_bp.route("/upload/complete", methods=["POST"])
+def complete_files():
+    """
+    Confirm direct uploads: each object is checked with head_object against
+    the declared size / content type and registered.
+    Body (JSON):
+        { "files": { "aadhar_front": {"key": "uploads/...jpg", "parts": [{"partNumber": 1, "etag": "..."}]} } }
+        ("parts" only for multipart uploads)
+    Returns the same map as /upload: { "aadhar_front": "s3://..." }
+    """
+    from botocore.exceptions import ClientError  # botocore loads on first S3 request
+    try:
+        data = request.get_json(silent=True) or {}
+        files = data.get("files")
+        if not isinstance(files, dict) or not files:
+            return make_response(error=True, message="No files provided", status=400)
+
+        completed, failed = {}, {}
+        for name, meta in files.items():
+            key = meta.get("key") if isinstance(meta, dict) else None
+            if not key:
+                failed[name] = "key is required"
+                continue
+            try:
+                complete_upload(key, meta.get("parts"))
+                completed[name] = s3_uri(key)
+            except UploadError as e:
+                failed[name] = e.message
+
+        if failed:
             return make_response(
                 error=True,
-                message=f"Failed to upload {file.filename}",
-                status=500
+                message="Some files could not be completed",
+                result={"files": completed, "errors": failed},
+                status=400
             )
+        return make_response(error=False, message="All files uploaded successfully", result=completed, status=201)
 
-    return make_response(
-        error=False,
-        message="All files uploaded successfully",
-        result=uploaded_map,
-        status=201
-    )
-
-
+    except ClientError as e:
+        print(str(e))
+        return make_response(error=True, message="Failed to verify uploaded files", status=500)
+    except Exception as e:
+        return make_response(error=True, message=f"Unexpected error: {str(e)}", status=500)
 
 
 @s3_bp.route("/delete", methods=["DELETE"])
@@ -130,6 +204,7 @@ def delete_file():
         - File not found
         - AWS errors
     """
+    from botocore.exceptions import ClientError  # botocore loads on first S3 request
     try:
         data = request.get_json()
         if not data or "url" not in data:
@@ -156,9 +231,10 @@ def delete_file():
                 return make_response(error=True, message="File not found", status=404)
             return make_response(error=True, message="Error checking file existence", status=500)
 
-        # Delete the file
+        # Delete the file and its image renditions
         try:
-            s3_client.delete_object(Bucket=BUCKET_NAME, Key=s3_key)
+            if delete_keys(all_keys(s3_key)):
+                return make_response(error=True, message="Failed to delete file", status=500)
             return make_response(
                 error=False,
                 message=f"File deleted successfully",
@@ -181,10 +257,12 @@ def get_file_url():
 
     Expected Body (JSON):
         { "s3_uri": "s3://wethink-storage/uploads/a1b2c3d4-e5f6-7890-a1b2-c3d4e5f67890.pdf" }
+        optional "rendition": "thumb" | "model" for uploaded photos
 
     Returns:
         A JSON response with a temporary, pre-signed URL.
     """
+    from botocore.exceptions import ClientError  # botocore loads on first S3 request
     try:
         data = request.get_json()
         if not data or "s3_uri" not in data:
@@ -209,15 +287,23 @@ def get_file_url():
         if not s3_key.startswith("uploads/"):
             return make_response(error=True, message="Invalid S3 key format or path.", status=400)
         
-        # Check if the object exists
-        s3_client.head_object(Bucket=bucket_name, Key=s3_key)
+        # Optional derived image: "thumb" or "model" (utils/images.py)
+        try:
+            rendition = rendition_key(s3_key, data.get("rendition"))
+        except ValueError as ve:
+            return make_response(error=True, message=str(ve), status=400)
+
+        # Check if the object exists; photos uploaded before renditions existed fall back to the original
+        try:
+            s3_client.head_object(Bucket=bucket_name, Key=rendition)
+            s3_key = rendition
+        except ClientError as e:
+            if rendition == s3_key or e.response["Error"]["Code"] != "404":
+                raise
+            s3_client.head_object(Bucket=bucket_name, Key=s3_key)
         
         # Generate the pre-signed URL
-        url = s3_client.generate_presigned_url(
-            "get_object",
-            Params={"Bucket": bucket_name, "Key": s3_key},
-            ExpiresIn=3600  # URL expires in 1 hour
-        )
+        url = sign_key(s3_key)  # cached until shortly before it expires
         
         return make_response(
             error=False,
@@ -231,4 +317,41 @@ def get_file_url():
             return make_response(error=True, message="File not found", status=404)
         return make_response(error=True, message=f"Failed to generate URL: {str(e)}", status=500)
     except Exception as e:
-        return make_response(error=True, message=f"Unexpected error: {str(e)}", status=500)
\ No newline at end of file
+        return make_response(error=True, message=f"Unexpected error: {str(e)}", status=500)
+
+
+@s3_bp.route("/access/batch", methods=["POST"])
+def get_file_urls():
+    """
+    Pre-signed URLs for many S3 URIs in one call (utils/signedUrls.py).
+
+    Expected Body (JSON):
+        { "s3_uris": ["s3://.../uploads/a.jpg", ...], "rendition": "thumb" (optional),
+          "verify": false (optional, true checks every object with head_object) }
+
+    Returns:
+        { "urls": {s3_uri: url}, "errors": {s3_uri: message} }
+    """
+    try:
+        data = request.get_json(silent=True) or {}
+        uris = data.get("s3_uris")
+        if not isinstance(uris, list) or not uris:
+            return make_response(error=True, message="s3_uris must be a non-empty list", status=400)
+        if len(uris) > SIGN_BATCH_LIMIT:
+            return make_response(error=True, message=f"At most {SIGN_BATCH_LIMIT} URIs per request", status=400)
+
+        try:
+            rendition_key("", data.get("rendition"))
+        except ValueError as ve:
+            return make_response(error=True, message=str(ve), status=400)
+
+        urls, errors = sign_many(uris, data.get("rendition"), bool(data.get("verify")))
+        return make_response(
+            error=not urls,
+            message="Pre-signed URLs generated successfully" if urls else "No URL could be generated",
+            result={"urls": urls, "errors": errors},
+            status=200 if urls else 400
+        )
+
+    except Exception as e:
+        return make_response(error=True, message=f"Unexpected error: {str(e)}", status=500)
@@ -10,6 +10,10 @@ from models.village import Logs
 from utils.tokenAuth import auth_required
 from models.counters import get_next_family_id, get_next_family_update_id, get_next_member_update_id
 from utils.helpers import authorizationDD, make_response, nowIST, validation_error_response
+from utils.pagination import cursor_headers, paginate
+from utils.search import HIDE_SEARCH_KEYS, search_filter, set_search_keys, with_search_keys
+from utils.validation import validate_batch
+from utils.villageStats import mark_village_stats_stale
 from models.family import Family, FamilyCard, FamilyComplete, FamilyUpdate, Member, StatusHistory, Updates, UpdatesInsert, UpdatesUpdate
 from config import JWT_EXPIRE_MIN, db
 
@@ -38,15 +42,13 @@ def get_beneficiaries(village_id):
         option_id = request.args.get("optionId")
         name=request.args.get("mukhiyaName")
         havePlot = request.args.get("havePlot")  # "true" | "false" | None
-        page = int(request.args.get("page", 1))
-        limit = int(request.args.get("limit", 15))
 
         # -------- Build Query --------
         q = {"villageId": village_id}
         if option_id:
             q["relocationOption"] = option_id
         if name:
-            q["mukhiyaName"] = {"$regex": name, "$options": "i"}
+            q.update(search_filter("mukhiyaName", name, request.args.get("match")))
         # ✅ havePlot filter
         if havePlot is not None:
             if havePlot.lower() == "false":
@@ -61,23 +63,19 @@ def get_beneficiaries(village_id):
             "mukhiyaPhoto": 1,
             "relocationOption": 1,
         }
-        skip = (page - 1) * limit
-
-
-        cursor = (
-            families.find(q, projection)
-            .sort("mukhiyaName", ASCENDING)
-            .skip(skip)
-            .limit(limit)
-        )
-
-        # -------- Transform Results --------
-        results = list(cursor)  # just return as is
+        try:
+            results, page_info = paginate(families, q, projection, [("mukhiyaName", ASCENDING)], request.args)
+        except ValueError as ve:
+            return make_response(True, str(ve), status=400)
 
         if not results:
             return make_response(False, "No beneficiaries found for given village and option", result=[], status=200)
 
-        return make_response(False, "Beneficiaries fetched successfully", result=results, status=200)
+        # result stays a bare list for existing clients; cursors go in X-Next-Cursor / X-Prev-Cursor
+        return cursor_headers(
+            make_response(False, "Beneficiaries fetched successfully", result=results, status=200),
+            page_info
+        )
 
     except Exception as e:
         logging.error(f"Unexpected error in get_beneficiaries: {str(e)}")
@@ -91,7 +89,7 @@ def get_family_data(family_id):
             return make_response(True, "Invalid or missing family_id", status=400)
 
         # Fetch whole doc except Mongo _id
-        f = families.find_one({"familyId": family_id}, {"_id": 0})
+        f = families.find_one({"familyId": family_id}, {"_id": 0, **HIDE_SEARCH_KEYS})
         if not f:
             return make_response(True, "Family not found",  result=[],status=404)
 
@@ -124,52 +122,48 @@ def bulk_insert_families(decoded_data):
             return make_response(True, "'families' must be a list", status=400)
 
         inserted, skipped, errors_list = [], [], []
+        touched_villages = set()
 
+        forbidden_fields = {"updates", "currentStage", "statusHistory","stagesCompleted"}
+        candidates = []
         for fam in families_data:
+            if isinstance(fam, dict) and any(f in fam for f in forbidden_fields):
+                errors_list.append({
+                    "familyId": fam.get("mukhiyaName"),
+                    "error": f"Fields {forbidden_fields} not allowed at insert"
+                })
+            else:
+                candidates.append(fam)
+
+        # ✅ Validate & normalize the whole batch in one call, then report failures per family
+        valid, invalid = validate_batch(Family, candidates)
+        for index, item_errors in invalid.items():
+            fam = candidates[index]
+            errors_list.append({
+                "familyId": fam.get("mukhiyaName") if isinstance(fam, dict) else None,
+                "error": [str(error) for error in item_errors]
+            })
+
+        for index, family_obj in valid.items():
             try:
-                forbidden_fields = {"updates", "currentStage", "statusHistory","stagesCompleted"}
-                if any(f in fam for f in forbidden_fields):
-                    errors_list.append({
-                        "familyId": fam.get("mukhiyaName"),
-                        "error": f"Fields {forbidden_fields} not allowed at insert"
-                    })
-                    continue
-
-                # ✅ Validate & normalize via Pydantic
-                family_obj = Family(**fam)
-                members_complete = [
-                    Member(
-                        **m.model_dump(),
-                    )
-                    for m in family_obj.members
-                ]
                 # generate ID
                 new_family_id = get_next_family_id(db, family_obj.villageId)
 
-                # combine family data + ID
-                fam_complete = FamilyComplete(
-                    familyId=new_family_id,
-                    currentStage="INIT",
-                    stagesCompleted=[],
-                    members=members_complete,
-                    **family_obj.model_dump(exclude={"members"}, exclude_none=True)
-                )
-                families.insert_one(fam_complete.model_dump(exclude_none=True))                
+                # combine family data + ID: the FamilyComplete document, without validating family_obj again
+                fam_complete = {
+                    **family_obj.model_dump(exclude_none=True),
+                    "familyId": new_family_id,
+                    "currentStage": "INIT",
+                    "stagesCompleted": [],
+                }
+                families.insert_one(with_search_keys(fam_complete, "mukhiyaName"))
                 inserted.append(new_family_id)
+                touched_villages.add(family_obj.villageId)
 
-            except ValidationError as ve:
-                error_messages = [str(error) for error in ve.errors()]
-
+            except errors.PyMongoError as e:
                 errors_list.append({
-                    "familyId": fam.get("mukhiyaName"),
-                    "error": error_messages
-                })
-            except Exception as e:
-                error_messages = [str(error) for error in ve.errors()]
-
-                errors_list.append({
-                    "familyId": fam.get("mukhiyaName"),
-                    "error": error_messages
+                    "familyId": family_obj.mukhiyaName,
+                    "error": str(e)
                 })
 
         summary = {
@@ -189,6 +183,7 @@ def bulk_insert_families(decoded_data):
 
         # Insert into DB
         logs.insert_one(log.model_dump())
+        mark_village_stats_stale(*touched_villages)
 
         return make_response(False, "Bulk insert completed", result=summary, status=200)
 
@@ -240,7 +235,7 @@ def insert_family(decoded_data):
         )
 
         # ✅ Insert into MongoDB
-        families.insert_one(fam_complete.model_dump(exclude_none=True))
+        families.insert_one(with_search_keys(fam_complete.model_dump(exclude_none=True), "mukhiyaName"))
         log=Logs(
             userId=decoded_data.get("userId"),
             updateTime=nowIST(),
@@ -253,6 +248,7 @@ def insert_family(decoded_data):
 
         # Insert into DB
         logs.insert_one(log.model_dump())
+        mark_village_stats_stale(family_obj.villageId)
         return make_response(
             False,
             f"Family {new_family_id} inserted successfully",
@@ -286,6 +282,7 @@ def delete_all_families(decoded_data):
 
         # Insert into DB
         logs.insert_one(log.model_dump())
+        mark_village_stats_stale()
         return make_response(
             False,
             f"Deleted {result.deleted_count} families",
@@ -305,8 +302,8 @@ def delete_family(decoded_data,family_id):
         if error:
             return make_response(True, message=error["message"], status=error["status"])
 
-        result = families.delete_one({"familyId": family_id})
-        if result.deleted_count == 0:
+        deleted = families.find_one_and_delete({"familyId": family_id}, projection={"_id": 0, "villageId": 1})
+        if not deleted:
             return make_response(True, f"Family {family_id} not found", status=404)
         log=Logs(
             userId=decoded_data.get("userId"),
@@ -320,6 +317,7 @@ def delete_family(decoded_data,family_id):
 
         # Insert into DB
         logs.insert_one(log.model_dump())
+        mark_village_stats_stale(deleted.get("villageId"))
         return make_response(False, f"Family {family_id} deleted successfully", status=200)
     except errors.PyMongoError as e:
         return make_response(True, f"Database error: {str(e)}", status=500)
@@ -354,12 +352,13 @@ def update_family(decoded_data,family_id):
             return make_response(True, "No valid fields to update", status=400)
 
         # ✅ Update MongoDB
-        result = families.update_one(
+        before = families.find_one_and_update(
             {"familyId": family_id},
-            {"$set": update_dict}
+            {"$set": set_search_keys(update_dict, "mukhiyaName")},
+            projection={"_id": 0, "villageId": 1},
         )
 
-        if result.matched_count == 0:
+        if not before:
             return make_response(True, f"Family {family_id} not found", status=404)
         log=Logs(
             userId=decoded_data.get("userId"),
@@ -373,6 +372,7 @@ def update_family(decoded_data,family_id):
 
         # Insert into DB
         logs.insert_one(log.model_dump())
+        mark_village_stats_stale(before.get("villageId"), update_dict.get("villageId"))
         return make_response(
             False,
             f"Family {family_id} updated successfully",
@@ -3,6 +3,8 @@ from flask import Flask, Blueprint,request
 
 from utils.tokenAuth import auth_required
 from utils.helpers import authorizationDD, make_response
+from utils.pagination import paginate
+from utils.counts import count_for
 from config import db
 
 import logging
@@ -35,12 +37,6 @@ def get_logs(decoded_data):
         to_date = args.get("toDate")
         relatedId=args.get("relatedId")
 
-        page = int(args.get("page", 1))
-        limit = int(args.get("limit", 20))
-
-        if page < 1 or limit < 1:
-            return make_response(True, "Invalid pagination values", status=400)
-
         # ---- Build query ----
         query = {}
 
@@ -65,27 +61,24 @@ def get_logs(decoded_data):
             query["updateTime"] = date_filter
 
         # ---- Pagination ----
-        skip = (page - 1) * limit
-
         projection = {"_id": 0}
 
-        cursor = (
-            logs.find(query, projection)
-            .sort("updateTime", -1)
-            .skip(skip)
-            .limit(limit)
-        )
-
-        items = list(cursor)
-        total_count = logs.count_documents(query)
+        try:
+            items, page_info = paginate(logs, query, projection, [("updateTime", -1)], args, default_limit=20)
+            total = count_for(logs, query, args)
+        except ValueError as ve:
+            return make_response(True, str(ve), status=400)
 
         return make_response(
             False,
             "Logs fetched successfully",
             result={
-                "count": total_count,
-                "page": page,
-                "limit": limit,
+                "count": total["count"],
+                "countIsLowerBound": total["countIsLowerBound"],
+                "page": page_info["page"],
+                "limit": page_info["limit"],
+                "next": page_info["next"],
+                "prev": page_info["prev"],
                 "items": items,
             }
         )
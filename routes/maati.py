@@ -2,6 +2,7 @@ import logging
 from flask import Blueprint
 from pydantic import ValidationError
 from utils.helpers import make_response
+from utils.responseCache import cached_response
 from config import db
 from models.maati import (
     GuidelinesModel,
@@ -26,6 +27,7 @@ PAGE_REGISTRY = {
 
 
 @maati_bp.route("/<page_key>", methods=["GET"])
+@cached_response("maati")
 def get_static_page(page_key):
     try:
         model = PAGE_REGISTRY.get(page_key)
@@ -10,6 +10,9 @@ from utils.tokenAuth import auth_required
 from models.counters import get_next_meeting_id
 from models.meeting import Meeting, MeetingInsert, MeetingUpdate
 from utils.helpers import authorization, make_response, nowIST
+from utils.pagination import paginate
+from utils.counts import count_for, invalidate_counts
+from utils.search import HIDE_SEARCH_KEYS, search_filter, set_search_keys, with_search_keys
 from models.family import Family, FamilyCard, FamilyUpdate
 from config import JWT_EXPIRE_MIN, db
 
@@ -61,7 +64,8 @@ def insert_meeting(decoded_data):
         )
 
         # Insert into DB
-        meetings.insert_one(meeting_record.model_dump(exclude_none=True))
+        meetings.insert_one(with_search_keys(meeting_record.model_dump(exclude_none=True), "venue"))
+        invalidate_counts(meetings.name)
         logs.insert_one(log.model_dump())
 
         return make_response(
@@ -98,6 +102,7 @@ def delete_meeting(decoded_data,meeting_id):
 
         # ✅ Attempt deletion
         result = db.meetings.delete_one({"meetingId": meeting_id, "heldBy": held_by.strip()})
+        invalidate_counts(meetings.name)
 
         if result.deleted_count == 0:
             # Could be meeting does not exist or heldBy does not match
@@ -158,8 +163,9 @@ def update_meeting(decoded_data,meeting_id):
         # Update only if the meeting exists AND heldBy matches
         result = db.meetings.update_one(
             {"meetingId": meeting_id, "heldBy": held_by},
-            {"$set": update_dict}
+            {"$set": set_search_keys(update_dict, "venue")}
         )
+        invalidate_counts(meetings.name)
 
         if result.matched_count == 0:
             return make_response(
@@ -202,15 +208,12 @@ def get_meetings(decoded_data, villageId):
         venue = args.get("venue")
         heldBy = args.get("heldBy")
 
-        page = int(args.get("page", 1))
-        limit = int(args.get("limit", 15))
-
         # Build query
         query = {"villageId": villageId}
         if heldBy:
             query["heldBy"] = heldBy
         if venue:
-            query["venue"] = {"$regex": venue, "$options": "i"}  # ✅ allows partial match (e.g. "school")
+            query.update(search_filter("venue", venue, args.get("match")))  # ✅ matches any word start (e.g. "school")
 
         # Date filtering
         if from_date or to_date:
@@ -221,18 +224,12 @@ def get_meetings(decoded_data, villageId):
                 date_filter["$lte"] = to_date
             query["time"] = date_filter
 
-        projection = {"_id": 0}
-        skip = (page - 1) * limit
-
-        cursor = (
-            meetings.find(query, projection)
-            .sort("time", -1)
-            .skip(skip)
-            .limit(limit)
-        )
-
-        update_items = list(cursor)
-        total_count = meetings.count_documents(query)
+        projection = {"_id": 0, **HIDE_SEARCH_KEYS}
+        try:
+            update_items, page_info = paginate(meetings, query, projection, [("time", -1)], args)
+            total = count_for(meetings, query, args)
+        except ValueError as ve:
+            return make_response(True, str(ve), result={"count": 0, "items": []}, status=400)
 
         if not update_items:
             return make_response(
@@ -246,9 +243,12 @@ def get_meetings(decoded_data, villageId):
             False,
             "meetings fetched successfully",
             result={
-                "count": total_count,
-                "page": page,
-                "limit": limit,
+                "count": total["count"],
+                "countIsLowerBound": total["countIsLowerBound"],
+                "page": page_info["page"],
+                "limit": page_info["limit"],
+                "next": page_info["next"],
+                "prev": page_info["prev"],
                 "items": update_items,
             },
         )
@@ -7,6 +7,8 @@ from pydantic import ValidationError
 from models.stages import OprionStageInsert,OprionStage,OprionStageUpdate,OptionInsert,OptionUpdate, Options
 from models.counters import get_next_option_id, get_next_option_stage_id, get_next_plot_id, get_next_verification_id
 from utils.helpers import make_response, validation_error_response
+from utils.responseCache import cached_response, invalidate_cache
+from utils.stageGraph import invalidate_stage_graphs
 from config import  db
 
 from pymongo import errors  
@@ -74,6 +76,8 @@ def insert_option():
 
         options.insert_one(option_dict)
 
+        invalidate_cache("options")
+        invalidate_stage_graphs(options.name)
         return make_response(
             False,
             "Option inserted successfully",
@@ -130,6 +134,8 @@ def update_option(optionId):
         #     )
         options.update_one({"optionId": str(optionId)}, {"$set": update_dict})
 
+        invalidate_cache("options")
+        invalidate_stage_graphs(options.name)
         return make_response(False, "Option updated successfully", result=update_dict)
 
     except Exception as e:
@@ -159,6 +165,8 @@ def delete_option(optionId):
         #     {"deleted": False, "position": {"$gt": pos}},
         #     {"$inc": {"position": -1}}
         # )
+        invalidate_cache("options")
+        invalidate_stage_graphs(options.name)
         return make_response(False, "Option deleted successfully")
 
     except Exception as e:
@@ -167,6 +175,7 @@ def delete_option(optionId):
 
 # ========== GET OPTIONS ==========
 @options_BP.route("/options", methods=["GET"])
+@cached_response("options")
 def get_options():
     try:
         docs = list(options.find({"deleted": False}, {"_id": 0}))
@@ -258,6 +267,8 @@ def insert_option_stage(optionId):
             {"$set": {"stages": stages}}
         )
 
+        invalidate_cache("options")
+        invalidate_stage_graphs(options.name)
         return make_response(False, "Option stage inserted successfully", result=stage_complete)
     except Exception as e:
         return make_response(True, f"Error inserting option stage: {str(e)}", status=500)
@@ -312,6 +323,8 @@ def update_option_stage(optionId, stageId):
                 {"optionId": optionId},
                 {"$set": {"stages": stages_}}
             )
+        invalidate_cache("options")
+        invalidate_stage_graphs(options.name)
         return make_response(False, "Option stage updated successfully", result=update_dict)
     except Exception as e:
         return make_response(True, f"Error updating option stage: {str(e)}", status=500)
@@ -327,6 +340,8 @@ def delete_option_stage(optionId, stageId):
         if result.matched_count == 0:
             return make_response(True, "Stage not found", status=404)
 
+        invalidate_cache("options")
+        invalidate_stage_graphs(options.name)
         return make_response(False, "Option stage deleted successfully")
     except Exception as e:
         return make_response(True, f"Error deleting option stage: {str(e)}", status=500)
@@ -0,0 +1,62 @@
+"""
+Every blueprint the app serves, in registration order.
+
+backend.py imports and registers them from this table; set
+ENABLED_BLUEPRINTS / DISABLED_BLUEPRINTS (comma-separated names) to run a
+worker with a subset, e.g. DISABLED_BLUEPRINTS=ai for workers that never
+serve /ai/*. `python scripts/profile_imports.py` reports the import cost of
+each entry.
+"""
+
+import importlib
+import os
+
+# name -> (module, blueprint attribute, url_prefix)
+BLUEPRINTS = {
+    "auth": ("routes.auth", "auth_bp", "/"),
+    "village": ("routes.village", "village_bp", "/"),
+    "family": ("routes.family", "family_bp", "/"),
+    "maati": ("routes.maati", "maati_bp", "/"),
+    "meeting": ("routes.meeting", "meeting_bp", "/"),
+    "building": ("routes.admin.community", "building_bp", "/"),
+    "plotsVerification": ("routes.app.plotsVerification", "plots_verification_BP", "/"),
+    "plots": ("routes.app.plots", "plots_BP", "/"),
+    "options": ("routes.options", "options_BP", "/"),
+    "employee": ("routes.admin.employee", "emp_bp", "/"),
+    "villageStages": ("routes.admin.villageStages", "villageStages_BP", "/"),
+    "optionVerification": ("routes.app.optionStageVerification", "option_verification_BP", "/"),
+    "analytics": ("routes.admin.analytics", "analytics_BP", "/"),
+    "document": ("routes.document", "s3_bp", "/"),
+    "feedback": ("routes.complaints", "feedback_bp", "/"),
+    "materials": ("routes.admin.material", "materials_bp", "/"),
+    "materialUpdates": ("routes.app.materialUpdates", "material_updates_bp", "/"),
+    "facilityVerification": ("routes.app.facilityVerification", "facility_verifications_bp", "/"),
+    "facilities": ("routes.admin.facilities", "facilities_bp", "/"),
+    "approvals": ("routes.app.approvals", "approvals_bp", "/"),
+    "admin": ("routes.admin.admin", "admin_BP", "/admin"),
+    "logs": ("routes.logs", "logs_bp", "/"),
+    "ai": ("routes.ai_agent", "ai_bp", "/"),
+}
+
+
+def _names_from_env(var: str) -> set:
+    return {n.strip() for n in os.getenv(var, "").split(",") if n.strip()}
+
+
+def enabled_blueprints() -> list:
+    enabled = _names_from_env("ENABLED_BLUEPRINTS") or set(BLUEPRINTS)
+    disabled = _names_from_env("DISABLED_BLUEPRINTS")
+    unknown = (enabled | disabled) - set(BLUEPRINTS)
+    if unknown:
+        raise ValueError(f"Unknown blueprints: {', '.join(sorted(unknown))}")
+    return [name for name in BLUEPRINTS if name in enabled and name not in disabled]
+
+
+def register_blueprints(app, names=None) -> list:
+    """Import and register the selected blueprints; returns their names."""
+    names = names if names is not None else enabled_blueprints()
+    for name in names:
+        module, attr, prefix = BLUEPRINTS[name]
+        blueprint = getattr(importlib.import_module(module), attr)
+        app.register_blueprint(blueprint, url_prefix=prefix)
+    return names
@@ -6,6 +6,7 @@ from pydantic import ValidationError
 from pymongo import  ASCENDING, DESCENDING
 from models.counters import get_next_village_id
 from utils.helpers import make_response, nowIST, validation_error_response
+from utils.responseCache import cached_response, invalidate_cache
 from models.village import FamilyCount, SubStage, Village, VillageCard, VillageDocComplete, VillageDocInsert, VillageDocUpdate
 from config import JWT_EXPIRE_MIN, db
 
@@ -13,6 +14,7 @@ import logging
 
 users = db.users
 villages = db.villages
+village_updates = db.villageUpdates
 stages = db.stages
 families = db.families
 
@@ -34,6 +36,7 @@ def validate_user_ids(user_ids: list):
     return len(invalid_ids) == 0, invalid_ids
 
 @village_bp.route("/villages", methods=["GET"])
+@cached_response("villages")
 def get_all_villages():
     try:
         projection = {
@@ -76,6 +79,7 @@ def get_all_villages():
         }), 500
 
 @village_bp.route("/villagesId", methods=["GET"])
+@cached_response("villages")
 def get_all_villages_ids():
     try:
         projection = {
@@ -154,8 +158,10 @@ def add_village():
             delete=False
         )
 
-        villages.insert_one(complete_doc.model_dump(exclude_none=True))
+        # stage updates live in the villageUpdates collection
+        villages.insert_one(complete_doc.model_dump(exclude_none=True, exclude={"updates"}))
 
+        invalidate_cache("villages")
         return make_response(
             False,
             "Village inserted successfully",
@@ -212,6 +218,7 @@ def update_village(village_id):
         if result.matched_count == 0:
             return make_response(True, f"Village {village_id} not found", status=404)
 
+        invalidate_cache("villages")
         return make_response(
             False,
             "Village updated successfully",
@@ -243,6 +250,7 @@ def soft_delete_village(village_id):
         if result.matched_count == 0:
             return make_response(True, f"Village {village_id} not found or already deleted", status=404)
 
+        invalidate_cache("villages")
         return make_response(
             False,
             f"Village {village_id} deleted successfully",
@@ -260,7 +268,9 @@ def hard_delete_village(village_id):
 
         if result.deleted_count == 0:
             return make_response(True, f"Village {village_id} not found", status=404)
+        village_updates.delete_many({"villageId": village_id})
 
+        invalidate_cache("villages")
         return make_response(
             False,
             f"Village {village_id} hard deleted successfully",
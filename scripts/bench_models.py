@@ -0,0 +1,188 @@
+"""
+Validation cost of the pydantic models, per model.
+
+Every BaseModel in models/ gets a valid sample payload (FIELD_SAMPLES for the
+fields whose validators need realistic values, a value per annotation for
+the rest) and the script times, best of 3:
+
+- validate: `Model.model_validate(payload)`, what `Model(**payload)` costs a route
+- dump:     `instance.model_dump()`
+
+For the models posted as lists (BULK_MODELS) it also times a batch of
+--batch items validated one by one (`[Model(**item) for item in items]`)
+against `utils.validation.validate_batch()`, the single call the bulk
+endpoints use.
+
+Run from inside villageRelocation/:
+
+    python scripts/bench_models.py                     # every model
+    python scripts/bench_models.py Family UserInsert   # only these models
+    python scripts/bench_models.py --batch 1000 --json # bigger batches, machine-readable
+"""
+
+import argparse
+import copy
+import enum
+import importlib
+import inspect
+import json
+import os
+import pkgutil
+import sys
+import timeit
+import typing
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT_DIR not in sys.path:
+    sys.path.insert(0, ROOT_DIR)
+
+from pydantic import AnyUrl, BaseModel, ValidationError
+
+from utils.validation import validate_batch
+
+# models whose payloads arrive as lists: /families/bulk and /employee/bulk
+BULK_MODELS = ["Family", "UserInsert"]
+
+UPLOAD_URI = "s3://village-relocation/uploads/0f8fad5b-d9cb-469f-a165-70867728950e.jpg"
+FIELD_SAMPLES = {
+    "docs": [UPLOAD_URI] * 4 + ["https://example.org/report.pdf"],
+    "photos": [UPLOAD_URI] * 3,
+    "mukhiyaPhoto": UPLOAD_URI,
+    "photo": UPLOAD_URI,
+    "mukhiyaAge": "52",
+    "mukhiyaGender": "male",
+    "age": 34,
+    "gender": "female",
+    "lat": 22.5726,
+    "long": 80.3639,
+    "type": "house",
+    "email": "guard@example.org",
+    "mobile": "9876543210",
+    "villageID": ["VILL_1", "VILL_2"],
+    "attendees": ["UID_1", "UID_2", "UID_3"],
+    "heldBy": "UID_1",
+}
+LIST_LENGTH = 3
+
+
+def model_classes(only=None) -> list:
+    """(module, class) for every BaseModel defined in models/."""
+    found = []
+    for _, name, _ in sorted(pkgutil.iter_modules([os.path.join(ROOT_DIR, "models")])):
+        module = importlib.import_module(f"models.{name}")
+        for _, cls in inspect.getmembers(module, inspect.isclass):
+            if issubclass(cls, BaseModel) and cls.__module__ == module.__name__:
+                if not only or cls.__name__ in only:
+                    found.append((name, cls))
+    return found
+
+
+def _required_type(annotation):
+    """`X` for Optional[X]."""
+    if typing.get_origin(annotation) is typing.Union:
+        return next(arg for arg in typing.get_args(annotation) if arg is not type(None))
+    return annotation
+
+
+def _typed(annotation) -> bool:
+    """Literal, Enum and model fields (or lists of them) take their sample from the annotation."""
+    annotation = _required_type(annotation)
+    if typing.get_origin(annotation) in (list, set, tuple) and typing.get_args(annotation):
+        annotation = typing.get_args(annotation)[0]
+    return typing.get_origin(annotation) is typing.Literal or (
+        inspect.isclass(annotation) and issubclass(annotation, (enum.Enum, BaseModel))
+    )
+
+
+def sample_value(annotation):
+    annotation = _required_type(annotation)
+    origin, args = typing.get_origin(annotation), typing.get_args(annotation)
+    if origin is typing.Literal:
+        return args[0]
+    if origin in (list, set, tuple):
+        return [sample_value(args[0]) for _ in range(LIST_LENGTH)] if args else []
+    if origin is dict:
+        return {}
+    if inspect.isclass(annotation):
+        if issubclass(annotation, enum.Enum):
+            return next(iter(annotation)).value
+        if issubclass(annotation, BaseModel):
+            return sample_payload(annotation)
+        if issubclass(annotation, AnyUrl):
+            return "https://example.org/"
+        if issubclass(annotation, bool):
+            return True
+        if issubclass(annotation, (int, float)):
+            return annotation(1)
+    return "sample"
+
+
+def sample_payload(cls) -> dict:
+    """Required fields plus every field with a FIELD_SAMPLES entry, keyed by alias."""
+    payload = {}
+    for name, field in cls.model_fields.items():
+        if name in FIELD_SAMPLES and not _typed(field.annotation):
+            payload[field.alias or name] = copy.deepcopy(FIELD_SAMPLES[name])
+        elif field.is_required():
+            payload[field.alias or name] = sample_value(field.annotation)
+    return payload
+
+
+def per_call(fn) -> float:
+    """Seconds per call, best of 3 runs of at least 0.2 s each."""
+    timer = timeit.Timer(fn)
+    number, _ = timer.autorange()
+    return min(timer.repeat(3, number)) / number
+
+
+def bench(cls, batch: int) -> dict:
+    payload = sample_payload(cls)
+    try:
+        instance = cls.model_validate(payload)
+    except ValidationError as e:
+        return {"model": cls.__name__, "error": f"sample rejected: {e.errors()[0]['msg']}"}
+
+    row = {
+        "model": cls.__name__,
+        "validate_us": per_call(lambda: cls.model_validate(payload)) * 1e6,
+        "dump_us": per_call(instance.model_dump) * 1e6,
+    }
+    if cls.__name__ in BULK_MODELS:
+        items = [copy.deepcopy(payload) for _ in range(batch)]
+        row["loop_ms"] = per_call(lambda: [cls(**item) for item in items]) * 1e3
+        row["batch_ms"] = per_call(lambda: validate_batch(cls, items)) * 1e3
+    return row
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("models", nargs="*", help="model class names (default: all)")
+    parser.add_argument("--batch", type=int, default=500, help="items per bulk payload (default 500)")
+    parser.add_argument("--json", action="store_true", help="print the rows as JSON")
+    args = parser.parse_args()
+
+    rows = []
+    for module, cls in model_classes(set(args.models)):
+        row = bench(cls, args.batch)
+        row["module"] = module
+        rows.append(row)
+
+    if args.json:
+        print(json.dumps(rows, indent=2))
+        return
+
+    print(f"{'model':<44}{'validate µs':>12}{'dump µs':>10}   bulk ({args.batch} items)")
+    for row in rows:
+        name = f"{row['module']}.{row['model']}"
+        if "error" in row:
+            print(f"{name:<44}  {row['error']}")
+            continue
+        line = f"{name:<44}{row['validate_us']:>12.1f}{row['dump_us']:>10.1f}"
+        if "batch_ms" in row:
+            line += (f"   loop {row['loop_ms']:.2f} ms, batch {row['batch_ms']:.2f} ms"
+                     f" ({row['loop_ms'] / row['batch_ms']:.2f}x)")
+        print(line)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,53 @@
+"""
+Materializes monthly `logs` rollups into `logs_monthly` for the analytics
+activity endpoints. Safe to run repeatedly (e.g. nightly from cron); the
+endpoints also build missing closed months lazily on first read.
+
+Run from inside villageRelocation/:
+
+    python scripts/build_activity_rollups.py                     # build missing closed months (last 12)
+    python scripts/build_activity_rollups.py --from 2025-01      # build missing months from 2025-01
+    python scripts/build_activity_rollups.py --from 2025-01 --rebuild   # re-aggregate even if built
+"""
+
+import argparse
+import os
+import sys
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT_DIR not in sys.path:
+    sys.path.insert(0, ROOT_DIR)
+
+from utils.activityRollup import BUILT, build_month, current_month, is_valid_month, logs_monthly_built, months_between
+from utils.helpers import get_last_12_months_bounds
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--from", dest="from_month", help="first month to build (YYYY-MM)")
+    parser.add_argument("--rebuild", action="store_true", help="re-aggregate months that are already built")
+    args = parser.parse_args()
+
+    from_month = args.from_month or get_last_12_months_bounds()[0][:7]
+    if not is_valid_month(from_month):
+        raise SystemExit("--from must be YYYY-MM")
+
+    open_month = current_month()
+    months = [m for m in months_between(from_month, open_month) if m < open_month]
+    built = {d["_id"] for d in logs_monthly_built.find({"_id": {"$in": months}, **BUILT}, {"_id": 1})}
+
+    for month in months:
+        if month in built and not args.rebuild:
+            print(f"[skip] {month}: already built")
+            continue
+        rows = build_month(month, rebuild=args.rebuild)
+        if rows is None:
+            print(f"[busy] {month}: being built by another process")
+            continue
+        print(f"[ok]   {month}: {rows} rollup rows")
+
+    print("Activity rollups up to date.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,61 @@
+"""
+Backfills `searchKeys` (utils/search.py) on documents written before name
+search keys existed, or after changing the normalization / SEARCH_NGRAMS.
+
+Run from inside villageRelocation/:
+
+    python scripts/build_search_keys.py                  # only documents without searchKeys
+    python scripts/build_search_keys.py --rebuild        # recompute every document
+    python scripts/build_search_keys.py testing house    # limit to these collections
+"""
+
+import argparse
+import os
+import sys
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT_DIR not in sys.path:
+    sys.path.insert(0, ROOT_DIR)
+
+from pymongo import UpdateOne
+
+from config import db
+from utils.search import SEARCH_FIELDS, with_search_keys
+
+BATCH_SIZE = 500
+
+
+def backfill(name: str, fields: list, rebuild: bool) -> int:
+    query = {} if rebuild else {"searchKeys": {"$exists": False}}
+    projection = {field: 1 for field in fields}
+    ops, updated = [], 0
+
+    for doc in db[name].find(query, projection):
+        keys = with_search_keys(doc, *fields)["searchKeys"]
+        ops.append(UpdateOne({"_id": doc["_id"]}, {"$set": {"searchKeys": keys}}))
+        if len(ops) >= BATCH_SIZE:
+            updated += db[name].bulk_write(ops, ordered=False).modified_count
+            ops = []
+    if ops:
+        updated += db[name].bulk_write(ops, ordered=False).modified_count
+    return updated
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rebuild", action="store_true", help="recompute keys on every document")
+    parser.add_argument("collections", nargs="*", help="limit to these collections")
+    args = parser.parse_args()
+
+    for name in args.collections or SEARCH_FIELDS:
+        if name not in SEARCH_FIELDS:
+            print(f"[skip] {name}: no search fields")
+            continue
+        updated = backfill(name, SEARCH_FIELDS[name], args.rebuild)
+        print(f"[ok]   {name}: {updated} documents updated")
+
+    print("Search keys up to date.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,46 @@
+"""
+Rebuilds the materialized `village_stats` documents (utils/villageStats.py)
+served by GET /analytics/village/<villageId>/stats. The endpoint rebuilds a
+stale document on read; running this periodically (e.g. from cron) keeps
+dashboard reads from ever paying for the aggregations.
+
+Run from inside villageRelocation/:
+
+    python scripts/build_village_stats.py               # every village
+    python scripts/build_village_stats.py --stale       # only villages marked stale
+    python scripts/build_village_stats.py V001 V002     # only these villages
+"""
+
+import argparse
+import os
+import sys
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT_DIR not in sys.path:
+    sys.path.insert(0, ROOT_DIR)
+
+from config import db
+from utils.villageStats import build_village_stats, village_stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("villages", nargs="*", help="limit to these villageIds")
+    parser.add_argument("--stale", action="store_true", help="only rebuild documents marked stale (or missing)")
+    args = parser.parse_args()
+
+    village_ids = args.villages or [v["villageId"] for v in db.villages.find({}, {"_id": 0, "villageId": 1})]
+    if args.stale:
+        fresh = {d["_id"] for d in village_stats.find({"_id": {"$in": village_ids}, "stale": False}, {"_id": 1})}
+        village_ids = [v for v in village_ids if v not in fresh]
+
+    for village_id in village_ids:
+        stats = build_village_stats(village_id)
+        print(f"[ok]   {village_id}: {stats['families']['total']} families, "
+              f"{stats['plots']['total']} plots, {stats['houses']['total']} houses")
+
+    print(f"{len(village_ids)} village stats rebuilt.")
+
+
+if __name__ == "__main__":
+    main()
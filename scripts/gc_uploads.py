@@ -0,0 +1,156 @@
+"""
+Deletes uploaded objects that no document references any more.
+
+Files uploaded for abandoned or failed submissions stay in `uploads/` forever.
+This job:
+
+1. streams every document of the collections in REFERENCING_COLLECTIONS and
+   collects the upload URIs they contain (docs, photos, mukhiyaPhoto,
+   members, home details, ...) into a compact set of 16-byte upload ids
+2. adds uploads still pending in the `uploads` collection (presigned, not
+   yet completed)
+3. lists the bucket under uploads/ page by page and deletes objects that are
+   unreferenced and older than the grace period, with `delete_objects`
+   batches of up to 1000 keys
+
+Image renditions (`<key>.thumb.jpg`, `<key>.model.jpg`) share the id of
+their image, so they live and die with it. Multipart uploads left unfinished
+for longer than the grace period are aborted too.
+
+Run from inside villageRelocation/:
+
+    python scripts/gc_uploads.py --dry-run         # report only
+    python scripts/gc_uploads.py                   # delete orphans older than 7 days
+    python scripts/gc_uploads.py --grace-days 30
+"""
+
+import argparse
+import datetime as dt
+import os
+import sys
+import uuid
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT_DIR not in sys.path:
+    sys.path.insert(0, ROOT_DIR)
+
+from config import BUCKET_NAME, db, s3_client
+from utils.uploads import DELETE_BATCH, UPLOAD_PREFIX, delete_keys
+
+# collections whose documents may reference uploads (families live in `testing`)
+REFERENCING_COLLECTIONS = [
+    "testing", "plots", "house", "plotUpdates", "optionUpdates", "materialUpdates",
+    "facilityUpdates", "feedback", "villages", "villageUpdates", "meetings",
+]
+SKIP_FIELDS = {"_id": 0, "searchKeys": 0, "statusHistory": 0}
+
+
+
+def upload_id(key: str):
+    """
+    Compact id of an upload key: the 16 bytes of its uuid. Renditions map to
+    their image's id; keys not named by uuid fall back to the key itself.
+    """
+    name = key[len(UPLOAD_PREFIX):] if key.startswith(UPLOAD_PREFIX) else key
+    try:
+        return uuid.UUID(name.split(".", 1)[0]).bytes
+    except ValueError:
+        return key
+
+
+def _collect(value, referenced: set) -> None:
+    if isinstance(value, str):
+        # s3:// URIs, and to be safe any https URL of the bucket as well
+        if BUCKET_NAME in value and UPLOAD_PREFIX in value:
+            key = UPLOAD_PREFIX + value.split(UPLOAD_PREFIX, 1)[1].split("?", 1)[0]
+            referenced.add(upload_id(key))
+    elif isinstance(value, dict):
+        for v in value.values():
+            _collect(v, referenced)
+    elif isinstance(value, list):
+        for v in value:
+            _collect(v, referenced)
+
+
+def referenced_ids() -> set:
+    referenced = set()
+    for name in REFERENCING_COLLECTIONS:
+        before = len(referenced)
+        for doc in db[name].find({}, SKIP_FIELDS, batch_size=1000):
+            _collect(doc, referenced)
+        print(f"[refs] {name}: {len(referenced) - before} uploads")
+
+    pending = 0
+    for record in db.uploads.find({"status": "pending"}, {"_id": 1}):
+        referenced.add(upload_id(record["_id"]))
+        pending += 1
+    print(f"[refs] pending direct uploads: {pending}")
+    return referenced
+
+
+def orphaned_objects(referenced: set, cutoff: dt.datetime):
+    """Yields (key, size) of unreferenced objects last modified before `cutoff`."""
+    paginator = s3_client.get_paginator("list_objects_v2")
+    for page in paginator.paginate(Bucket=BUCKET_NAME, Prefix=UPLOAD_PREFIX):
+        for obj in page.get("Contents", []):
+            if obj["LastModified"] < cutoff and upload_id(obj["Key"]) not in referenced:
+                yield obj["Key"], obj["Size"]
+
+
+def abort_stale_multipart(cutoff: dt.datetime, dry_run: bool) -> int:
+    aborted = 0
+    paginator = s3_client.get_paginator("list_multipart_uploads")
+    for page in paginator.paginate(Bucket=BUCKET_NAME, Prefix=UPLOAD_PREFIX):
+        for upload in page.get("Uploads", []):
+            if upload["Initiated"] < cutoff:
+                if not dry_run:
+                    s3_client.abort_multipart_upload(Bucket=BUCKET_NAME, Key=upload["Key"], UploadId=upload["UploadId"])
+                aborted += 1
+    return aborted
+
+
+def delete_batch(keys: list) -> list:
+    """Delete one batch of objects and their upload records; returns the keys that failed."""
+    failed = delete_keys(keys)
+    gone = set(keys) - set(failed)
+    db.uploads.delete_many({"_id": {"$in": list(gone)}})
+    return failed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--dry-run", action="store_true", help="report what would be deleted without deleting")
+    parser.add_argument("--grace-days", type=float, default=7, help="only delete objects older than this (default 7)")
+    parser.add_argument("--sample", type=int, default=20, help="orphaned keys to print in the report")
+    args = parser.parse_args()
+
+    cutoff = dt.datetime.now(dt.timezone.utc) - dt.timedelta(days=args.grace_days)
+    referenced = referenced_ids()
+    print(f"{len(referenced)} referenced uploads; deleting unreferenced objects older than {cutoff:%Y-%m-%d %H:%M} UTC.")
+
+    total, total_bytes, failed, batch = 0, 0, [], []
+    for key, size in orphaned_objects(referenced, cutoff):
+        total += 1
+        total_bytes += size
+        if total <= args.sample:
+            print(f"[{'dry' if args.dry_run else 'del'}]  {key} ({size} bytes)")
+        if args.dry_run:
+            continue
+        batch.append(key)
+        if len(batch) == DELETE_BATCH:
+            failed += delete_batch(batch)
+            batch = []
+    if batch:
+        failed += delete_batch(batch)
+
+    aborted = abort_stale_multipart(cutoff, args.dry_run)
+
+    verb = "would be deleted" if args.dry_run else "deleted"
+    print(f"{total - len(failed)} orphaned objects ({total_bytes / 1024 / 1024:.1f} MB) {verb}, "
+          f"{len(failed)} failed; {aborted} stale multipart uploads {'would be ' if args.dry_run else ''}aborted.")
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+"""
+Moves the stage updates embedded in `villages.updates` into the
+`villageUpdates` collection (one document per update, keyed by
+villageId + updateId) and removes the array from the village.
+
+Safe to re-run: updates are upserted by (villageId, updateId), so a village
+interrupted half-way is simply copied again. Create the indexes first
+(`python scripts/sync_indexes.py villageUpdates`).
+
+Run from inside villageRelocation/:
+
+    python scripts/migrate_village_updates.py             # migrate every village
+    python scripts/migrate_village_updates.py --dry-run   # only report what would move
+    python scripts/migrate_village_updates.py --keep      # copy but leave villages.updates in place
+"""
+
+import argparse
+import os
+import sys
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT_DIR not in sys.path:
+    sys.path.insert(0, ROOT_DIR)
+
+from pymongo import UpdateOne
+
+from config import db
+
+BATCH_SIZE = 500
+
+villages = db.villages
+village_updates = db.villageUpdates
+
+
+def as_document(update: dict) -> dict:
+    """Fields of the new document besides its (villageId, updateId) key."""
+    doc = {k: v for k, v in update.items() if k != "updateId"}
+    doc["deleted"] = update.get("deleted", False)
+    # embedded updates were written without insertedAt
+    doc.setdefault("insertedAt", update.get("verifiedAt"))
+    return doc
+
+
+def migrate_village(village: dict, dry_run: bool, keep: bool) -> int:
+    village_id = village["villageId"]
+    ops = [
+        UpdateOne(
+            {"villageId": village_id, "updateId": update["updateId"]},
+            {"$setOnInsert": as_document(update)},
+            upsert=True,
+        )
+        for update in village.get("updates") or []
+        if update.get("updateId")
+    ]
+    if dry_run:
+        return len(ops)
+
+    for i in range(0, len(ops), BATCH_SIZE):
+        village_updates.bulk_write(ops[i:i + BATCH_SIZE], ordered=False)
+    if not keep:
+        villages.update_one({"_id": village["_id"]}, {"$unset": {"updates": ""}})
+    return len(ops)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--dry-run", action="store_true", help="report counts without writing")
+    parser.add_argument("--keep", action="store_true", help="do not remove villages.updates after copying")
+    args = parser.parse_args()
+
+    total = 0
+    for village in villages.find({"updates": {"$exists": True}}, {"villageId": 1, "updates": 1}):
+        moved = migrate_village(village, args.dry_run, args.keep)
+        total += moved
+        print(f"[{'dry' if args.dry_run else 'ok'}]  {village['villageId']}: {moved} updates")
+
+    verb = "would move" if args.dry_run else "moved"
+    print(f"{total} updates {verb} to villageUpdates.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,52 @@
+"""
+Delivers queued notifications (OTP mails, SMS) from the `outbox` collection.
+
+Use this when the web processes run with OUTBOX_WORKER=0; several copies can
+run side by side, messages are claimed atomically.
+
+Run from inside villageRelocation/:
+
+    python scripts/outbox_worker.py           # run until interrupted
+    python scripts/outbox_worker.py --once    # deliver what is due and exit
+"""
+
+import argparse
+import logging
+import os
+import sys
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT_DIR not in sys.path:
+    sys.path.insert(0, ROOT_DIR)
+
+from utils.notifications import OUTBOX_BATCH_SIZE, OutboxWorker
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--once", action="store_true", help="deliver everything currently due, then exit")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+    worker = OutboxWorker()
+
+    if args.once:
+        total = 0
+        while True:
+            claimed = worker.run_once()
+            total += claimed
+            if claimed < OUTBOX_BATCH_SIZE:
+                break
+        for transport in worker.transports.values():
+            transport.close()
+        print(f"Processed {total} outbox messages.")
+        return
+
+    try:
+        worker.run_forever()
+    except KeyboardInterrupt:
+        worker.stop_event.set()
+
+
+if __name__ == "__main__":
+    main()
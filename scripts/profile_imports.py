@@ -0,0 +1,116 @@
+"""
+Import-time profile of the app, per blueprint.
+
+Each blueprint module is imported in a fresh interpreter with `-X importtime`,
+after the modules every blueprint shares (flask, pydantic, config, helpers)
+have been imported, so the report shows what that blueprint adds on its own
+and which packages dominate it. The `backend` row is a full cold import of
+the app.
+
+Run from inside villageRelocation/:
+
+    python scripts/profile_imports.py                 # all blueprints + backend
+    python scripts/profile_imports.py ai document     # only these blueprints
+    python scripts/profile_imports.py --top 8 --json  # more packages, machine-readable
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+from collections import defaultdict
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT_DIR not in sys.path:
+    sys.path.insert(0, ROOT_DIR)
+
+from routes.registry import BLUEPRINTS
+
+SHARED = ["flask", "flask_cors", "pydantic", "pymongo", "config", "utils.helpers", "utils.tokenAuth"]
+MARK = "--profile-imports-mark--"
+
+
+def _run(code: str) -> tuple:
+    env = {**os.environ, "PYTHONPATH": ROOT_DIR}
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        cwd=ROOT_DIR, env=env, capture_output=True, text=True,
+    )
+    return proc.returncode, proc.stderr
+
+
+def _parse(stderr: str, after_mark: bool) -> list:
+    """[(module, self_us, cumulative_us)] from -X importtime output."""
+    rows, seen_mark = [], not after_mark
+    for line in stderr.splitlines():
+        if MARK in line:
+            seen_mark = True
+            continue
+        if not seen_mark or not line.startswith("import time:") or "self [us]" in line:
+            continue
+        try:
+            _, self_us, cumulative, name = (part.strip() for part in line.replace("import time:", "|", 1).split("|"))
+            rows.append((name, int(self_us), int(cumulative)))
+        except ValueError:
+            continue
+    return rows
+
+
+def profile(module: str, baseline: bool = True, top: int = 5) -> dict:
+    if baseline:
+        code = f"import {', '.join(SHARED)}; import sys; sys.stderr.write({MARK!r} + '\\n'); import {module}"
+    else:
+        code = f"import {module}"
+    code_rc, stderr = _run(code)
+    if code_rc != 0:
+        return {"error": stderr.strip().splitlines()[-1] if stderr.strip() else f"exit {code_rc}"}
+
+    rows = _parse(stderr, after_mark=baseline)
+    by_package = defaultdict(int)
+    for name, self_us, _ in rows:
+        by_package[name.split(".")[0]] += self_us
+
+    return {
+        "ms": round(sum(self_us for _, self_us, _ in rows) / 1000, 1),
+        "modules": len(rows),
+        "top": [
+            {"package": pkg, "ms": round(us / 1000, 1)}
+            for pkg, us in sorted(by_package.items(), key=lambda kv: -kv[1])[:top]
+        ],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("blueprints", nargs="*", help="limit to these blueprint names (see routes/registry.py)")
+    parser.add_argument("--top", type=int, default=3, help="heaviest packages to list per row")
+    parser.add_argument("--json", action="store_true", help="print JSON instead of a table")
+    args = parser.parse_args()
+
+    unknown = set(args.blueprints) - set(BLUEPRINTS)
+    if unknown:
+        raise SystemExit(f"Unknown blueprints: {', '.join(sorted(unknown))}")
+
+    report = {}
+    for name in args.blueprints or BLUEPRINTS:
+        report[name] = profile(BLUEPRINTS[name][0], top=args.top)
+    if not args.blueprints:
+        report["backend"] = profile("backend", baseline=False, top=args.top)
+
+    if args.json:
+        print(json.dumps(report, indent=2))
+        return
+
+    print(f"{'blueprint':<22} {'ms':>8} {'modules':>8}  heaviest packages")
+    for name, entry in sorted(report.items(), key=lambda kv: -kv[1].get("ms", -1)):
+        if "error" in entry:
+            print(f"{name:<22} {'-':>8} {'-':>8}  error: {entry['error']}")
+            continue
+        heaviest = ", ".join(f"{t['package']} {t['ms']}ms" for t in entry["top"])
+        print(f"{name:<22} {entry['ms']:>8} {entry['modules']:>8}  {heaviest}")
+    print("\nBlueprint rows exclude the shared base (" + ", ".join(SHARED) + ").")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+"""
+Creates the indexes declared in utils/indexes.py and reports on index health.
+
+Run from inside villageRelocation/:
+
+    python scripts/sync_indexes.py              # create missing indexes
+    python scripts/sync_indexes.py --dry-run    # only list what would be created
+    python scripts/sync_indexes.py --unused     # also report unused / undeclared indexes
+    python scripts/sync_indexes.py --check      # flag route queries with no usable index (static)
+    python scripts/sync_indexes.py --explain    # flag route queries the live planner runs as COLLSCAN
+"""
+
+import argparse
+import os
+import sys
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT_DIR not in sys.path:
+    sys.path.insert(0, ROOT_DIR)
+
+from config import db
+from utils.indexes import check_query_shapes, explain_query_shapes, sync_indexes, unused_indexes
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--dry-run", action="store_true", help="do not create anything")
+    parser.add_argument("--unused", action="store_true", help="report unused and undeclared indexes")
+    parser.add_argument("--check", action="store_true", help="static check of route queries against the registry")
+    parser.add_argument("--explain", action="store_true", help="explain() every route query shape against the database")
+    parser.add_argument("collections", nargs="*", help="limit to these collections")
+    args = parser.parse_args()
+
+    failed = False
+
+    if args.check:
+        flagged = check_query_shapes()
+        for item in flagged:
+            print(f"[scan] {item['route']}: {item['collection']} on {item['fields']}")
+        print(f"Static check: {len(flagged)} route queries without a usable index.\n")
+        failed |= bool(flagged)
+        if not (args.explain or args.unused):
+            sys.exit(1 if failed else 0)
+
+    report = sync_indexes(db, collections=args.collections or None, dry_run=args.dry_run)
+    verb = "would create" if args.dry_run else "created"
+    for name, entry in report.items():
+        if entry.get("error"):
+            print(f"[err]  {name}: {entry['error']}")
+            failed = True
+        elif entry["created"]:
+            print(f"[new]  {name}: {verb} {', '.join(entry['created'])}")
+        else:
+            print(f"[ok]   {name}: {len(entry['existing'])} indexes present")
+
+    if args.unused:
+        print()
+        for name, entry in unused_indexes(db, collections=args.collections or None).items():
+            if entry["unused"]:
+                print(f"[unused]     {name}: {', '.join(entry['unused'])}")
+            if entry["undeclared"]:
+                print(f"[undeclared] {name}: {', '.join(entry['undeclared'])}")
+
+    if args.explain:
+        print()
+        flagged = explain_query_shapes(db)
+        for item in flagged:
+            print(f"[scan] {item['route']}: {item['collection']} {item.get('plan') or item.get('error')}")
+        print(f"Explain: {len(flagged)} route queries would scan.")
+        failed |= bool(flagged)
+
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,194 @@
+"""
+Monthly rollups of the `logs` collection for the analytics activity endpoints.
+
+Closed months never receive new log entries (updateTime is always "now" when a
+log is written), so each closed month is aggregated once into `logs_monthly`
+keyed by (month, villageId, userId, type, action) and read from there. The
+current, still-open month, and any closed month whose first build has not
+finished yet, are aggregated on the fly from `logs`.
+
+Months are materialized lazily on first read, or ahead of time with
+`python scripts/build_activity_rollups.py`. A request covers at most
+ACTIVITY_MAX_MONTHS months, and each month is built under a lease in
+`logs_monthly_built` so concurrent readers never rebuild the same month at once.
+A rebuild upserts the new rows before deleting the stale ones, so a built month
+never reads as empty.
+"""
+
+import datetime as dt
+import os
+import re
+import uuid
+
+from pymongo import ReplaceOne
+from pymongo.errors import DuplicateKeyError
+
+from config import db
+from utils.helpers import nowIST
+
+logs = db.logs
+logs_monthly = db.logs_monthly
+logs_monthly_built = db.logs_monthly_built
+
+ROLLUP_KEYS = ("villageId", "userId", "type", "action")
+
+ACTIVITY_MAX_MONTHS = int(os.getenv("ACTIVITY_MAX_MONTHS", "24"))
+ROLLUP_LOCK_SECONDS = int(os.getenv("ROLLUP_LOCK_SECONDS", "300"))
+BUILT = {"builtAt": {"$exists": True}}
+
+_MONTH_RE = re.compile(r"^\d{4}-(0[1-9]|1[0-2])$")
+
+
+def is_valid_month(month: str) -> bool:
+    return bool(month) and bool(_MONTH_RE.match(month))
+
+
+def current_month() -> str:
+    return nowIST()[:7]
+
+
+def months_between(from_month: str, to_month: str) -> list:
+    """Inclusive list of "YYYY-MM" strings from from_month to to_month."""
+    year, mon = int(from_month[:4]), int(from_month[5:7])
+    end_year, end_mon = int(to_month[:4]), int(to_month[5:7])
+
+    months = []
+    while (year, mon) <= (end_year, end_mon):
+        months.append(f"{year:04d}-{mon:02d}")
+        mon += 1
+        if mon > 12:
+            year, mon = year + 1, 1
+    return months
+
+
+def _month_range(month: str) -> dict:
+    return {"$gte": f"{month}-01 00:00:00", "$lte": f"{month}-31 23:59:59"}
+
+
+def _claim_month(month: str, rebuild: bool) -> bool:
+    """
+    Take the build lease of a month. False when another build holds it or,
+    unless `rebuild`, when the month is already built.
+    """
+    now = dt.datetime.utcnow()
+    query = {"_id": month, "$or": [{"lockedUntil": {"$exists": False}}, {"lockedUntil": {"$lt": now}}]}
+    if not rebuild:
+        query["builtAt"] = {"$exists": False}
+    try:
+        # no match -> the upsert inserts _id: month, which fails if the document exists
+        logs_monthly_built.update_one(
+            query,
+            {"$set": {"lockedUntil": now + dt.timedelta(seconds=ROLLUP_LOCK_SECONDS)}},
+            upsert=True
+        )
+    except DuplicateKeyError:
+        return False
+    return True
+
+
+def build_month(month: str, rebuild: bool = True):
+    """
+    (Re)aggregate one month of `logs` into `logs_monthly` under the month's
+    lease. Returns rollup rows written, or None if the month was skipped.
+    """
+    if not _claim_month(month, rebuild):
+        return None
+
+    pipeline = [
+        {"$match": {"updateTime": _month_range(month)}},
+        {
+            "$group": {
+                "_id": {k: f"${k}" for k in ROLLUP_KEYS},
+                "count": {"$sum": 1}
+            }
+        }
+    ]
+
+    build = uuid.uuid4().hex
+    ops = []
+    for row in logs.aggregate(pipeline, allowDiskUse=True):
+        key = {"month": month, **{k: row["_id"].get(k) for k in ROLLUP_KEYS}}
+        ops.append(ReplaceOne({"_id": key}, {"_id": key, **key, "count": row["count"], "build": build}, upsert=True))
+
+    # upsert first, then drop the keys this build no longer has
+    if ops:
+        logs_monthly.bulk_write(ops, ordered=False)
+    logs_monthly.delete_many({"month": month, "build": {"$ne": build}})
+
+    logs_monthly_built.update_one(
+        {"_id": month},
+        {"$set": {"builtAt": nowIST(), "rows": len(ops)}, "$unset": {"lockedUntil": ""}},
+        upsert=True
+    )
+    return len(ops)
+
+
+def ensure_months_built(months: list) -> set:
+    """
+    Materialize any closed month in `months` that has no rollup yet. Returns
+    the closed months whose rollup can be read; a month another process is
+    still building is left out.
+    """
+    open_month = current_month()
+    closed = [m for m in months if m < open_month]
+    if not closed:
+        return set()
+
+    built = {d["_id"] for d in logs_monthly_built.find({"_id": {"$in": closed}, **BUILT}, {"_id": 1})}
+    for month in closed:
+        if month not in built and build_month(month, rebuild=False) is not None:
+            built.add(month)
+    return built
+
+
+def activity_counts(months: list, match: dict, group_by: tuple) -> list:
+    """
+    Count log entries per `group_by` (any of "month", "villageId", "userId",
+    "type", "action") over `months`, applying equality / $in filters in `match`.
+
+    Built closed months come from `logs_monthly`; the open month and closed
+    months not built yet come from `logs`.
+    Returns [{"_id": {<group_by fields>}, "count": n}, ...].
+    """
+    if not months:
+        return []
+
+    open_month = current_month()
+    closed = [m for m in months if m < open_month]
+    built = ensure_months_built(closed)
+    rolled = [m for m in closed if m in built]
+    live = [m for m in months if m not in built and m <= open_month]
+
+    totals = {}
+
+    def _add(group, count):
+        key = tuple(group.get(k) for k in group_by)
+        totals[key] = totals.get(key, 0) + count
+
+    if rolled:
+        rollup_match = {"month": {"$in": rolled}, **match}
+        pipeline = [
+            {"$match": rollup_match},
+            {"$group": {"_id": {k: f"${k}" for k in group_by}, "count": {"$sum": "$count"}}}
+        ]
+        for row in logs_monthly.aggregate(pipeline):
+            _add(row["_id"], row["count"])
+
+    if live:
+        group_id = {
+            k: ({"$substr": ["$updateTime", 0, 7]} if k == "month" else f"${k}")
+            for k in group_by
+        }
+        ranges = [{"updateTime": _month_range(m)} for m in live]
+        time_match = ranges[0] if len(ranges) == 1 else {"$or": ranges}
+        pipeline = [
+            {"$match": {**time_match, **match}},
+            {"$group": {"_id": group_id, "count": {"$sum": 1}}}
+        ]
+        for row in logs.aggregate(pipeline):
+            _add(row["_id"], row["count"])
+
+    return [
+        {"_id": dict(zip(group_by, key)), "count": count}
+        for key, count in totals.items()
+    ]
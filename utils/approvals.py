@@ -0,0 +1,240 @@
+"""
+Status transitions for verification records (approve / send back).
+
+Every verifiable record moves through status 1 -> 4; the role that may act on
+it is fixed by STATUS_TRANSITIONS (ra acts on 1, ro on 2, ad on 3). Acting
+with +1 approves, -1 sends it back, clamped to 1..4.
+
+APPROVAL_KINDS describes the four record kinds (families, materials,
+facilities, plots/houses) so the same code can transition any of them.
+`transition_one()` is what the /verify endpoints use: a single
+`find_one_and_update` whose filter requires the role's status level and whose
+update pipeline computes the new status and history entry on the server, so
+two approvers can never both apply the same step. `apply_batch()` applies
+many transitions at once: one conditional `bulk_write` per collection and one
+`insert_many` for the logs, returning a result per item.
+"""
+
+import logging
+import uuid
+
+from pymongo import ReturnDocument, UpdateOne, errors as mongo_errors
+
+from config import db
+from models.village import Logs
+from utils.counts import invalidate_counts
+from utils.helpers import STATUS_TRANSITIONS, nowIST
+from utils.villageStats import mark_village_stats_stale
+
+logger = logging.getLogger(__name__)
+
+MIN_STATUS, MAX_STATUS = 1, 4
+
+# kind -> where the records live and how they are addressed
+APPROVAL_KINDS = {
+    "family": {"collection": db.optionUpdates, "parent": "familyId", "key": "updateId", "logType": "Families"},
+    "material": {"collection": db.materialUpdates, "parent": "materialId", "key": "updateId", "logType": "Materials"},
+    "facility": {"collection": db.facilityUpdates, "parent": "facilityId", "key": "verificationId", "logType": "Facilities"},
+    # log type depends on the record's own type (plot / house)
+    "plot": {"collection": db.plotUpdates, "parent": "plotId", "key": "verificationId", "logType": None},
+}
+
+logs = db.logs
+
+
+def final_status(current: int, action: int) -> int:
+    return min(max(current + action, MIN_STATUS), MAX_STATUS)
+
+
+def status_filter(required: int) -> dict:
+    """Records written before `status` existed count as status 1."""
+    if required == MIN_STATUS:
+        return {"status": {"$in": [MIN_STATUS, None]}}
+    return {"status": required}
+
+
+class TransitionError(Exception):
+    """The record is missing or not at the caller's level; `status` is the HTTP code."""
+
+    def __init__(self, message: str, status: int):
+        super().__init__(message)
+        self.message = message
+        self.status = status
+
+
+def transition_pipeline(action: int, comments: str, user_id: str, now: str, batch_id: str = None) -> list:
+    """
+    Update pipeline: clamp status + action to 1..4, stamp the verifier, append
+    history. `batch_id` tags the history entry so a batch can find its own writes.
+    """
+    entry = {
+        "status": "$status",
+        "comments": {"$literal": comments},
+        "verifier": {"$literal": user_id},
+        "time": {"$literal": now},
+    }
+    if batch_id:
+        entry["batchId"] = {"$literal": batch_id}
+    return [
+        {"$set": {
+            "status": {"$min": [{"$max": [{"$add": [{"$ifNull": ["$status", MIN_STATUS]}, action]}, MIN_STATUS]}, MAX_STATUS]},
+            "verifiedBy": {"$literal": user_id},
+            "verifiedAt": {"$literal": now},
+        }},
+        {"$set": {
+            "statusHistory": {"$concatArrays": [
+                {"$ifNull": ["$statusHistory", []]},
+                [entry],
+            ]},
+        }},
+    ]
+
+
+def transition_one(kind: str, parent_id: str, key_id: str, action: int, comments: str, user_id: str, role: str,
+                   not_found: str = "Update not found") -> dict:
+    """
+    Approve (+1) or send back (-1) one record as `role`. Returns the updated
+    document (without _id / searchKeys). Raises TransitionError (404 / 403).
+    """
+    spec = APPROVAL_KINDS[kind]
+    collection, ident = spec["collection"], {spec["parent"]: parent_id, spec["key"]: key_id}
+    required = STATUS_TRANSITIONS.get(role)
+    if required is None:
+        raise TransitionError(f"Unauthorized: {role} cannot verify", 403)
+
+    doc = collection.find_one_and_update(
+        {**ident, **status_filter(required)},
+        transition_pipeline(action, comments, user_id, nowIST()),
+        projection={"_id": 0, "searchKeys": 0},
+        return_document=ReturnDocument.AFTER,
+    )
+    if doc is None:
+        # only on the failure path: say why
+        current = collection.find_one(ident, {"_id": 0, "status": 1})
+        if current is None:
+            raise TransitionError(not_found, 404)
+        raise TransitionError(f"Unauthorized: {role} cannot verify status {current.get('status') or MIN_STATUS}", 403)
+
+    invalidate_counts(collection.name)
+    return doc
+
+
+def log_type(kind: str, record: dict) -> str:
+    if APPROVAL_KINDS[kind]["logType"]:
+        return APPROVAL_KINDS[kind]["logType"]
+    return "Houses" if record.get("type") == "house" else "Community Facilities"
+
+
+def _item_error(item: dict) -> str:
+    kind = item.get("kind")
+    spec = APPROVAL_KINDS.get(kind) if isinstance(kind, str) else None
+    if not spec:
+        return f"kind must be one of {', '.join(APPROVAL_KINDS)}"
+    # ids go into the lookup query and are hashed as dict keys: strings only
+    if not all(isinstance(item.get(f), str) and item[f] for f in (spec["parent"], spec["key"])):
+        return f"{spec['parent']} and {spec['key']} are required strings"
+    if item.get("status") not in (1, -1):
+        return "status must be 1 or -1"
+    if not item.get("comments"):
+        return "comments are required"
+    return None
+
+
+def apply_batch(items: list, user_id: str, role: str) -> list:
+    """
+    Apply `items` ({"kind", <parent>, <key>, "status": 1|-1, "comments"}) as
+    `user_id` acting with `role`. Returns one result per item, in order:
+    {"index", "kind", "id", "ok", "status"?, "error"?, "code"?}.
+    """
+    required = STATUS_TRANSITIONS.get(role)
+    now = nowIST()
+    batch_id = uuid.uuid4().hex
+    results = [None] * len(items)
+    by_kind = {}   # kind -> [(index, item)]
+
+    for index, item in enumerate(items):
+        error = _item_error(item) if isinstance(item, dict) else "item must be an object"
+        if error:
+            results[index] = {"index": index, "ok": False, "error": error, "code": 400}
+            continue
+        by_kind.setdefault(item["kind"], []).append((index, item))
+
+    log_docs, villages = [], set()
+    for kind, entries in by_kind.items():
+        spec = APPROVAL_KINDS[kind]
+        collection, parent, key = spec["collection"], spec["parent"], spec["key"]
+
+        # one read for the whole kind: existence, current status, village, plot type
+        wanted = [{parent: item[parent], key: item[key]} for _, item in entries]
+        records = {
+            (r[parent], r[key]): r
+            for r in collection.find({"$or": wanted}, {"_id": 0, parent: 1, key: 1, "status": 1, "villageId": 1, "type": 1})
+        }
+
+        ops, pending, seen = [], [], set()
+        for index, item in entries:
+            ident = (item[parent], item[key])
+            result = {"index": index, "kind": kind, "id": item[key], "ok": False}
+            results[index] = result
+            record = records.get(ident)
+            if ident in seen:
+                result.update(error="Duplicate item in batch", code=409)
+                continue
+            seen.add(ident)
+            if not record:
+                result.update(error="Record not found", code=404)
+                continue
+            current = record.get("status") or MIN_STATUS
+            if current != required:
+                result.update(error=f"Unauthorized: {role} cannot verify status {current}", code=403)
+                continue
+
+            new_status = final_status(required, item["status"])
+            ops.append(UpdateOne(
+                {parent: ident[0], key: ident[1], **status_filter(required)},
+                transition_pipeline(item["status"], item["comments"], user_id, now, batch_id),
+            ))
+            pending.append((ident, item, record, new_status, result))
+
+        if not ops:
+            continue
+
+        try:
+            matched = collection.bulk_write(ops, ordered=False).matched_count
+        except mongo_errors.BulkWriteError as e:
+            logger.warning("Batch approval on %s partially failed: %s", collection.name, e.details.get("writeErrors"))
+            matched = e.details.get("nMatched", 0)
+
+        applied = None  # all of them
+        if matched < len(ops):
+            # someone else moved some records first; find which of ours landed by this batch's id
+            # (verifiedBy/verifiedAt would also match the same approver's other writes in this second)
+            applied = {
+                (r[parent], r[key])
+                for r in collection.find(
+                    {"$or": [{parent: i[0], key: i[1]} for i, *_ in pending], "statusHistory.batchId": batch_id},
+                    {"_id": 0, parent: 1, key: 1},
+                )
+            }
+
+        for ident, item, record, new_status, result in pending:
+            if applied is not None and ident not in applied:
+                result.update(error="Status changed by another approver", code=409)
+                continue
+            result.update(ok=True, status=new_status)
+            villages.add(record.get("villageId"))
+            log_docs.append(Logs(
+                userId=user_id,
+                updateTime=now,
+                type=log_type(kind, record),
+                action="Action",
+                comments=item["comments"],
+                relatedId=item[key],
+                villageId=record.get("villageId") or "",
+            ).model_dump())
+        invalidate_counts(collection.name)
+
+    if log_docs:
+        logs.insert_many(log_docs, ordered=False)
+        mark_village_stats_stale(*villages)
+    return results
@@ -0,0 +1,92 @@
+"""
+Total counts for the paginated list endpoints.
+
+`count_for(collection, query, args)` replaces the per-request
+`count_documents(query)`:
+
+- `?count=none` skips the total entirely (returns None).
+- `?count=approx` counts at most COUNT_APPROX_CAP documents; if the cap is hit
+  the total is reported as a lower bound ("≥ N").
+- an empty filter uses `estimated_document_count()` (collection metadata).
+- otherwise totals are cached per (collection, normalized filter) for
+  COUNT_CACHE_TTL seconds.
+
+Write routes call `invalidate_counts(collection.name)`. The cache is
+per-process, so other workers see a write after at most COUNT_CACHE_TTL.
+"""
+
+import os
+import threading
+import time
+from collections import OrderedDict
+
+from bson import json_util
+
+COUNT_CACHE_TTL = float(os.getenv("COUNT_CACHE_TTL", "15"))
+COUNT_CACHE_SIZE = int(os.getenv("COUNT_CACHE_SIZE", "2048"))
+COUNT_APPROX_CAP = int(os.getenv("COUNT_APPROX_CAP", "1000"))
+
+_lock = threading.Lock()
+_cache = OrderedDict()   # (collection, filter json, cap) -> (expires_at, generation, count)
+_generations = {}        # collection -> bumped on every write
+
+
+def normalize_filter(query: dict) -> str:
+    """Stable string form of a filter: key order does not matter."""
+    return json_util.dumps(query or {}, sort_keys=True)
+
+
+def invalidate_counts(collection_name: str) -> None:
+    with _lock:
+        _generations[collection_name] = _generations.get(collection_name, 0) + 1
+
+
+def _cached(key, generation):
+    entry = _cache.get(key)
+    if not entry:
+        return None
+    expires_at, gen, count = entry
+    if gen != generation or expires_at < time.monotonic():
+        _cache.pop(key, None)
+        return None
+    _cache.move_to_end(key)
+    return count
+
+
+def _store(key, generation, count):
+    _cache[key] = (time.monotonic() + COUNT_CACHE_TTL, generation, count)
+    _cache.move_to_end(key)
+    while len(_cache) > COUNT_CACHE_SIZE:
+        _cache.popitem(last=False)
+
+
+def count_for(collection, query: dict, args=None) -> dict:
+    """
+    Returns {"count": n, "countIsLowerBound": bool}, or {"count": None} when the
+    client opted out with ?count=none. Raises ValueError for an unknown mode.
+    """
+    mode = (args.get("count", "exact") if args is not None else "exact").lower()
+    if mode not in ("exact", "approx", "none"):
+        raise ValueError("count must be exact, approx or none")
+    if mode == "none":
+        return {"count": None, "countIsLowerBound": False}
+
+    if not query:
+        return {"count": collection.estimated_document_count(), "countIsLowerBound": False}
+
+    cap = COUNT_APPROX_CAP if mode == "approx" else 0
+    key = (collection.name, normalize_filter(query), cap)
+
+    with _lock:
+        generation = _generations.get(collection.name, 0)
+        count = _cached(key, generation)
+
+    if count is None:
+        if cap:
+            count = collection.count_documents(query, limit=cap)
+        else:
+            count = collection.count_documents(query)
+        with _lock:
+            _store(key, generation, count)
+
+    return {"count": count, "countIsLowerBound": bool(cap) and count >= cap}
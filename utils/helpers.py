@@ -1,20 +1,11 @@
 import re
-import bcrypt
 from flask import jsonify
 import datetime as dt 
 
 import pytz
 
-
-def hash_password(plain: str) -> bytes:
-    return bcrypt.hashpw(plain.encode("utf-8"), bcrypt.gensalt(rounds=12))
-
-
-def verify_password(plain: str, hashed: bytes) -> bool:
-    try:
-        return bcrypt.checkpw(plain.encode("utf-8"), hashed)
-    except Exception:
-        return False
+# bcrypt runs on the process pool in utils/passwords.py
+from utils.passwords import hash_password, verify_password
 
 def parse_ist(time_str: str):
     return dt.datetime.strptime(time_str, "%Y-%m-%d %H:%M:%S")
@@ -72,6 +63,20 @@ s3_url_pattern = re.compile(
     r'[a-z0-9][a-z0-9.-]{2,62}[a-z0-9]' # Validate bucket name length and characters
     r'(/.*)?$' # Key part is optional
 )
+
+# http(s) URLs or s3:// URIs (as above) in a single match per URL
+doc_url_pattern = re.compile(r'https?://|' + s3_url_pattern.pattern[1:])
+
+
+def validate_doc_urls(urls):
+    """Body of the docs/photos field validators: raises ValueError on the first invalid URL."""
+    if urls is None:
+        return urls
+    match = doc_url_pattern.match
+    for url in urls:
+        if not isinstance(url, str) or not match(url):
+            raise ValueError(f"Invalid URL: {url}")
+    return urls
 from flask import jsonify
 
 def authorization(decoded_data, userId: str = None):
@@ -0,0 +1,166 @@
+"""
+Image normalization for uploaded photos.
+
+Phone photos arrive as multi-megabyte JPEGs with full EXIF. Before upload
+(`/upload`) every jpg/jpeg/png goes through `renditions()`:
+
+- the orientation tag is applied and all EXIF is dropped; the capture time
+  and GPS position are kept as S3 object metadata (`captured-at`,
+  `gps-latitude`, `gps-longitude`) on the stored image
+- the stored image is bounded to IMAGE_MAX_SIDE pixels on its long side
+- two derived JPEGs are written next to it under keys derived from the same
+  name: `<key>.thumb.jpg` (IMAGE_THUMB_SIDE, review screens) and
+  `<key>.model.jpg` (IMAGE_MODEL_SIDE, stage classifier)
+
+Documents keep referencing one S3 URI; `rendition_key(key, "thumb")` finds
+the others. `model_input_bytes()` is what the verification pipeline feeds
+the classifier. Set IMAGE_PIPELINE=0 to store photos as uploaded.
+"""
+
+import io
+import logging
+import os
+import re
+
+from config import s3_client
+
+logger = logging.getLogger(__name__)
+
+IMAGE_PIPELINE = os.getenv("IMAGE_PIPELINE", "1") == "1"
+IMAGE_MAX_SIDE = int(os.getenv("IMAGE_MAX_SIDE", "2048"))
+IMAGE_THUMB_SIDE = int(os.getenv("IMAGE_THUMB_SIDE", "320"))
+IMAGE_MODEL_SIDE = int(os.getenv("IMAGE_MODEL_SIDE", "768"))
+IMAGE_JPEG_QUALITY = int(os.getenv("IMAGE_JPEG_QUALITY", "85"))
+
+IMAGE_EXTENSIONS = {"jpg": "JPEG", "jpeg": "JPEG", "png": "PNG"}
+# rendition -> long side in pixels
+RENDITIONS = {"thumb": IMAGE_THUMB_SIDE, "model": IMAGE_MODEL_SIDE}
+
+_EXIF_IFD, _GPS_IFD = 0x8769, 0x8825
+_DATETIME_ORIGINAL, _DATETIME = 36867, 306
+_GPS_LAT_REF, _GPS_LAT, _GPS_LON_REF, _GPS_LON = 1, 2, 3, 4
+# EXIF date/time in ASCII digits; S3 metadata must be ASCII
+_EXIF_DATETIME_RE = re.compile(r"^[0-9]{4}:[0-9]{2}:[0-9]{2} [0-9]{2}:[0-9]{2}:[0-9]{2}$")
+
+
+class ImageError(Exception):
+    """The upload claims to be an image but cannot be decoded."""
+
+
+def is_image(key: str) -> bool:
+    return key.rsplit(".", 1)[-1].lower() in IMAGE_EXTENSIONS
+
+
+def rendition_key(key: str, rendition: str = None) -> str:
+    """`uploads/x.png` -> `uploads/x.png.thumb.jpg`; the original key for no rendition."""
+    if not rendition:
+        return key
+    if rendition not in RENDITIONS:
+        raise ValueError(f"rendition must be one of {', '.join(RENDITIONS)}")
+    return f"{key}.{rendition}.jpg"
+
+
+def all_keys(key: str) -> list:
+    """The stored key plus every rendition key an upload may have."""
+    return [key] + [rendition_key(key, name) for name in RENDITIONS] if is_image(key) else [key]
+
+
+def _degrees(values, ref) -> float:
+    d, m, s = (float(v) for v in values)
+    value = d + m / 60 + s / 3600
+    return round(-value if ref in ("S", "W") else value, 7)
+
+
+def photo_metadata(exif) -> dict:
+    """Capture time and GPS position from EXIF, as S3 metadata (string values)."""
+    metadata = {}
+    taken = exif.get_ifd(_EXIF_IFD).get(_DATETIME_ORIGINAL) or exif.get(_DATETIME)
+    if isinstance(taken, bytes):
+        taken = taken.decode("ascii", "replace")
+    taken = str(taken or "").strip("\x00 ")
+    if _EXIF_DATETIME_RE.match(taken):
+        # EXIF "YYYY:MM:DD HH:MM:SS" -> the "YYYY-MM-DD HH:MM:SS" used everywhere else
+        metadata["captured-at"] = taken.replace(":", "-", 2)
+    elif taken:
+        logger.debug("Unreadable EXIF capture time: %r", taken)
+    gps = exif.get_ifd(_GPS_IFD)
+    try:
+        if gps.get(_GPS_LAT) and gps.get(_GPS_LON):
+            metadata["gps-latitude"] = str(_degrees(gps[_GPS_LAT], gps.get(_GPS_LAT_REF)))
+            metadata["gps-longitude"] = str(_degrees(gps[_GPS_LON], gps.get(_GPS_LON_REF)))
+    except (TypeError, ValueError, ZeroDivisionError):
+        logger.debug("Unreadable GPS EXIF: %r", gps)
+    return metadata
+
+
+def _jpeg_mode(image):
+    """An "RGB" or "L" copy JPEG can store; 16-bit/float images are scaled to 8 bits first."""
+    if image.mode in ("RGB", "L"):
+        return image
+    if image.mode.startswith(("I", "F")):
+        image = image.convert("F")
+        high = image.getextrema()[1] or 1
+        image = image.point(lambda v: v * (255.0 / max(high, 255)))
+        return image.convert("L")
+    return image.convert("RGB")
+
+
+def _encode(image, fmt: str, max_side: int) -> bytes:
+    image = image.copy()
+    image.thumbnail((max_side, max_side))
+    if fmt == "JPEG":
+        image = _jpeg_mode(image)
+    out = io.BytesIO()
+    if fmt == "JPEG":
+        image.save(out, "JPEG", quality=IMAGE_JPEG_QUALITY, optimize=True, progressive=True)
+    else:
+        image.save(out, fmt, optimize=True)
+    return out.getvalue()
+
+
+def renditions(fileobj, key: str, content_type: str) -> list:
+    """
+    Normalize one uploaded image. Returns [(key, bytes, content_type, metadata)]:
+    the stored image first, then the derived renditions. Raises ImageError.
+    """
+    from PIL import Image, ImageOps, UnidentifiedImageError  # Pillow loads on first image upload
+
+    try:
+        image = Image.open(fileobj)
+        exif = image.getexif()
+        image = ImageOps.exif_transpose(image)
+        image.load()
+    except (UnidentifiedImageError, Image.DecompressionBombError, OSError, SyntaxError) as e:
+        raise ImageError(f"Could not read image: {e}") from e
+
+    metadata = photo_metadata(exif)
+    fmt = IMAGE_EXTENSIONS[key.rsplit(".", 1)[-1].lower()]
+    try:
+        files = [(key, _encode(image, fmt, IMAGE_MAX_SIDE), content_type, metadata)]
+        for name, side in RENDITIONS.items():
+            files.append((rendition_key(key, name), _encode(image, "JPEG", side), "image/jpeg", metadata))
+    except (ValueError, OSError) as e:   # a mode Pillow cannot convert or write
+        raise ImageError(f"Could not convert image: {e}") from e
+    return files
+
+
+def model_input_bytes(uri: str) -> bytes:
+    """
+    Image bytes for the classifier: the `model` rendition of an s3:// upload
+    (falling back to the stored image), or the body of an http(s) URL.
+    """
+    from urllib.parse import urlparse
+
+    parsed = urlparse(uri)
+    if parsed.scheme != "s3":
+        import requests  # only the verification pipeline needs it
+
+        return requests.get(uri, timeout=10).content
+
+    from botocore.exceptions import ClientError  # botocore loads on first S3 request
+
+    key = parsed.path.lstrip("/")
+    try:
+        return s3_client.get_object(Bucket=parsed.netloc, Key=rendition_key(key, "model"))["Body"].read()
+    except ClientError:
+        return s3_client.get_object(Bucket=parsed.netloc, Key=key)["Body"].read()
@@ -0,0 +1,303 @@
+"""
+Central registry of the indexes every collection needs.
+
+INDEXES declares, per collection, the indexes backing the filters and sorts
+used across `routes/`. QUERY_SHAPES lists the hot route queries so they can be
+checked against the registry (statically) or against the live planner
+(`explain`). `python scripts/sync_indexes.py` drives all three; set
+SYNC_INDEXES_ON_STARTUP=1 to also create missing indexes when the app boots.
+
+When a route starts filtering on a new field, add the index here.
+"""
+
+import logging
+import threading
+
+from pymongo import ASCENDING, DESCENDING, IndexModel
+from pymongo import errors
+
+from utils.search import SEARCH_FIELDS, SEARCH_NGRAMS
+
+logger = logging.getLogger(__name__)
+
+
+def _index(*keys, **options):
+    """keys are (field, direction) pairs; options are passed to IndexModel."""
+    keys = [(k, ASCENDING) if isinstance(k, str) else k for k in keys]
+    options.setdefault("name", "_".join(f"{k}_{d}" for k, d in keys))
+    return {"keys": keys, "options": options}
+
+
+INDEXES = {
+    "users": [
+        _index("userId", "mobile", "role", "deleted", name="login"),
+        _index("email", "deleted"),
+        _index("mobile", "deleted"),
+    ],
+    "passwords": [
+        _index("userId", ("changed_at", DESCENDING)),
+    ],
+    "villages": [
+        _index("villageId"),
+        _index("name"),
+    ],
+    "villageUpdates": [
+        _index("villageId", "updateId", unique=True),
+        _index("villageId", "deleted", ("insertedAt", DESCENDING)),
+        _index("villageId", "deleted", ("verifiedAt", DESCENDING)),
+        _index("villageId", "currentStage", "currentSubStage", "deleted"),
+    ],
+    # families live in the `testing` collection
+    "testing": [
+        _index("familyId"),
+        _index("villageId", "mukhiyaName"),
+        _index("villageId", "relocationOption"),
+        _index("villageId", "currentStage"),
+    ],
+    "optionUpdates": [
+        _index("updateId"),
+        _index("familyId", "updateId"),
+        _index("familyId", "currentStage"),
+        _index("familyId", "verifiedAt"),
+        _index("villageId", "familyId", "status", ("insertedAt", DESCENDING)),
+        _index("villageId", "status", ("insertedAt", DESCENDING)),  # approver work queue
+    ],
+    "options": [
+        _index("optionId", "deleted"),
+        _index("deleted"),
+    ],
+    "buildings": [
+        _index("villageId", "typeId", "deleted"),
+        _index("typeId"),
+    ],
+    "plots": [
+        _index("plotId", "deleted"),
+        _index("villageId", "typeId", "deleted"),
+    ],
+    "house": [
+        _index("plotId", "deleted"),
+        _index("villageId", "deleted", "numberOfHome"),
+        _index("villageId", "typeId", "deleted"),
+    ],
+    "plotUpdates": [
+        _index("verificationId"),
+        _index("plotId", "verificationId"),
+        _index("plotId", "homeId", "currentStage"),
+        _index("plotId", "verifiedAt"),
+        _index("plotId", "homeId", "verifiedAt"),
+        _index("villageId", "plotId", "status", ("insertedAt", DESCENDING)),
+        _index("villageId", "status", ("insertedAt", DESCENDING)),  # approver work queue
+    ],
+    "materials": [
+        _index("materialId"),
+    ],
+    "materialUpdates": [
+        _index("updateId"),
+        _index("materialId", "updateId"),
+        _index("villageId", "materialId", "status", ("insertedAt", DESCENDING)),
+        _index("villageId", "status", ("insertedAt", DESCENDING)),  # approver work queue
+    ],
+    "facilities": [
+        _index("facilityId", "villageId"),
+        _index("deleted"),
+    ],
+    "facilityUpdates": [
+        _index("verificationId"),
+        _index("facilityId", "verificationId"),
+        _index("villageId", "facilityId", "status", ("insertedAt", DESCENDING)),
+        _index("villageId", "status", ("insertedAt", DESCENDING)),  # approver work queue
+    ],
+    "feedback": [
+        _index("feedbackId"),
+        _index("villageId", ("insertedAt", DESCENDING)),
+    ],
+    "meetings": [
+        _index("meetingId"),
+        _index("villageId", ("time", DESCENDING)),
+    ],
+    "logs": [
+        _index(("updateTime", DESCENDING)),
+        _index("villageId", ("updateTime", DESCENDING)),
+        _index("userId", ("updateTime", DESCENDING)),
+        _index("relatedId"),
+        _index("type", "action", ("updateTime", DESCENDING)),
+    ],
+    "logs_monthly": [
+        _index("month", "villageId"),
+        _index("month", "userId"),
+    ],
+    "teststages": [
+        _index("stageId", "deleted"),
+        _index("deleted", "position"),
+    ],
+    "chat_sessions": [
+        _index("userId", ("updatedAt", DESCENDING)),
+    ],
+    "prompt_cache": [
+        _index("prompt"),
+    ],
+    "outbox": [
+        _index("status", "nextAttemptAt"),
+        _index("purgeAt", expireAfterSeconds=0),
+    ],
+    "responseCache": [
+        _index("expiresAt", expireAfterSeconds=0),
+    ],
+    # direct-to-S3 uploads (utils/uploads.py); pending records expire
+    "uploads": [
+        _index("expiresAt", expireAfterSeconds=0),
+    ],
+}
+
+
+# Name search (utils/search.py): word-start keys per village, trigrams when enabled.
+for _collection, _fields in SEARCH_FIELDS.items():
+    for _field in _fields:
+        INDEXES.setdefault(_collection, []).append(_index("villageId", f"searchKeys.{_field}"))
+        if SEARCH_NGRAMS:
+            INDEXES[_collection].append(_index("villageId", f"searchKeys.{_field}Grams"))
+
+
+# (route, collection, equality fields, range/sort fields) for the hot queries.
+QUERY_SHAPES = [
+    ("POST /login", "users", ["userId", "mobile", "role", "deleted"], []),
+    ("POST /updatePassword", "passwords", ["userId"], []),
+    ("GET /villages/<id>/beneficiaries", "testing", ["villageId"], ["mukhiyaName"]),
+    ("GET /villages/<id>/beneficiaries?mukhiyaName", "testing", ["villageId"], ["searchKeys.mukhiyaName"]),
+    ("GET /house/<villageId>?mukhiyaName", "house", ["villageId"], ["searchKeys.mukhiyaName"]),
+    ("GET /meetings/<villageId>?venue", "meetings", ["villageId"], ["searchKeys.venue"]),
+    ("GET /families/<id>", "testing", ["familyId"], []),
+    ("POST /family_updates/insert/<familyId>", "testing", ["familyId"], []),
+    ("GET /updates/<villageId>/<familyId>", "optionUpdates", ["villageId", "familyId", "status"], ["insertedAt"]),
+    ("POST /updates/verify", "optionUpdates", ["familyId", "updateId"], []),
+    ("DELETE /updates/delete", "optionUpdates", ["familyId"], ["verifiedAt"]),
+    ("GET /village_updates/<villageId>", "villageUpdates", ["villageId", "deleted"], ["insertedAt"]),
+    ("PUT /village_updates/<villageId>/<updateId>", "villageUpdates", ["villageId", "updateId"], []),
+    ("DELETE /village_updates/<villageId>/<updateId>", "villageUpdates", ["villageId", "currentStage", "currentSubStage", "deleted"], []),
+    ("GET /plots/<villageId>", "plots", ["villageId"], []),
+    ("GET /house/<villageId>", "house", ["villageId"], []),
+    ("POST /field_verification/insert/<plotId>", "plots", ["plotId", "deleted"], []),
+    ("GET /field_verification/<villageId>/<plotId>", "plotUpdates", ["villageId", "plotId", "status"], ["insertedAt"]),
+    ("POST /field_verification/verify", "plotUpdates", ["plotId", "verificationId"], []),
+    ("DELETE /field_verification/<plotId>/<id>", "plotUpdates", ["plotId", "homeId"], ["verifiedAt"]),
+    ("GET /material_updates/<villageId>/<materialId>", "materialUpdates", ["villageId", "materialId", "status"], ["insertedAt"]),
+    ("GET /facility_verification/<villageId>/<facilityId>", "facilityUpdates", ["villageId", "facilityId", "status"], ["insertedAt"]),
+    ("GET /approvals/queue", "optionUpdates", ["villageId", "status"], ["insertedAt"]),
+    ("GET /approvals/queue", "materialUpdates", ["villageId", "status"], ["insertedAt"]),
+    ("GET /approvals/queue", "facilityUpdates", ["villageId", "status"], ["insertedAt"]),
+    ("GET /approvals/queue", "plotUpdates", ["villageId", "status"], ["insertedAt"]),
+    ("GET /feedbacks/<villageId>", "feedback", ["villageId"], ["insertedAt"]),
+    ("GET /meetings/<villageId>", "meetings", ["villageId"], ["time"]),
+    ("GET /logs", "logs", [], ["updateTime"]),
+    ("GET /logs?villageId", "logs", ["villageId"], ["updateTime"]),
+    ("GET /logs?userId", "logs", ["userId"], ["updateTime"]),
+    ("GET /analytics/activity/*", "logs", [], ["updateTime"]),
+    ("GET /analytics/building/<v>/<t>", "plots", ["villageId", "typeId", "deleted"], []),
+    ("GET /analytics/house/<v>/home-count", "house", ["villageId", "deleted"], []),
+]
+
+
+def index_models(collection: str) -> list:
+    return [IndexModel(spec["keys"], **spec["options"]) for spec in INDEXES.get(collection, [])]
+
+
+def sync_indexes(db, collections=None, dry_run: bool = False) -> dict:
+    """
+    Create declared indexes that are missing. Returns
+    {collection: {"created": [names], "existing": [names], "error": str?}}.
+    """
+    report = {}
+    for name in collections or INDEXES:
+        entry = {"created": [], "existing": []}
+        report[name] = entry
+        try:
+            existing = set(db[name].index_information().keys())
+        except errors.PyMongoError as e:
+            # index_information fails on collections that don't exist yet
+            existing = set()
+            logger.debug("index_information(%s) failed: %s", name, e)
+
+        missing = []
+        for spec in INDEXES.get(name, []):
+            idx_name = spec["options"]["name"]
+            if idx_name in existing:
+                entry["existing"].append(idx_name)
+            else:
+                missing.append(IndexModel(spec["keys"], background=True, **spec["options"]))
+
+        if missing and not dry_run:
+            try:
+                entry["created"] = db[name].create_indexes(missing)
+            except errors.PyMongoError as e:
+                entry["error"] = str(e)
+        else:
+            entry["created"] = [m.document["name"] for m in missing]
+    return report
+
+
+def unused_indexes(db, collections=None) -> dict:
+    """
+    Indexes with zero recorded accesses since the last server restart, plus
+    indexes present in the database but not declared in INDEXES.
+    """
+    report = {}
+    for name in collections or INDEXES:
+        declared = {spec["options"]["name"] for spec in INDEXES.get(name, [])}
+        try:
+            stats = list(db[name].aggregate([{"$indexStats": {}}]))
+        except errors.PyMongoError:
+            continue
+
+        unused = [s["name"] for s in stats if s["name"] != "_id_" and s["accesses"]["ops"] == 0]
+        undeclared = [s["name"] for s in stats if s["name"] != "_id_" and s["name"] not in declared]
+        if unused or undeclared:
+            report[name] = {"unused": unused, "undeclared": undeclared}
+    return report
+
+
+def check_query_shapes() -> list:
+    """
+    Static check: flag QUERY_SHAPES with no declared index whose leading key is
+    one of the query's equality or sort fields (those queries would scan).
+    """
+    flagged = []
+    for route, collection, equality, ranged in QUERY_SHAPES:
+        fields = set(equality) | set(ranged)
+        leading = {spec["keys"][0][0] for spec in INDEXES.get(collection, [])}
+        if not fields & leading:
+            flagged.append({"route": route, "collection": collection, "fields": sorted(fields)})
+    return flagged
+
+
+def explain_query_shapes(db) -> list:
+    """Live check: ask the planner for each QUERY_SHAPE and flag COLLSCAN plans."""
+    flagged = []
+    for route, collection, equality, ranged in QUERY_SHAPES:
+        query = {f: "__probe__" for f in equality}
+        cursor = db[collection].find(query).limit(1)
+        if ranged:
+            cursor = cursor.sort(ranged[0], DESCENDING)
+        try:
+            plan = cursor.explain().get("queryPlanner", {}).get("winningPlan", {})
+        except errors.PyMongoError as e:
+            flagged.append({"route": route, "collection": collection, "error": str(e)})
+            continue
+        if "COLLSCAN" in str(plan):
+            flagged.append({"route": route, "collection": collection, "plan": "COLLSCAN"})
+    return flagged
+
+
+def sync_indexes_in_background(db) -> threading.Thread:
+    """Startup hook: create missing indexes without delaying app boot."""
+    def _run():
+        try:
+            report = sync_indexes(db)
+            created = {k: v["created"] for k, v in report.items() if v["created"]}
+            if created:
+                logger.info("Created missing indexes: %s", created)
+        except Exception:
+            logger.exception("Index sync failed")
+
+    thread = threading.Thread(target=_run, name="index-sync", daemon=True)
+    thread.start()
+    return thread
@@ -0,0 +1,351 @@
+"""
+Notification outbox.
+
+Routes never talk to SMTP (or any other provider) inside a request. They call
+`enqueue(...)`, which writes a message to the `outbox` collection and returns;
+a worker thread delivers it:
+
+- messages are claimed in batches of OUTBOX_BATCH_SIZE (atomically, so several
+  workers/processes can share one outbox)
+- one transport connection per channel is kept open between batches and closed
+  after OUTBOX_IDLE_CLOSE seconds without work
+- failures are retried with exponential backoff (OUTBOX_RETRY_BASE ..
+  OUTBOX_RETRY_MAX seconds) up to OUTBOX_MAX_ATTEMPTS, then marked "failed";
+  if a channel cannot connect, its other messages in the batch fail with the
+  same error instead of reconnecting one by one
+- a batch stops sending OUTBOX_LOCK_MARGIN seconds before its lock expires
+  and hands the rest back, so no other worker reclaims a message still being sent
+
+Transports are picked per channel: EMAIL_TRANSPORT (default "smtp") and
+SMS_TRANSPORT (default "webhook"); "file" appends messages to
+NOTIFY_FILE_SINK instead of sending them (local runs / tests).
+
+With OUTBOX_WORKER=1 (default) every web process runs a delivery thread,
+started with the app and again after a fork on the first enqueue. With
+OUTBOX_WORKER=0, run `python scripts/outbox_worker.py` to deliver from a
+separate process instead.
+"""
+
+import datetime as dt
+import json
+from abc import ABC, abstractmethod
+import logging
+import os
+import smtplib
+import socket
+import threading
+import time
+import urllib.request
+from email.mime.text import MIMEText
+
+from pymongo import ReturnDocument, errors as mongo_errors
+
+from config import APP_PASSWORD, SENDER_EMAIL, db
+from utils.helpers import nowIST
+
+logger = logging.getLogger(__name__)
+
+OUTBOX_BATCH_SIZE = int(os.getenv("OUTBOX_BATCH_SIZE", "20"))
+OUTBOX_POLL_SECONDS = float(os.getenv("OUTBOX_POLL_SECONDS", "2"))
+OUTBOX_IDLE_CLOSE = float(os.getenv("OUTBOX_IDLE_CLOSE", "60"))
+OUTBOX_MAX_ATTEMPTS = int(os.getenv("OUTBOX_MAX_ATTEMPTS", "6"))
+OUTBOX_RETRY_BASE = float(os.getenv("OUTBOX_RETRY_BASE", "5"))
+OUTBOX_RETRY_MAX = float(os.getenv("OUTBOX_RETRY_MAX", "600"))
+OUTBOX_LOCK_SECONDS = float(os.getenv("OUTBOX_LOCK_SECONDS", "120"))
+OUTBOX_WORKER = os.getenv("OUTBOX_WORKER", "1") == "1"
+OUTBOX_RETENTION_DAYS = float(os.getenv("OUTBOX_RETENTION_DAYS", "7"))  # sent/failed docs hold OTPs
+
+SMTP_HOST = os.getenv("SMTP_HOST", "smtp.gmail.com")
+SMTP_PORT = int(os.getenv("SMTP_PORT", "465"))
+SMTP_TIMEOUT = float(os.getenv("SMTP_TIMEOUT", "20"))
+# a send started before the lock's last OUTBOX_LOCK_MARGIN seconds finishes before it expires
+OUTBOX_LOCK_MARGIN = float(os.getenv("OUTBOX_LOCK_MARGIN", str(SMTP_TIMEOUT * 2)))
+SMS_WEBHOOK_URL = os.getenv("SMS_WEBHOOK_URL")
+NOTIFY_FILE_SINK = os.getenv("NOTIFY_FILE_SINK", "outbox_sink.jsonl")
+
+outbox = db.outbox
+
+
+# --- transports ---------------------------------------------------------------
+
+class Transport(ABC):
+    """One connection to a provider; `send` raises on failure."""
+
+    def open(self):
+        pass
+
+    @abstractmethod
+    def send(self, message: dict):
+        ...
+
+    def close(self):
+        pass
+
+
+class SmtpTransport(Transport):
+    """Persistent SMTP_SSL session, re-established when the server drops it."""
+
+    def __init__(self):
+        self.server = None
+
+    def open(self):
+        if self.server is not None:
+            try:
+                self.server.noop()
+                return
+            except (smtplib.SMTPException, OSError):
+                self.close()
+        self.server = smtplib.SMTP_SSL(SMTP_HOST, SMTP_PORT, timeout=SMTP_TIMEOUT)
+        self.server.login(SENDER_EMAIL, APP_PASSWORD)
+
+    def send(self, message: dict):
+        msg = MIMEText(message["body"])
+        msg["Subject"] = message.get("subject", "")
+        msg["From"] = SENDER_EMAIL
+        msg["To"] = message["to"]
+        if self.server is None:
+            self.open()
+        try:
+            self.server.sendmail(SENDER_EMAIL, message["to"], msg.as_string())
+        except smtplib.SMTPServerDisconnected:
+            # drop the dead session so the next batch reconnects
+            self.close()
+            raise
+
+    def close(self):
+        if self.server is not None:
+            try:
+                self.server.quit()
+            except (smtplib.SMTPException, OSError):
+                pass
+            self.server = None
+
+
+class WebhookSmsTransport(Transport):
+    """POSTs {"to", "body"} as JSON to SMS_WEBHOOK_URL (the SMS gateway)."""
+
+    def send(self, message: dict):
+        if not SMS_WEBHOOK_URL:
+            raise RuntimeError("SMS_WEBHOOK_URL is not configured")
+        data = json.dumps({"to": message["to"], "body": message["body"]}).encode("utf-8")
+        req = urllib.request.Request(SMS_WEBHOOK_URL, data=data, headers={"Content-Type": "application/json"})
+        with urllib.request.urlopen(req, timeout=SMTP_TIMEOUT) as resp:
+            if resp.status >= 300:
+                raise RuntimeError(f"SMS gateway answered {resp.status}")
+
+
+class FileTransport(Transport):
+    """Appends each message as a JSON line to NOTIFY_FILE_SINK."""
+
+    def send(self, message: dict):
+        with open(NOTIFY_FILE_SINK, "a", encoding="utf-8") as fh:
+            fh.write(json.dumps({
+                "channel": message["channel"],
+                "to": message["to"],
+                "subject": message.get("subject"),
+                "body": message["body"],
+                "sentAt": nowIST(),
+            }) + "\n")
+
+
+TRANSPORTS = {
+    "smtp": SmtpTransport,
+    "webhook": WebhookSmsTransport,
+    "file": FileTransport,
+}
+
+CHANNEL_TRANSPORTS = {
+    "email": os.getenv("EMAIL_TRANSPORT", "smtp"),
+    "sms": os.getenv("SMS_TRANSPORT", "webhook"),
+}
+
+
+# --- producer -----------------------------------------------------------------
+
+_wake = threading.Event()
+
+
+def enqueue(channel: str, to: str, body: str, subject: str = None, kind: str = None):
+    """Queue a message for delivery; returns the outbox _id."""
+    if channel not in CHANNEL_TRANSPORTS:
+        raise ValueError(f"Unknown channel {channel}")
+    result = outbox.insert_one({
+        "channel": channel,
+        "kind": kind,
+        "to": to,
+        "subject": subject,
+        "body": body,
+        "status": "pending",
+        "attempts": 0,
+        "nextAttemptAt": dt.datetime.utcnow(),
+        "createdAt": nowIST(),
+    })
+    if OUTBOX_WORKER:
+        start_outbox_worker()
+    _wake.set()
+    return result.inserted_id
+
+
+# --- worker -------------------------------------------------------------------
+
+def _backoff(attempts: int) -> float:
+    return min(OUTBOX_RETRY_BASE * (2 ** (attempts - 1)), OUTBOX_RETRY_MAX)
+
+
+def _purge_at() -> dt.datetime:
+    """Finished messages are removed by the TTL index on purgeAt."""
+    return dt.datetime.utcnow() + dt.timedelta(days=OUTBOX_RETENTION_DAYS)
+
+
+class OutboxWorker:
+    def __init__(self, name: str = None):
+        self.name = name or f"{socket.gethostname()}:{os.getpid()}"
+        self.transports = {}      # channel -> open Transport
+        self.last_used = {}       # channel -> monotonic time of last send
+        self.stop_event = threading.Event()
+
+    def claim_batch(self) -> list:
+        now = dt.datetime.utcnow()
+        batch = []
+        while len(batch) < OUTBOX_BATCH_SIZE:
+            doc = outbox.find_one_and_update(
+                {"$or": [
+                    {"status": "pending", "nextAttemptAt": {"$lte": now}},
+                    # a worker died mid-send
+                    {"status": "sending", "lockedUntil": {"$lte": now}},
+                ]},
+                {"$set": {
+                    "status": "sending",
+                    "lockedBy": self.name,
+                    "lockedUntil": now + dt.timedelta(seconds=OUTBOX_LOCK_SECONDS),
+                }},
+                sort=[("nextAttemptAt", 1)],
+                return_document=ReturnDocument.AFTER,
+            )
+            if not doc:
+                break
+            batch.append(doc)
+        return batch
+
+    def transport(self, channel: str) -> Transport:
+        transport = self.transports.get(channel)
+        if transport is None:
+            transport = TRANSPORTS[CHANNEL_TRANSPORTS[channel]]()
+            self.transports[channel] = transport
+        transport.open()
+        return transport
+
+    def deliver(self, batch: list, deadline: float = None) -> int:
+        """
+        Send a claimed batch. Messages not started by `deadline` (monotonic;
+        default: the lock's expiry less OUTBOX_LOCK_MARGIN) are released.
+        """
+        if deadline is None:
+            deadline = time.monotonic() + OUTBOX_LOCK_SECONDS - OUTBOX_LOCK_MARGIN
+        sent = 0
+        ready = {}  # channel -> transport checked/opened for this batch
+        down = {}   # channel -> connect error, for the rest of the batch
+        for index, message in enumerate(batch):
+            if time.monotonic() >= deadline:
+                self.release(batch[index:])
+                break
+            channel = message["channel"]
+            if channel in down:
+                self.failed(message, down[channel])
+                continue
+            if channel not in ready:
+                try:
+                    ready[channel] = self.transport(channel)
+                except Exception as e:
+                    down[channel] = e
+                    self.failed(message, e)
+                    continue
+            try:
+                ready[channel].send(message)
+            except Exception as e:
+                self.failed(message, e)
+                continue
+            self.last_used[channel] = time.monotonic()
+            outbox.update_one(
+                {"_id": message["_id"]},
+                {"$set": {"status": "sent", "sentAt": nowIST(), "purgeAt": _purge_at()},
+                 "$unset": {"lockedBy": "", "lockedUntil": ""},
+                 "$inc": {"attempts": 1}},
+            )
+            sent += 1
+        return sent
+
+    def failed(self, message: dict, error: Exception):
+        attempts = message.get("attempts", 0) + 1
+        final = attempts >= OUTBOX_MAX_ATTEMPTS
+        logger.warning("Outbox %s to %s failed (attempt %s): %s", message["channel"], message["to"], attempts, error)
+        outbox.update_one(
+            {"_id": message["_id"]},
+            {"$set": {
+                "status": "failed" if final else "pending",
+                "attempts": attempts,
+                "lastError": str(error)[:500],
+                "nextAttemptAt": dt.datetime.utcnow() + dt.timedelta(seconds=_backoff(attempts)),
+                **({"purgeAt": _purge_at()} if final else {}),
+            },
+             "$unset": {"lockedBy": "", "lockedUntil": ""}},
+        )
+
+    def release(self, messages: list):
+        """Hand unsent messages back to the queue without counting an attempt."""
+        outbox.update_many(
+            {"_id": {"$in": [m["_id"] for m in messages]}, "lockedBy": self.name},
+            {"$set": {"status": "pending", "nextAttemptAt": dt.datetime.utcnow()},
+             "$unset": {"lockedBy": "", "lockedUntil": ""}},
+        )
+
+    def close_idle(self):
+        now = time.monotonic()
+        for channel, transport in list(self.transports.items()):
+            if now - self.last_used.get(channel, 0) > OUTBOX_IDLE_CLOSE:
+                transport.close()
+                del self.transports[channel]
+
+    def run_once(self) -> int:
+        """Claim and deliver one batch; returns how many messages were claimed."""
+        claimed_at = time.monotonic()
+        batch = self.claim_batch()
+        if batch:
+            self.deliver(batch, claimed_at + OUTBOX_LOCK_SECONDS - OUTBOX_LOCK_MARGIN)
+        self.close_idle()
+        return len(batch)
+
+    def run_forever(self):
+        while not self.stop_event.is_set():
+            try:
+                claimed = self.run_once()
+            except mongo_errors.PyMongoError:
+                logger.exception("Outbox worker: database error")
+                claimed = 0
+            except Exception:
+                logger.exception("Outbox worker: unexpected error")
+                claimed = 0
+            if claimed < OUTBOX_BATCH_SIZE:
+                # nothing (more) due: sleep until polled or woken by enqueue()
+                _wake.wait(OUTBOX_POLL_SECONDS)
+                _wake.clear()
+        for transport in self.transports.values():
+            transport.close()
+
+
+_worker_lock = threading.Lock()
+_worker_pid = None
+
+
+def start_outbox_worker() -> threading.Thread:
+    """Start one delivery thread per process (idempotent, fork-aware)."""
+    global _worker_pid
+    if _worker_pid == os.getpid():
+        return None
+    with _worker_lock:
+        if _worker_pid == os.getpid():
+            return None
+        _worker_pid = os.getpid()
+    thread = threading.Thread(target=OutboxWorker().run_forever, name="outbox-worker", daemon=True)
+    thread.start()
+    return thread
@@ -0,0 +1,145 @@
+"""
+Shared pagination for the list endpoints.
+
+Pages are fetched by keyset: the opaque `cursor` query param encodes the sort
+key and `_id` of the first/last item of the previous page, so page N costs the
+same as page 1. `?page=N` still works (skip/limit) for older clients.
+
+    items, meta = paginate(collection, query, projection, [("insertedAt", -1)], request.args)
+    # meta = {"page": 1 | None, "limit": 15, "next": "<cursor>" | None, "prev": "<cursor>" | None}
+"""
+
+import base64
+
+from bson import json_util
+from pymongo import ASCENDING
+
+
+def encode_cursor(values: list, direction: str) -> str:
+    raw = json_util.dumps({"v": values, "d": direction}).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_cursor(token: str) -> tuple:
+    try:
+        raw = base64.urlsafe_b64decode(token + "=" * (-len(token) % 4))
+        data = json_util.loads(raw.decode("utf-8"))
+        values, direction = data["v"], data["d"]
+    except Exception as e:
+        raise ValueError("Invalid cursor") from e
+    if direction not in ("next", "prev") or not isinstance(values, list):
+        raise ValueError("Invalid cursor")
+    return values, direction
+
+
+def _keyset_filter(sort: list, values: list, forward: bool) -> dict:
+    """Documents strictly after `values` in `sort` order (or before, if not forward)."""
+    branches = []
+    for i, (field, direction) in enumerate(sort):
+        prefix = {f: v for (f, _), v in zip(sort[:i], values[:i])}
+        value = values[i]
+        op = "$gt" if (direction == ASCENDING) == forward else "$lt"
+
+        # null/missing sorts before every other value
+        if value is None:
+            if op == "$gt":
+                branches.append({**prefix, field: {"$ne": None}})
+        else:
+            branches.append({**prefix, field: {op: value}})
+            if op == "$lt":
+                branches.append({**prefix, field: None})
+    return {"$or": branches}
+
+
+def _with_fields(projection, fields):
+    """Make sure the sort fields come back from Mongo; returns (projection, fields to strip)."""
+    if not projection:
+        return projection, []
+
+    projection = dict(projection)
+    strip = []
+    inclusive = any(v for k, v in projection.items() if k != "_id")
+    for field in fields:
+        if field == "_id":
+            if projection.pop("_id", 1) == 0:
+                strip.append("_id")
+        elif inclusive and not projection.get(field):
+            projection[field] = 1
+            strip.append(field)
+        elif not inclusive and projection.get(field, 1) == 0:
+            projection.pop(field)
+            strip.append(field)
+    return projection or None, strip
+
+
+def parse_limit(args, default_limit: int = 15) -> int:
+    limit = int(args.get("limit", default_limit))
+    if limit < 1:
+        raise ValueError("Invalid pagination values")
+    return limit
+
+
+def paginate(collection, query: dict, projection, sort: list, args, default_limit: int = 15):
+    """
+    Fetch one page of `collection.find(query, projection)` ordered by `sort`
+    (list of (field, direction)); `_id` is appended as tie-breaker.
+
+    Reads `cursor`, `page` and `limit` from `args`. Raises ValueError on bad
+    values. Returns (items, meta).
+    """
+    limit = parse_limit(args, default_limit)
+    sort = [s for s in sort if s[0] != "_id"]
+    sort.append(("_id", sort[-1][1] if sort else ASCENDING))
+    sort_fields = [f for f, _ in sort]
+
+    find_projection, strip = _with_fields(projection, sort_fields)
+    token = args.get("cursor")
+    page = None
+
+    if token:
+        values, direction = decode_cursor(token)
+        if len(values) != len(sort):
+            raise ValueError("Invalid cursor")
+        forward = direction == "next"
+        keyset = _keyset_filter(sort, values, forward)
+        find_query = {"$and": [query, keyset]} if query else keyset
+        find_sort = sort if forward else [(f, -d) for f, d in sort]
+        docs = list(collection.find(find_query, find_projection).sort(find_sort).limit(limit + 1))
+        has_more = len(docs) > limit
+        docs = docs[:limit]
+        if not forward:
+            docs.reverse()
+        has_next = has_more if forward else True
+        has_prev = True if forward else has_more
+    else:
+        page = int(args.get("page", 1))
+        if page < 1:
+            raise ValueError("Invalid pagination values")
+        cursor = collection.find(query, find_projection).sort(sort)
+        if page > 1:
+            cursor = cursor.skip((page - 1) * limit)
+        docs = list(cursor.limit(limit + 1))
+        has_next = len(docs) > limit
+        docs = docs[:limit]
+        has_prev = page > 1
+
+    meta = {"page": page, "limit": limit, "next": None, "prev": None}
+    if docs and has_next:
+        meta["next"] = encode_cursor([docs[-1].get(f) for f in sort_fields], "next")
+    if docs and has_prev:
+        meta["prev"] = encode_cursor([docs[0].get(f) for f in sort_fields], "prev")
+
+    for doc in docs:
+        for field in strip:
+            doc.pop(field, None)
+    return docs, meta
+
+
+def cursor_headers(response, meta: dict):
+    """Attach cursors as headers for endpoints whose `result` is a bare list."""
+    resp, status = response
+    if meta.get("next"):
+        resp.headers["X-Next-Cursor"] = meta["next"]
+    if meta.get("prev"):
+        resp.headers["X-Prev-Cursor"] = meta["prev"]
+    return resp, status
@@ -0,0 +1,50 @@
+"""
+Password history for the reuse check in /updatePassword.
+
+Only the last PASSWORD_HISTORY_SIZE hashes per user are kept in `passwords`
+(indexed on userId, changed_at); older rows are pruned whenever a new one is
+recorded, so the reuse check costs at most that many bcrypt verifications,
+and those run in parallel on the hashing pool (utils/passwords.verify_any).
+"""
+
+import os
+
+from pymongo import DESCENDING
+
+from config import db
+from utils.passwords import verify_any
+
+PASSWORD_HISTORY_SIZE = int(os.getenv("PASSWORD_HISTORY_SIZE", "5"))
+
+password_history = db.passwords
+
+
+def recent_hashes(user_id: str, limit: int = None) -> list:
+    rows = (
+        password_history.find({"userId": user_id}, {"previous_password": 1})
+        .sort("changed_at", DESCENDING)
+        .limit(limit or PASSWORD_HISTORY_SIZE)
+    )
+    return [row["previous_password"] for row in rows if row.get("previous_password")]
+
+
+def is_reused(user_id: str, plain: str) -> bool:
+    """True if `plain` matches one of the user's last PASSWORD_HISTORY_SIZE passwords."""
+    return verify_any(plain, recent_hashes(user_id))
+
+
+def record_password(user_id: str, hashed, changed_at: str) -> None:
+    """Append a hash to the history and drop everything beyond the newest N."""
+    password_history.insert_one({
+        "userId": user_id,
+        "previous_password": hashed,
+        "changed_at": changed_at,
+    })
+
+    keep = [
+        row["_id"]
+        for row in password_history.find({"userId": user_id}, {"_id": 1})
+        .sort("changed_at", DESCENDING)
+        .limit(PASSWORD_HISTORY_SIZE)
+    ]
+    password_history.delete_many({"userId": user_id, "_id": {"$nin": keep}})
@@ -0,0 +1,259 @@
+"""
+Password hashing service.
+
+bcrypt is deliberately slow (~250 ms at cost 12) and holds the calling thread
+for the whole time, so running it inline pins a web worker per login. Hashes
+and checks run on a dedicated process pool instead:
+
+- PASSWORD_POOL_WORKERS processes (default: CPU count), spawned lazily so they
+  never inherit the web process's Mongo client or threads, and re-created
+  after a fork or when a worker dies and breaks the pool (the job that hit
+  the broken pool is retried once on the new one).
+- at most PASSWORD_QUEUE_LIMIT jobs in flight per web process; beyond that
+  `PasswordPoolBusy` is raised and routes answer 429 with Retry-After.
+- BCRYPT_ROUNDS (default 12) is the cost for new hashes; `needs_rehash()`
+  tells login to upgrade hashes made with another cost.
+
+`password_metrics()` reports counters and latency percentiles.
+"""
+
+import multiprocessing
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", "12"))
+PASSWORD_POOL_WORKERS = int(os.getenv("PASSWORD_POOL_WORKERS", "0")) or (os.cpu_count() or 2)
+PASSWORD_QUEUE_LIMIT = int(os.getenv("PASSWORD_QUEUE_LIMIT", "0")) or PASSWORD_POOL_WORKERS * 8
+PASSWORD_RETRY_AFTER = int(os.getenv("PASSWORD_RETRY_AFTER", "2"))
+
+
+class PasswordPoolBusy(Exception):
+    """Too many hashing jobs queued; the caller should answer 429."""
+
+
+# --- runs in the worker processes (bcrypt is only imported there) -------------
+
+def _hashpw(plain: str, rounds: int) -> bytes:
+    import bcrypt
+    return bcrypt.hashpw(plain.encode("utf-8"), bcrypt.gensalt(rounds=rounds))
+
+
+def _checkpw(plain: str, hashed) -> bool:
+    import bcrypt
+    try:
+        if isinstance(hashed, str):
+            hashed = hashed.encode("utf-8")
+        return bcrypt.checkpw(plain.encode("utf-8"), hashed)
+    except Exception:
+        return False
+
+
+# --- pool ---------------------------------------------------------------------
+
+_lock = threading.Lock()
+_pool = None
+_pool_pid = None
+_in_flight = 0
+_counters = {
+    "hashed": 0, "verified": 0, "rehashed": 0, "rejectedBusy": 0, "cancelled": 0, "errors": 0, "poolRestarts": 0,
+}
+_latencies = deque(maxlen=1000)  # ms, most recent jobs (queue wait + bcrypt)
+
+
+def _get_pool() -> ProcessPoolExecutor:
+    global _pool, _pool_pid
+    with _lock:
+        if _pool is None or _pool_pid != os.getpid():
+            _pool = ProcessPoolExecutor(
+                max_workers=PASSWORD_POOL_WORKERS,
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+            _pool_pid = os.getpid()
+        return _pool
+
+
+def _drop_pool(pool) -> None:
+    """Forget a broken pool so the next job starts a new one (caller holds _lock)."""
+    global _pool
+    if _pool is pool:
+        _pool = None
+        _counters["poolRestarts"] += 1
+
+
+def _broken(future) -> bool:
+    return not future.cancelled() and isinstance(future.exception(), BrokenProcessPool)
+
+
+def _submit(fn, *args):
+    """Submit a job if under the queue limit; returns a Future."""
+    global _in_flight
+    with _lock:
+        if _in_flight >= PASSWORD_QUEUE_LIMIT:
+            _counters["rejectedBusy"] += 1
+            raise PasswordPoolBusy("Too many password operations in progress")
+        _in_flight += 1
+
+    started = time.monotonic()
+    try:
+        pool = _get_pool()
+        try:
+            future = pool.submit(fn, *args)
+        except BrokenProcessPool:
+            with _lock:
+                _drop_pool(pool)
+            pool = _get_pool()
+            future = pool.submit(fn, *args)
+    except Exception:
+        _job_done(started)
+        raise
+    future.add_done_callback(lambda f: _job_done(started, f, pool))
+    return future
+
+
+def _job_done(started: float, future=None, pool=None):
+    """Release the job's slot; runs for every outcome, cancellation included."""
+    global _in_flight
+    # a cancelled future raises CancelledError from exception(); check it first
+    error = future is None or (not future.cancelled() and future.exception() is not None)
+    with _lock:
+        _in_flight -= 1
+        _latencies.append((time.monotonic() - started) * 1000)
+        if error:
+            _counters["errors"] += 1
+            if future is not None and _broken(future):
+                _drop_pool(pool)
+
+
+def _run(fn, *args):
+    """Run a job and wait for it; a job lost with a broken pool is retried once."""
+    future = _submit(fn, *args)
+    try:
+        return future.result()
+    except BrokenProcessPool:
+        return _submit(fn, *args).result()
+
+
+def _cancel(futures) -> None:
+    """Cancel jobs that haven't started; the done-callback of each releases its slot."""
+    cancelled = sum(1 for f in futures if f.cancel())
+    with _lock:
+        _counters["cancelled"] += cancelled
+
+
+# --- public API ---------------------------------------------------------------
+
+def hash_password(plain: str) -> bytes:
+    result = _run(_hashpw, plain, BCRYPT_ROUNDS)
+    with _lock:
+        _counters["hashed"] += 1
+    return result
+
+
+def verify_password(plain: str, hashed) -> bool:
+    if not hashed:
+        return False
+    result = _run(_checkpw, plain, hashed)
+    with _lock:
+        _counters["verified"] += 1
+    return result
+
+
+def verify_any(plain: str, hashes: list) -> bool:
+    """
+    True if `plain` matches any of `hashes`. The checks run in parallel on the
+    pool and stop at the first match; jobs that haven't started are cancelled.
+    """
+    hashes = [h for h in hashes if h]
+    if not hashes:
+        return False
+
+    futures = {}  # future -> hash it checks
+    try:
+        for hashed in hashes:
+            futures[_submit(_checkpw, plain, hashed)] = hashed
+    except PasswordPoolBusy:
+        _cancel(futures)
+        raise
+
+    pending = set(futures)
+    retried = set()
+    matched = False
+    while pending and not matched:
+        done, pending = wait(pending, return_when=FIRST_COMPLETED)
+        matched = any(not f.cancelled() and f.exception() is None and f.result() for f in done)
+        # checks lost with a broken pool get one more try on the new one
+        for f in done:
+            if not matched and _broken(f) and futures[f] not in retried:
+                retried.add(futures[f])
+                try:
+                    retry = _submit(_checkpw, plain, futures[f])
+                except PasswordPoolBusy:
+                    _cancel(pending)
+                    raise
+                futures[retry] = futures[f]
+                pending.add(retry)
+    _cancel(pending)
+
+    with _lock:
+        _counters["verified"] += len(futures) - len(pending)
+    return matched
+
+
+def hash_rounds(hashed) -> int:
+    """Cost factor of a bcrypt hash ("$2b$12$..." -> 12); 0 if unparseable."""
+    if isinstance(hashed, bytes):
+        hashed = hashed.decode("utf-8", "ignore")
+    try:
+        return int(str(hashed).split("$")[2])
+    except (IndexError, ValueError):
+        return 0
+
+
+def needs_rehash(hashed) -> bool:
+    return hash_rounds(hashed) != BCRYPT_ROUNDS
+
+
+def rehash_in_background(plain: str, on_done) -> bool:
+    """
+    Hash `plain` at the current cost without blocking the request, then call
+    `on_done(new_hash)`. Skipped (returns False) when the pool is busy; the
+    next login will try again.
+    """
+    try:
+        future = _submit(_hashpw, plain, BCRYPT_ROUNDS)
+    except PasswordPoolBusy:
+        return False
+
+    def _finish(f):
+        if f.cancelled() or f.exception() is not None:
+            return
+        on_done(f.result())
+        with _lock:
+            _counters["rehashed"] += 1
+
+    future.add_done_callback(_finish)
+    return True
+
+
+def password_metrics() -> dict:
+    with _lock:
+        samples = sorted(_latencies)
+        metrics = {
+            **_counters,
+            "inFlight": _in_flight,
+            "queueLimit": PASSWORD_QUEUE_LIMIT,
+            "workers": PASSWORD_POOL_WORKERS,
+            "rounds": BCRYPT_ROUNDS,
+        }
+
+    def pct(p):
+        if not samples:
+            return None
+        return round(samples[min(len(samples) - 1, int(len(samples) * p))], 1)
+
+    metrics["latencyMs"] = {"p50": pct(0.50), "p95": pct(0.95), "p99": pct(0.99)}
+    return metrics
@@ -0,0 +1,157 @@
+"""
+Per-process registry for network clients (Mongo, S3, Gemini).
+
+Clients are built on first use, not at import, and once per process: after a
+fork (gunicorn --preload) the child builds its own instead of reusing the
+parent's sockets and background threads, which pymongo and boto3 don't
+support. Importing the app therefore needs no network access.
+
+    register("s3", make_s3_client, health=lambda c: c.head_bucket(Bucket=...))
+    s3_client = LazyProxy("s3")      # module-level, resolves on first attribute access
+
+`config.py` registers the clients and exposes `client` / `db` as proxies, so
+`from config import db` and `users = db.users` keep working unchanged.
+"""
+
+import os
+import threading
+import time
+
+from pymongo.database import Database
+
+_lock = threading.Lock()
+_registry = {}    # name -> {"factory", "close", "health"}
+_instances = {}   # name -> (pid, instance)
+
+
+def register(name: str, factory, close=None, health=None) -> None:
+    """`factory()` builds the client; `close(c)` releases it; `health(c)` raises if unhealthy."""
+    _registry[name] = {"factory": factory, "close": close, "health": health}
+
+
+def get(name: str):
+    pid = os.getpid()
+    entry = _instances.get(name)
+    if entry and entry[0] == pid:
+        return entry[1]
+
+    with _lock:
+        entry = _instances.get(name)
+        if entry and entry[0] == pid:
+            return entry[1]
+        instance = _registry[name]["factory"]()
+        _instances[name] = (pid, instance)
+        return instance
+
+
+def is_created(name: str) -> bool:
+    entry = _instances.get(name)
+    return bool(entry) and entry[0] == os.getpid()
+
+
+def close(name: str = None) -> None:
+    """Close and forget one client (or all) in this process."""
+    with _lock:
+        for key in [name] if name else list(_instances):
+            entry = _instances.pop(key, None)
+            closer = _registry.get(key, {}).get("close")
+            if entry and entry[0] == os.getpid() and closer:
+                closer(entry[1])
+
+
+def check_health(names=None, create: bool = False) -> dict:
+    """
+    {name: {"ok": bool, "ms": float, "error": str?}} for each resource with a
+    health check. Resources not built yet in this process are skipped unless
+    `create` is set.
+    """
+    report = {}
+    for name, spec in _registry.items():
+        if names and name not in names:
+            continue
+        if not spec["health"] or not (create or is_created(name)):
+            continue
+        started = time.monotonic()
+        try:
+            spec["health"](get(name))
+            report[name] = {"ok": True}
+        except Exception as e:
+            report[name] = {"ok": False, "error": str(e)[:300]}
+        report[name]["ms"] = round((time.monotonic() - started) * 1000, 1)
+    return report
+
+
+def _forget_after_fork():
+    # the parent's clients are unusable here; drop references without closing them
+    _instances.clear()
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_forget_after_fork)
+
+
+class LazyProxy:
+    """Forwards attribute access to the registered client, built on first use."""
+
+    def __init__(self, name: str):
+        object.__setattr__(self, "_name", name)
+
+    def __getattr__(self, attr):
+        return getattr(get(self._name), attr)
+
+    def __getitem__(self, key):
+        return get(self._name)[key]
+
+    def __repr__(self):
+        return f"<LazyProxy {self._name}>"
+
+
+class LazyCollection:
+    """A collection of a LazyDatabase; `.name` is known without connecting."""
+
+    def __init__(self, database: "LazyDatabase", name: str):
+        self.name = name
+        self._database = database
+        self._resolved = (None, None)   # (pid, Collection)
+
+    def _collection(self):
+        pid, coll = self._resolved
+        if pid != os.getpid():
+            coll = self._database._db()[self.name]
+            self._resolved = (os.getpid(), coll)
+        return coll
+
+    def __getattr__(self, attr):
+        return getattr(self._collection(), attr)
+
+    def __getitem__(self, key):
+        return self._collection()[key]
+
+    def __repr__(self):
+        return f"<LazyCollection {self._database.name}.{self.name}>"
+
+
+class LazyDatabase:
+    """`db.users` / `db["users"]` give LazyCollections; Database methods resolve the client."""
+
+    def __init__(self, client_name: str, db_name: str):
+        self.name = db_name
+        self._client_name = client_name
+        self._collections = {}
+
+    def _db(self):
+        return get(self._client_name)[self.name]
+
+    def __getattr__(self, attr):
+        if attr.startswith("_") or hasattr(Database, attr):
+            return getattr(self._db(), attr)
+        return self[attr]
+
+    def __getitem__(self, name):
+        coll = self._collections.get(name)
+        if coll is None:
+            coll = self._collections.setdefault(name, LazyCollection(self, name))
+        return coll
+
+    def __repr__(self):
+        return f"<LazyDatabase {self.name}>"
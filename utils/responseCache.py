@@ -0,0 +1,219 @@
+"""
+Response cache for the read-mostly master-data endpoints (villages, options,
+stages, materials, facilities, buildings, system config, static pages).
+
+    @village_bp.route("/villages", methods=["GET"])
+    @cached_response("villages")
+    def get_all_villages(): ...
+
+- Bodies are cached per (namespace, path, query string) in a per-process LRU
+  of RESPONSE_CACHE_SIZE entries for RESPONSE_CACHE_TTL seconds.
+- Every response carries an ETag; a matching If-None-Match gets a 304 with no
+  body. Cache-Control is `no-cache` (clients always revalidate, which is
+  cheap) unless RESPONSE_CACHE_MAX_AGE is set.
+- Write routes call `invalidate_cache(namespace)`. The process that wrote sees
+  the change at once.
+- With RESPONSE_CACHE_SHARED=1, bodies are also stored in the `responseCache`
+  collection and generations in `cacheGenerations`, so workers share one copy
+  and see each other's invalidations within RESPONSE_CACHE_GEN_TTL seconds.
+  Without it, other workers serve the old body for at most RESPONSE_CACHE_TTL.
+"""
+
+import datetime as dt
+import functools
+import hashlib
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+
+from flask import Response, make_response as flask_response, request
+from pymongo import ReturnDocument, errors as mongo_errors
+
+from config import db
+
+logger = logging.getLogger(__name__)
+
+RESPONSE_CACHE_TTL = float(os.getenv("RESPONSE_CACHE_TTL", "300"))
+RESPONSE_CACHE_SIZE = int(os.getenv("RESPONSE_CACHE_SIZE", "512"))
+RESPONSE_CACHE_MAX_AGE = int(os.getenv("RESPONSE_CACHE_MAX_AGE", "0"))
+RESPONSE_CACHE_SHARED = os.getenv("RESPONSE_CACHE_SHARED", "0") == "1"
+RESPONSE_CACHE_GEN_TTL = float(os.getenv("RESPONSE_CACHE_GEN_TTL", "1"))
+
+# only these are stored; errors (500) always go back to the route
+CACHEABLE_STATUS = {200, 404}
+
+response_cache = db.responseCache
+cache_generations = db.cacheGenerations
+
+_lock = threading.Lock()
+_cache = OrderedDict()    # key -> (expires_at, generation, status, body, etag)
+_generations = {}         # namespace -> bumped on every local write
+_shared_generations = {}  # namespace -> (checked_until, generation) from cacheGenerations
+
+
+# --- generations --------------------------------------------------------------
+
+def _shared_generation(namespace: str) -> int:
+    now = time.monotonic()
+    checked = _shared_generations.get(namespace)
+    if checked and checked[0] > now:
+        return checked[1]
+    doc = cache_generations.find_one({"_id": namespace}, {"generation": 1})
+    generation = doc["generation"] if doc else 0
+    _shared_generations[namespace] = (now + RESPONSE_CACHE_GEN_TTL, generation)
+    return generation
+
+
+def _generation(namespace: str) -> tuple:
+    local = _generations.get(namespace, 0)
+    if not RESPONSE_CACHE_SHARED:
+        return (local, 0)
+    try:
+        return (local, _shared_generation(namespace))
+    except mongo_errors.PyMongoError:
+        logger.warning("Response cache: cannot read generation of %s", namespace, exc_info=True)
+        return (local, None)
+
+
+def invalidate_cache(*namespaces) -> None:
+    """Drop cached responses of `namespaces`; call after the write succeeded."""
+    with _lock:
+        for namespace in namespaces:
+            _generations[namespace] = _generations.get(namespace, 0) + 1
+    if not RESPONSE_CACHE_SHARED:
+        return
+    for namespace in namespaces:
+        try:
+            doc = cache_generations.find_one_and_update(
+                {"_id": namespace},
+                {"$inc": {"generation": 1}},
+                upsert=True,
+                return_document=ReturnDocument.AFTER,
+            )
+            _shared_generations[namespace] = (time.monotonic() + RESPONSE_CACHE_GEN_TTL, doc["generation"])
+        except mongo_errors.PyMongoError:
+            logger.warning("Response cache: cannot invalidate %s", namespace, exc_info=True)
+
+
+# --- storage ------------------------------------------------------------------
+
+def _local_get(key, generation):
+    entry = _cache.get(key)
+    if not entry:
+        return None
+    expires_at, gen, status, body, etag = entry
+    if gen != generation or expires_at < time.monotonic():
+        _cache.pop(key, None)
+        return None
+    _cache.move_to_end(key)
+    return status, body, etag
+
+
+def _local_put(key, generation, status, body, etag):
+    _cache[key] = (time.monotonic() + RESPONSE_CACHE_TTL, generation, status, body, etag)
+    _cache.move_to_end(key)
+    while len(_cache) > RESPONSE_CACHE_SIZE:
+        _cache.popitem(last=False)
+
+
+def _shared_id(key) -> str:
+    return hashlib.sha1(repr(key).encode("utf-8")).hexdigest()
+
+
+def _shared_get(key, generation):
+    try:
+        doc = response_cache.find_one({
+            "_id": _shared_id(key),
+            "generation": generation[1],
+            "expiresAt": {"$gt": dt.datetime.utcnow()},
+        })
+    except mongo_errors.PyMongoError:
+        logger.warning("Response cache: shared read failed", exc_info=True)
+        return None
+    if not doc:
+        return None
+    return doc["status"], bytes(doc["body"]), doc["etag"]
+
+
+def _shared_put(key, generation, status, body, etag):
+    try:
+        response_cache.replace_one(
+            {"_id": _shared_id(key)},
+            {
+                "namespace": key[0],
+                "generation": generation[1],
+                "status": status,
+                "body": body,
+                "etag": etag,
+                "expiresAt": dt.datetime.utcnow() + dt.timedelta(seconds=RESPONSE_CACHE_TTL),
+            },
+            upsert=True,
+        )
+    except mongo_errors.PyMongoError:
+        logger.warning("Response cache: shared write failed", exc_info=True)
+
+
+# --- decorator ----------------------------------------------------------------
+
+def _cache_control() -> str:
+    if RESPONSE_CACHE_MAX_AGE > 0:
+        return f"public, max-age={RESPONSE_CACHE_MAX_AGE}, must-revalidate"
+    return "no-cache"
+
+
+def _build_response(status, body, etag, vary_header=None):
+    response = Response(body, status=status, mimetype="application/json")
+    response.set_etag(etag)
+    response.headers["Cache-Control"] = _cache_control()
+    if vary_header:
+        response.vary.add(vary_header)
+    # 304 when If-None-Match matches (only applies to 200 GET/HEAD)
+    return response.make_conditional(request)
+
+
+def cached_response(namespace: str, vary=None, vary_header: str = None):
+    """
+    Cache a GET route's JSON response under `namespace`.
+    `vary()` returns an extra key part for routes whose answer depends on more
+    than path and query string (e.g. the caller's system from its User-Agent);
+    `vary_header` is then sent as the Vary header.
+    """
+    def decorator(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            key = (
+                namespace,
+                request.path,
+                tuple(sorted(request.args.items(multi=True))),
+                vary() if vary else None,
+            )
+
+            generation = _generation(namespace)
+            with _lock:
+                hit = _local_get(key, generation)
+
+            use_shared = RESPONSE_CACHE_SHARED and generation[1] is not None
+            if hit is None and use_shared:
+                hit = _shared_get(key, generation)
+                if hit is not None:
+                    with _lock:
+                        _local_put(key, generation, *hit)
+            if hit is not None:
+                return _build_response(*hit, vary_header=vary_header)
+
+            response = flask_response(fn(*args, **kwargs))
+            if response.status_code not in CACHEABLE_STATUS:
+                return response
+
+            body = response.get_data()
+            etag = hashlib.sha1(body).hexdigest()
+            with _lock:
+                _local_put(key, generation, response.status_code, body, etag)
+            if use_shared:
+                _shared_put(key, generation, response.status_code, body, etag)
+            return _build_response(response.status_code, body, etag, vary_header=vary_header)
+
+        return wrapper
+    return decorator
@@ -0,0 +1,215 @@
+"""
+Indexed name search for the list endpoints.
+
+Name filters (`mukhiyaName`, `name`, `venue`) used to be unanchored
+case-insensitive regexes on the raw field, which always scan. Instead, every
+write stores normalized search keys next to the document:
+
+    searchKeys: {
+        "mukhiyaName": ["rameesh kumar", "kumar", "ramish kumar"],  # word starts, as typed and folded
+        "mukhiyaNameGrams": ["  r", " ra", "ram", ...],  # only with SEARCH_NGRAMS=1
+    }
+
+Keys are lowercase, accent-free Latin; Devanagari is transliterated first, so
+"राम कुमार" and "Ram Kumar" produce the same key. Lookups are anchored prefix
+regexes on the key (escaped), which the multikey index in utils/indexes.py
+serves. The word keys are stored both as spelled and with the spelling folds
+(ee -> i, doubled letters, ...): a query still being typed ("Rame") matches
+the spelled form, a finished variant ("Ramish") the folded one.
+`?match=fuzzy` matches on shared trigrams of the folded key instead, for
+spelling variants ("Ramesh" / "Rames" / "रमेश").
+
+Inserts call `with_search_keys(doc, field)`, `$set` updates call
+`set_search_keys(update_dict, field)`. Documents written before this existed
+are backfilled by `python scripts/build_search_keys.py`.
+"""
+
+import math
+import os
+import re
+import unicodedata
+
+SEARCH_NGRAMS = os.getenv("SEARCH_NGRAMS", "0") == "1"
+SEARCH_FUZZY_RATIO = float(os.getenv("SEARCH_FUZZY_RATIO", "0.6"))
+
+# collection -> fields that have search keys
+SEARCH_FIELDS = {
+    "testing": ["mukhiyaName"],
+    "house": ["mukhiyaName"],
+    "plots": ["name"],
+    "feedback": ["name"],
+    "meetings": ["venue"],
+    "materialUpdates": ["name"],
+    "facilityUpdates": ["name"],
+    "optionUpdates": ["name"],
+    "plotUpdates": ["name"],
+}
+
+# Projection fragment that keeps search keys out of API responses.
+HIDE_SEARCH_KEYS = {"searchKeys": 0}
+
+
+_VOWELS = {
+    "अ": "a", "आ": "a", "इ": "i", "ई": "i", "उ": "u", "ऊ": "u", "ऋ": "ri",
+    "ए": "e", "ऐ": "ai", "ओ": "o", "औ": "au", "ऑ": "o",
+}
+_MATRAS = {
+    "ा": "a", "ि": "i", "ी": "i", "ु": "u", "ू": "u", "ृ": "ri",
+    "े": "e", "ै": "ai", "ो": "o", "ौ": "au", "ॉ": "o",
+}
+_CONSONANTS = {
+    "क": "k", "ख": "kh", "ग": "g", "घ": "gh", "ङ": "n",
+    "च": "ch", "छ": "chh", "ज": "j", "झ": "jh", "ञ": "n",
+    "ट": "t", "ठ": "th", "ड": "d", "ढ": "dh", "ण": "n",
+    "त": "t", "थ": "th", "द": "d", "ध": "dh", "न": "n",
+    "प": "p", "फ": "ph", "ब": "b", "भ": "bh", "म": "m",
+    "य": "y", "र": "r", "ल": "l", "व": "v",
+    "श": "sh", "ष": "sh", "स": "s", "ह": "h", "ळ": "l",
+}
+_VIRAMA = "्"
+_NUKTA = "़"
+_NASALS = {"ं": "n", "ँ": "n"}
+_VISARGA = "ः"
+
+# Spelling folds so common Hindi/English romanizations meet (see fold_key).
+_FOLDS = [
+    (re.compile(r"ee"), "i"),
+    (re.compile(r"oo"), "u"),
+    (re.compile(r"w"), "v"),
+    (re.compile(r"ng(?=h|[^aeiou]|$)"), "n"),
+    (re.compile(r"(.)\1+"), r"\1"),
+]
+
+
+def transliterate(text: str) -> str:
+    """Devanagari -> rough Latin (inherent vowel dropped at word end)."""
+    out = []
+    pending = False  # inherent "a" after a consonant, not yet written
+
+    for ch in text:
+        if ch in _CONSONANTS:
+            if pending:
+                out.append("a")
+            out.append(_CONSONANTS[ch])
+            pending = True
+        elif ch in _MATRAS:
+            out.append(_MATRAS[ch])
+            pending = False
+        elif ch == _VIRAMA:
+            pending = False
+        elif ch == _NUKTA:
+            continue
+        else:
+            # the inherent vowel is sounded before a nasal/visarga/vowel, dropped at word end
+            if pending and (ch in _NASALS or ch == _VISARGA or ch in _VOWELS):
+                out.append("a")
+            pending = False
+            if ch in _NASALS:
+                out.append(_NASALS[ch])
+            elif ch == _VISARGA:
+                out.append("h")
+            else:
+                out.append(_VOWELS.get(ch, ch))
+    return "".join(out)
+
+
+def search_key(text, fold: bool = True) -> str:
+    """Normalized form of a name: lowercase Latin words separated by single spaces."""
+    if not text:
+        return ""
+    text = transliterate(str(text))
+    text = unicodedata.normalize("NFKD", text)
+    text = "".join(c for c in text if not unicodedata.combining(c)).lower()
+    text = re.sub(r"[^a-z0-9]+", " ", text).strip()
+    return fold_key(text) if fold else text
+
+
+def fold_key(key: str) -> str:
+    """
+    Apply the spelling folds ("rameesh" -> "ramish"). Only meaningful for
+    complete words: a folded prefix is not a prefix of the folded word
+    ("rame" vs "ramish"), so prefix lookups also keep the unfolded key.
+    """
+    for pattern, repl in _FOLDS:
+        key = pattern.sub(repl, key)
+    return key
+
+
+def word_keys(key: str) -> list:
+    """'ram kumar' -> ['ram kumar', 'kumar']: a prefix of any entry is a word-start match."""
+    words = key.split()
+    return [" ".join(words[i:]) for i in range(len(words))]
+
+
+def ngrams(key: str, n: int = 3) -> list:
+    grams = set()
+    for word in key.split():
+        padded = f"{' ' * (n - 1)}{word} "
+        grams.update(padded[i:i + n] for i in range(len(padded) - n + 1))
+    return sorted(grams)
+
+
+def _keys_for(value) -> dict:
+    key = search_key(value, fold=False)
+    folded = fold_key(key)
+    keys = {"words": list(dict.fromkeys(word_keys(key) + word_keys(folded)))}
+    if SEARCH_NGRAMS:
+        keys["grams"] = ngrams(folded)
+    return keys
+
+
+def with_search_keys(doc: dict, *fields) -> dict:
+    """Copy of a document about to be inserted, with `searchKeys` for `fields`."""
+    search = {}
+    for field in fields:
+        if doc.get(field) is None:
+            continue
+        keys = _keys_for(doc[field])
+        search[field] = keys["words"]
+        if "grams" in keys:
+            search[f"{field}Grams"] = keys["grams"]
+    return {**doc, "searchKeys": search}
+
+
+def set_search_keys(update: dict, *fields) -> dict:
+    """Copy of a `$set` dict, with dotted `searchKeys.*` entries for the `fields` it changes."""
+    update = dict(update)
+    for field in fields:
+        if update.get(field) is None:
+            continue
+        keys = _keys_for(update[field])
+        update[f"searchKeys.{field}"] = keys["words"]
+        if "grams" in keys:
+            update[f"searchKeys.{field}Grams"] = keys["grams"]
+    return update
+
+
+def search_filter(field: str, text: str, match: str = None) -> dict:
+    """
+    Query fragment for a name filter; merge it into the route's query.
+    `match` is "prefix" (default) or "fuzzy" (needs SEARCH_NGRAMS=1, otherwise
+    falls back to prefix).
+    """
+    key = search_key(text, fold=False)
+    if not key:
+        return {}
+    folded = fold_key(key)
+
+    if match == "fuzzy" and SEARCH_NGRAMS:
+        grams = ngrams(folded)
+        need = max(1, math.ceil(len(grams) * SEARCH_FUZZY_RATIO))
+        grams_field = f"searchKeys.{field}Grams"
+        return {
+            grams_field: {"$in": grams},
+            "$expr": {
+                "$gte": [
+                    {"$size": {"$setIntersection": [{"$ifNull": [f"${grams_field}", []]}, grams]}},
+                    need,
+                ]
+            },
+        }
+
+    # as typed (a prefix of the spelled word keys) or folded (a finished spelling variant)
+    if folded == key:
+        return {f"searchKeys.{field}": {"$regex": "^" + re.escape(key)}}
+    return {f"searchKeys.{field}": {"$in": [re.compile("^" + re.escape(key)), re.compile("^" + re.escape(folded))]}}
@@ -0,0 +1,176 @@
+"""
+Presigned GET URLs for uploaded documents, signed in bulk and cached.
+
+Signing is local (no S3 call), but detail screens ask for 10-30 documents at
+once. `sign_many()` signs them in one go. Each URL is kept per process until
+SIGNED_URL_REFRESH_MARGIN seconds before it expires, so repeated views
+return the same URL (which the browser can cache). `head_object` only runs
+when the caller asks for `verify`.
+
+List endpoints accept `?signUrls=1` (optionally `&rendition=thumb`):
+`embed_signed_urls(items, request.args)` adds `signedUrls: {s3_uri: url}`
+to every item, covering any uploads/ URI in the item (docs, photos,
+mukhiyaPhoto, members, ...).
+
+A `rendition` is only honoured for uploads whose `uploads` record lists it
+(images posted to /upload, see utils/uploads.record_uploads). Direct uploads,
+photos stored before renditions existed and non-images are signed as stored.
+The renditions of a key are looked up once per process, in one query per call.
+"""
+
+import os
+import threading
+import time
+from collections import OrderedDict
+from urllib.parse import urlparse
+
+from config import BUCKET_NAME, s3_client
+from utils.images import is_image, rendition_key
+from utils.uploads import uploads
+
+SIGNED_URL_EXPIRES = int(os.getenv("SIGNED_URL_EXPIRES", "3600"))
+SIGNED_URL_REFRESH_MARGIN = int(os.getenv("SIGNED_URL_REFRESH_MARGIN", "300"))
+SIGNED_URL_CACHE_SIZE = int(os.getenv("SIGNED_URL_CACHE_SIZE", "10000"))
+SIGN_BATCH_LIMIT = int(os.getenv("SIGN_BATCH_LIMIT", "200"))
+
+UPLOAD_URI_PREFIX = f"s3://{BUCKET_NAME}/uploads/"
+
+_lock = threading.Lock()
+_cache = OrderedDict()        # object key -> (reuse_until, url)
+_renditions = OrderedDict()   # upload key -> recorded rendition names
+
+
+def upload_key(uri: str) -> str:
+    """The object key of an s3://<bucket>/uploads/... URI. Raises ValueError."""
+    parsed = urlparse(uri if isinstance(uri, str) else "")
+    if parsed.scheme != "s3":
+        raise ValueError("Invalid URI scheme. Expected 's3'.")
+    if parsed.netloc != BUCKET_NAME:
+        raise ValueError("Invalid bucket name in URI.")
+    key = parsed.path.lstrip("/")
+    if not key.startswith("uploads/"):
+        raise ValueError("Invalid S3 key format or path.")
+    return key
+
+
+def _remember(cache: OrderedDict, key, value) -> None:
+    """Store in one of the LRU caches; call with _lock held."""
+    cache[key] = value
+    cache.move_to_end(key)
+    while len(cache) > SIGNED_URL_CACHE_SIZE:
+        cache.popitem(last=False)
+
+
+def resolve_keys(keys: list, rendition: str = None) -> dict:
+    """
+    {key: object key to sign}: the `rendition` of each image key that has it
+    recorded, the key itself otherwise.
+    """
+    if not rendition:
+        return {key: key for key in keys}
+    images = [key for key in dict.fromkeys(keys) if is_image(key)]
+
+    with _lock:
+        known = {key: _renditions[key] for key in images if key in _renditions}
+    missing = [key for key in images if key not in known]
+    if missing:
+        found = {
+            doc["_id"]: tuple(doc.get("renditions") or ())
+            for doc in uploads.find({"_id": {"$in": missing}}, {"renditions": 1})
+        }
+        with _lock:
+            for key in missing:
+                # keys without a record (direct / older uploads) never get renditions
+                known[key] = found.get(key, ())
+                _remember(_renditions, key, known[key])
+
+    return {
+        key: rendition_key(key, rendition) if rendition in known.get(key, ()) else key
+        for key in keys
+    }
+
+
+def _sign(key: str, verify: bool = False) -> str:
+    now = time.monotonic()
+    with _lock:
+        entry = _cache.get(key)
+        if entry and entry[0] > now and not verify:
+            _cache.move_to_end(key)
+            return entry[1]
+
+    if verify:
+        s3_client.head_object(Bucket=BUCKET_NAME, Key=key)
+    url = s3_client.generate_presigned_url(
+        "get_object",
+        Params={"Bucket": BUCKET_NAME, "Key": key},
+        ExpiresIn=SIGNED_URL_EXPIRES,
+    )
+
+    with _lock:
+        _remember(_cache, key, (now + SIGNED_URL_EXPIRES - SIGNED_URL_REFRESH_MARGIN, url))
+    return url
+
+
+def sign_key(key: str, rendition: str = None, verify: bool = False) -> str:
+    """
+    Presigned GET URL for `key`, or for its image rendition when one is
+    recorded. With `verify`, head_object runs first and a missing object
+    raises ClientError.
+    """
+    return _sign(resolve_keys([key], rendition)[key], verify)
+
+
+def sign_many(uris: list, rendition: str = None, verify: bool = False) -> tuple:
+    """Returns ({uri: url}, {uri: error}) for every distinct URI."""
+    from botocore.exceptions import ClientError  # botocore loads on first S3 request
+
+    urls, errors, keys = {}, {}, {}
+    for uri in dict.fromkeys(uris):
+        try:
+            keys[uri] = upload_key(uri)
+        except ValueError as e:
+            errors[uri] = str(e)
+
+    resolved = resolve_keys(list(keys.values()), rendition)
+    for uri, key in keys.items():
+        try:
+            urls[uri] = _sign(resolved[key], verify)
+        except ClientError as e:
+            errors[uri] = "File not found" if e.response["Error"]["Code"] == "404" else "Failed to generate URL"
+    return urls, errors
+
+
+def _upload_uris(value, found: dict) -> None:
+    if isinstance(value, str):
+        if value.startswith(UPLOAD_URI_PREFIX):
+            found[value] = None
+    elif isinstance(value, dict):
+        for v in value.values():
+            _upload_uris(v, found)
+    elif isinstance(value, list):
+        for v in value:
+            _upload_uris(v, found)
+
+
+def embed_signed_urls(items, args):
+    """
+    With `?signUrls=1`, add `signedUrls: {uri: url}` to each item (a dict or a
+    list of dicts) for every upload URI it contains. Returns `items`.
+    Raises ValueError for an unknown `rendition`.
+    """
+    if args.get("signUrls", "").lower() not in ("1", "true"):
+        return items
+    rendition = args.get("rendition") or None
+    rendition_key("", rendition)   # validates the rendition name
+    items_list = items if isinstance(items, list) else [items]
+    found = []
+    for item in items_list:
+        uris = {}
+        _upload_uris(item, uris)
+        found.append(uris)
+
+    prefix = len(f"s3://{BUCKET_NAME}/")
+    resolved = resolve_keys([uri[prefix:] for uris in found for uri in uris], rendition)
+    for item, uris in zip(items_list, found):
+        item["signedUrls"] = {uri: _sign(resolved[uri[prefix:]]) for uri in uris}
+    return items
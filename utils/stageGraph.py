@@ -0,0 +1,131 @@
+"""
+Compiled stage graphs for the verification inserts.
+
+A building type, a relocation option and the village-stage tree each define an
+ordered list of stages; a stage can only be verified once every stage before it
+is complete. Instead of rebuilding those lists (and calling `list.index()`)
+on every insert, each one is compiled once into a `StageGraph`:
+
+- `position`: stageId -> index
+- `prereqs[i]`: bitset of the stages that must be complete before stage i
+- `groups` (village tree only): stageId -> the subStageIds it contains
+
+    graph = building_stages(buildings, villageId, typeId)
+    missing = graph.missing(current_stage, completed_stages)
+
+Graphs are cached per process for STAGE_GRAPH_TTL seconds. The stage-editing
+routes call `invalidate_stage_graphs(collection.name)`, which the writing
+process sees at once; other workers pick up the change within the TTL.
+"""
+
+import os
+import threading
+import time
+
+STAGE_GRAPH_TTL = float(os.getenv("STAGE_GRAPH_TTL", "30"))
+
+_lock = threading.Lock()
+_cache = {}          # (collection, key...) -> (expires_at, generation, graph)
+_generations = {}    # collection -> bumped on every stage edit
+
+
+class StageGraph:
+    """Ordered stages with O(1) lookups and prerequisite bitsets."""
+
+    __slots__ = ("ids", "position", "names", "stage_map", "prereqs", "groups")
+
+    def __init__(self, stages: list, id_field: str = "stageId", groups: dict = None):
+        self.ids = tuple(s[id_field] for s in stages)
+        self.position = {stage_id: i for i, stage_id in enumerate(self.ids)}
+        self.names = {s[id_field]: s.get("name", "") for s in stages}
+        # shape expected by utils.verificationPipeline
+        self.stage_map = {s[id_field]: {"name": s.get("name", ""), "desc": s.get("desc", "")} for s in stages}
+        self.prereqs = tuple((1 << i) - 1 for i in range(len(self.ids)))
+        self.groups = groups or {}
+
+    def __contains__(self, stage_id) -> bool:
+        return stage_id in self.position
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def mask(self, stage_ids) -> int:
+        """Bitset of `stage_ids` (ids not in this graph are ignored)."""
+        bits = 0
+        for stage_id in stage_ids or ():
+            i = self.position.get(stage_id)
+            if i is not None:
+                bits |= 1 << i
+        return bits
+
+    def missing(self, stage_id, completed) -> list:
+        """Prerequisites of `stage_id` not in `completed`, in stage order."""
+        todo = self.prereqs[self.position[stage_id]] & ~self.mask(completed)
+        return [self.ids[i] for i in range(todo.bit_length()) if todo >> i & 1]
+
+    def missing_names(self, stage_id, completed) -> list:
+        return [self.names[s] for s in self.missing(stage_id, completed)]
+
+
+def invalidate_stage_graphs(collection_name: str) -> None:
+    with _lock:
+        _generations[collection_name] = _generations.get(collection_name, 0) + 1
+
+
+def _cached(key, build):
+    with _lock:
+        generation = _generations.get(key[0], 0)
+        entry = _cache.get(key)
+        if entry and entry[1] == generation and entry[0] > time.monotonic():
+            return entry[2]
+
+    graph = build()
+    with _lock:
+        _cache[key] = (time.monotonic() + STAGE_GRAPH_TTL, generation, graph)
+    return graph
+
+
+def _live(stages: list) -> list:
+    return [s for s in stages or [] if not s.get("deleted", False)]
+
+
+def building_stages(collection, village_id: str, type_id: str):
+    """Graph of a building type's stages; None if the type does not exist."""
+    def build():
+        doc = collection.find_one(
+            {"typeId": type_id, "villageId": village_id, "deleted": False},
+            {"_id": 0, "stages": 1},
+        )
+        return StageGraph(_live(doc.get("stages"))) if doc else None
+
+    return _cached((collection.name, "building", village_id, type_id), build)
+
+
+def option_stages(collection, option_id: str):
+    """Graph of a relocation option's stages; None if the option does not exist."""
+    def build():
+        doc = collection.find_one({"optionId": option_id, "deleted": False}, {"_id": 0, "stages": 1})
+        return StageGraph(_live(doc.get("stages"))) if doc else None
+
+    return _cached((collection.name, "option", option_id), build)
+
+
+def village_substages(collection):
+    """
+    Graph of every live sub stage of the village-stage tree, in stage
+    `position` order then sub-stage order; `groups` maps each stage to its
+    sub stages.
+    """
+    def build():
+        docs = collection.find(
+            {"deleted": False},
+            {"_id": 0, "stageId": 1, "position": 1, "stages.subStageId": 1, "stages.name": 1, "stages.deleted": 1},
+        ).sort("position", 1)
+        flattened, groups = [], {}
+        for doc in docs:
+            subs = _live(doc.get("stages"))
+            groups[doc["stageId"]] = frozenset(s["subStageId"] for s in subs)
+            flattened.extend(subs)
+        return StageGraph(flattened, id_field="subStageId", groups=groups)
+
+    return _cached((collection.name, "village"), build)
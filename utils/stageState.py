@@ -0,0 +1,41 @@
+"""
+Stage state of a family, plot or house derived from its verification records.
+
+After a verification is deleted the owner's `currentStage` must fall back to
+the stage of its latest remaining record. The deleted stage also leaves
+`stagesCompleted` if no remaining record still covers it. One aggregation
+over the (owner, verifiedAt) index answers both:
+
+    state = remaining_stage_state(updates, {"familyId": familyId})
+    # {"currentStage": "S2" | None, "stages": {"S1", "S2"}}
+    families.update_one({"familyId": familyId}, stage_state_update(state, removed_stage))
+"""
+
+from pymongo import DESCENDING
+
+
+def remaining_stage_state(collection, scope: dict) -> dict:
+    """Latest stage and the set of stages still covered by records matching `scope`."""
+    row = next(collection.aggregate([
+        {"$match": scope},
+        {"$sort": {"verifiedAt": DESCENDING}},
+        {"$group": {
+            "_id": None,
+            "currentStage": {"$first": "$currentStage"},
+            "stages": {"$addToSet": "$currentStage"},
+        }},
+    ]), None)
+    if not row:
+        return {"currentStage": None, "stages": set()}
+    return {"currentStage": row["currentStage"], "stages": set(row["stages"])}
+
+
+def stage_state_update(state: dict, removed_stage, prefix: str = "") -> dict:
+    """
+    Update document applying `state` after `removed_stage` lost a record.
+    `prefix` addresses an embedded owner, e.g. "homeDetails.$.".
+    """
+    update = {"$set": {f"{prefix}currentStage": state["currentStage"]}}
+    if removed_stage is not None and removed_stage not in state["stages"]:
+        update["$pull"] = {f"{prefix}stagesCompleted": removed_stage}
+    return update
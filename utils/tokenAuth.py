@@ -3,13 +3,90 @@
 
 import os
 import datetime as dt
+import hashlib
+import threading
+import time
+from collections import OrderedDict
 from functools import wraps
 
 from flask import Flask, request, jsonify
 from config import db,JWT_EXPIRE_MIN,JWT_SECRET
-from werkzeug.security import gen_salt
-import bcrypt
 import jwt
+from pymongo import errors as mongo_errors
+
+# Verified token -> claims, so repeat requests skip the HMAC check and JSON parse.
+# Keyed by a hash of the token; an entry is never served past the token's exp.
+CLAIMS_CACHE_SIZE = int(os.getenv("CLAIMS_CACHE_SIZE", "4096"))
+# activated/deleted/role per user, re-read from Mongo at most every USER_STATUS_TTL seconds.
+# /employee/activate|deactivate|update|delete invalidate it in the process that served them.
+USER_STATUS_TTL = float(os.getenv("USER_STATUS_TTL", "30"))
+USER_STATUS_CACHE_SIZE = int(os.getenv("USER_STATUS_CACHE_SIZE", "4096"))
+
+_claims_lock = threading.Lock()
+_claims_cache = OrderedDict()   # sha256(token) -> (exp, claims)
+
+_status_lock = threading.Lock()
+_status_cache = OrderedDict()   # userId -> (expires_at, status or None)
+
+
+def _token_key(token: str) -> str:
+    return hashlib.sha256(token.encode("utf-8")).hexdigest()
+
+
+def verify_token(token: str) -> dict:
+    """Claims of a valid token; raises jwt.ExpiredSignatureError / jwt.InvalidTokenError."""
+    key = _token_key(token)
+    now = time.time()
+    with _claims_lock:
+        entry = _claims_cache.get(key)
+        if entry:
+            exp, claims = entry
+            if exp > now:
+                _claims_cache.move_to_end(key)
+                return dict(claims)
+            _claims_cache.pop(key, None)
+
+    claims = jwt.decode(token, JWT_SECRET, algorithms=["HS256"])
+    exp = claims.get("exp")
+    if exp:
+        with _claims_lock:
+            _claims_cache[key] = (float(exp), claims)
+            while len(_claims_cache) > CLAIMS_CACHE_SIZE:
+                _claims_cache.popitem(last=False)
+    return dict(claims)
+
+
+def user_status(user_id: str):
+    """{"activated", "deleted", "role"} for a user, or None if the user no longer exists."""
+    now = time.monotonic()
+    with _status_lock:
+        entry = _status_cache.get(user_id)
+        if entry and entry[0] > now:
+            _status_cache.move_to_end(user_id)
+            return entry[1]
+
+    doc = db.users.find_one({"userId": user_id}, {"_id": 0, "activated": 1, "deleted": 1, "role": 1})
+    status = None
+    if doc:
+        status = {
+            "activated": bool(doc.get("activated")),
+            "deleted": bool(doc.get("deleted")),
+            "role": doc.get("role"),
+        }
+    with _status_lock:
+        _status_cache[user_id] = (now + USER_STATUS_TTL, status)
+        while len(_status_cache) > USER_STATUS_CACHE_SIZE:
+            _status_cache.popitem(last=False)
+    return status
+
+
+def invalidate_user_status(user_id: str = None) -> None:
+    """Drop the cached status for one user, or for everyone when user_id is None."""
+    with _status_lock:
+        if user_id is None:
+            _status_cache.clear()
+        else:
+            _status_cache.pop(user_id, None)
 
 def auth_required(fn):
     @wraps(fn)
@@ -27,15 +104,26 @@ def auth_required(fn):
             return jsonify({"error":True,"message":"Token is Missing"}), 401
         
         try:
-            # You might need to adjust the JWT_SECRET and algorithms based on your configuration
-            claims = jwt.decode(token, JWT_SECRET, algorithms=["HS256"])
-            return fn(claims, *args, **kwargs)
-
+            claims = verify_token(token)
         except jwt.ExpiredSignatureError:
             return jsonify({"error":True,"message": "Access token expired"}), 401
         except jwt.InvalidTokenError:
             return jsonify({"error": True,"message":"Invalid token"}), 401
-        
+
+        # Live account state instead of whatever was true when the token was issued
+        try:
+            status = user_status(claims.get("userId"))
+        except mongo_errors.PyMongoError:
+            # Mongo unreachable: fall back to the claims in the token
+            status = {"activated": bool(claims.get("activated")), "deleted": False, "role": claims.get("role")}
+        if not status or status["deleted"]:
+            return jsonify({"error": True, "message": "User no longer exists"}), 401
+        if status["role"] != claims.get("role"):
+            return jsonify({"error": True, "message": "Role changed. Please login again"}), 401
+        claims["activated"] = status["activated"]
+
+        return fn(claims, *args, **kwargs)
+
 
     return wrapper
 
@@ -0,0 +1,334 @@
+"""
+Direct-to-S3 uploads with presigned URLs.
+
+The client asks for an upload slot per file, sends the bytes straight to S3,
+and then reports completion; the Flask worker only signs and checks.
+
+1. `presign_upload()` reserves `uploads/<uuid>.<ext>` and records it in the
+   `uploads` collection as pending. Files up to UPLOAD_PART_SIZE_MB get a
+   presigned POST whose policy pins the Content-Type and the exact declared
+   size. Larger files get a multipart upload with one presigned URL per part.
+2. `complete_upload()` finishes the multipart upload if there is one, then
+   checks the object with `head_object` (size and content type must match
+   what was declared). A valid object is marked complete. An invalid one is
+   deleted.
+
+A pending record that is never completed expires through the TTL index on
+`expiresAt`. Set S3_ENDPOINT_URL to work against a local S3 stand-in (MinIO).
+
+Files posted to /upload go through `upload_many()` instead. It runs the
+uploads concurrently on a per-process pool of UPLOAD_WORKERS threads that
+share one boto3 TransferConfig. Images are normalized on the way
+(utils/images.py). `record_uploads()` then registers them as complete,
+with the renditions that were written, which is how utils/signedUrls.py
+knows a rendition exists. `delete_keys()` rolls back a failed batch
+with `delete_objects` calls of up to 1000 keys each.
+"""
+
+import datetime as dt
+import io
+import logging
+import math
+import os
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+from pymongo.errors import PyMongoError
+
+from config import (BUCKET_NAME, UPLOAD_MAX_FILE_SIZE_MB, UPLOAD_PART_SIZE_MB,
+                    UPLOAD_PRESIGN_EXPIRES, db, s3_client)
+from utils.images import IMAGE_PIPELINE, RENDITIONS, is_image, renditions
+
+logger = logging.getLogger(__name__)
+
+# extension -> accepted Content-Types (the first one is used when none is given)
+CONTENT_TYPES = {
+    "jpg": ("image/jpeg",),
+    "jpeg": ("image/jpeg",),
+    "png": ("image/png",),
+    "pdf": ("application/pdf",),
+    "csv": ("text/csv", "application/vnd.ms-excel"),
+}
+
+UPLOAD_PREFIX = "uploads/"
+MAX_UPLOAD_BYTES = UPLOAD_MAX_FILE_SIZE_MB * 1024 * 1024
+PART_SIZE = max(UPLOAD_PART_SIZE_MB, 5) * 1024 * 1024   # S3 minimum part size is 5 MB
+MAX_PARTS = 10000
+DELETE_BATCH = 1000   # delete_objects limit
+
+UPLOAD_WORKERS = int(os.getenv("UPLOAD_WORKERS", "4"))
+UPLOAD_PART_CONCURRENCY = int(os.getenv("UPLOAD_PART_CONCURRENCY", "2"))
+
+uploads = db.uploads
+
+_lock = threading.Lock()
+_pool = None
+_pool_pid = None
+_transfer_config = None
+
+
+class UploadError(Exception):
+    """A file that cannot be signed or completed; `status` is the HTTP code."""
+
+    def __init__(self, message: str, status: int = 400):
+        super().__init__(message)
+        self.message = message
+        self.status = status
+
+
+def extension(filename: str) -> str:
+    return filename.rsplit(".", 1)[1].lower() if filename and "." in filename else ""
+
+
+def s3_uri(key: str) -> str:
+    return f"s3://{BUCKET_NAME}/{key}"
+
+
+def new_upload_key(ext: str) -> str:
+    return f"{UPLOAD_PREFIX}{uuid.uuid4()}.{ext}"
+
+
+def check_file(filename: str, content_type: str, size) -> tuple:
+    """Validate one declared file; returns (ext, content_type). Raises UploadError."""
+    ext = extension(filename)
+    if ext not in CONTENT_TYPES:
+        raise UploadError(f"Invalid file type for {filename}. Allowed: {', '.join(CONTENT_TYPES)}")
+    content_type = content_type or CONTENT_TYPES[ext][0]
+    if content_type not in CONTENT_TYPES[ext]:
+        raise UploadError(f"Content type {content_type} does not match {filename}")
+    if not isinstance(size, int) or isinstance(size, bool) or size < 1:
+        raise UploadError(f"size of {filename} must be a positive number of bytes")
+    if size > MAX_UPLOAD_BYTES:
+        raise UploadError(f"File {filename} exceeds maximum size of {UPLOAD_MAX_FILE_SIZE_MB} MB")
+    return ext, content_type
+
+
+def presign_upload(name: str, filename: str, content_type: str, size) -> dict:
+    """Reserve a key for one file and return how the client should upload it."""
+    ext, content_type = check_file(filename, content_type, size)
+    key = new_upload_key(ext)
+    now = dt.datetime.utcnow()
+    record = {
+        "_id": key,
+        "name": name,
+        "filename": filename,
+        "contentType": content_type,
+        "size": size,
+        "status": "pending",
+        "createdAt": now,
+        "expiresAt": now + dt.timedelta(seconds=UPLOAD_PRESIGN_EXPIRES * 2),
+    }
+
+    if size <= PART_SIZE:
+        post = s3_client.generate_presigned_post(
+            BUCKET_NAME,
+            key,
+            Fields={"Content-Type": content_type},
+            Conditions=[{"Content-Type": content_type}, ["content-length-range", size, size]],
+            ExpiresIn=UPLOAD_PRESIGN_EXPIRES,
+        )
+        uploads.insert_one(record)
+        return {"key": key, "s3_uri": s3_uri(key), "method": "POST", "url": post["url"], "fields": post["fields"]}
+
+    part_count = math.ceil(size / PART_SIZE)
+    if part_count > MAX_PARTS:
+        raise UploadError(f"File {filename} needs more than {MAX_PARTS} parts")
+    upload_id = s3_client.create_multipart_upload(Bucket=BUCKET_NAME, Key=key, ContentType=content_type)["UploadId"]
+    record["uploadId"] = upload_id
+    uploads.insert_one(record)
+    parts = [
+        {
+            "partNumber": number,
+            "url": s3_client.generate_presigned_url(
+                "upload_part",
+                Params={"Bucket": BUCKET_NAME, "Key": key, "UploadId": upload_id, "PartNumber": number},
+                ExpiresIn=UPLOAD_PRESIGN_EXPIRES,
+            ),
+        }
+        for number in range(1, part_count + 1)
+    ]
+    return {
+        "key": key,
+        "s3_uri": s3_uri(key),
+        "method": "MULTIPART",
+        "uploadId": upload_id,
+        "partSize": PART_SIZE,
+        "parts": parts,
+    }
+
+
+def _discard(key: str) -> None:
+    """Best effort: remove a rejected object and its record."""
+    from botocore.exceptions import ClientError  # botocore loads on first S3 request
+    try:
+        s3_client.delete_object(Bucket=BUCKET_NAME, Key=key)
+    except ClientError:
+        logger.warning("Could not discard rejected upload %s", key, exc_info=True)
+    uploads.delete_one({"_id": key})
+
+
+def complete_upload(key: str, parts=None) -> dict:
+    """
+    Validate an uploaded object and register it; returns its upload record.
+    `parts` ([{"partNumber", "etag"}]) is required for multipart uploads.
+    Raises UploadError.
+    """
+    from botocore.exceptions import ClientError  # botocore loads on first S3 request
+
+    record = uploads.find_one({"_id": key})
+    if not record:
+        raise UploadError(f"Unknown or expired upload {key}", 404)
+    if record["status"] == "complete":
+        return record
+
+    upload_id = record.get("uploadId")
+    if upload_id:
+        if not parts:
+            raise UploadError(f"parts are required to complete {key}")
+        try:
+            s3_client.complete_multipart_upload(
+                Bucket=BUCKET_NAME,
+                Key=key,
+                UploadId=upload_id,
+                MultipartUpload={"Parts": sorted(
+                    ({"PartNumber": int(p["partNumber"]), "ETag": p["etag"]} for p in parts),
+                    key=lambda p: p["PartNumber"],
+                )},
+            )
+        except (KeyError, TypeError, ValueError):
+            raise UploadError(f"parts of {key} must be [{{partNumber, etag}}]")
+        except ClientError as e:
+            raise UploadError(f"Could not complete {key}: {e.response['Error'].get('Message', 'upload incomplete')}")
+
+    try:
+        head = s3_client.head_object(Bucket=BUCKET_NAME, Key=key)
+    except ClientError as e:
+        if e.response["Error"]["Code"] in ("404", "NoSuchKey"):
+            raise UploadError(f"File {record['filename']} was not uploaded", 400)
+        raise
+
+    if head["ContentLength"] != record["size"] or head.get("ContentType") != record["contentType"]:
+        _discard(key)
+        raise UploadError(f"File {record['filename']} does not match the declared size or content type")
+
+    uploads.update_one(
+        {"_id": key},
+        {"$set": {"status": "complete", "completedAt": dt.datetime.utcnow(), "etag": head.get("ETag")},
+         "$unset": {"expiresAt": ""}},
+    )
+    record["status"] = "complete"
+    return record
+
+
+# --- server-side uploads (/upload) ----------------------------------------------
+
+def _get_pool() -> ThreadPoolExecutor:
+    global _pool, _pool_pid
+    with _lock:
+        if _pool is None or _pool_pid != os.getpid():
+            _pool = ThreadPoolExecutor(max_workers=UPLOAD_WORKERS, thread_name_prefix="s3-upload")
+            _pool_pid = os.getpid()
+        return _pool
+
+
+def transfer_config():
+    """One TransferConfig per process; files are parallel already, so few threads per file."""
+    global _transfer_config
+    if _transfer_config is None:
+        from boto3.s3.transfer import TransferConfig  # boto3 loads on first S3 request
+
+        _transfer_config = TransferConfig(
+            multipart_threshold=PART_SIZE,
+            multipart_chunksize=PART_SIZE,
+            max_concurrency=UPLOAD_PART_CONCURRENCY,
+        )
+    return _transfer_config
+
+
+def _upload_one(name: str, fileobj, key: str, content_type: str) -> dict:
+    """Upload one file (and its image renditions); "keys" lists what landed, for rollback."""
+    started = time.monotonic()
+    uploaded, error = [], None
+    rendered = []
+    try:
+        if IMAGE_PIPELINE and is_image(key):
+            files = [(k, io.BytesIO(body), ct, meta) for k, body, ct, meta in renditions(fileobj, key, content_type)]
+            rendered = list(RENDITIONS)
+        else:
+            files = [(key, fileobj, content_type, {})]
+        for file_key, body, file_type, metadata in files:
+            s3_client.upload_fileobj(
+                body,
+                BUCKET_NAME,
+                file_key,
+                ExtraArgs={"ContentType": file_type, "Metadata": metadata},
+                Config=transfer_config(),
+            )
+            uploaded.append(file_key)
+    except Exception as e:   # ImageError, ClientError, S3UploadFailedError, connection errors
+        logger.warning("Upload of %s to %s failed: %s", name, key, e)
+        error = e
+    return {
+        "name": name,
+        "key": key,
+        "keys": uploaded,
+        "renditions": rendered,
+        "contentType": content_type,
+        "ms": round((time.monotonic() - started) * 1000, 1),
+        "error": error,
+    }
+
+
+def upload_many(files: list) -> list:
+    """
+    Upload [(name, fileobj, key, content_type)] concurrently. Returns one
+    {"name", "key", "keys", "renditions", "contentType", "ms", "error"} per
+    file, in order; "error" is None on success.
+    """
+    pool = _get_pool()
+    futures = [pool.submit(_upload_one, *file) for file in files]
+    return [future.result() for future in futures]
+
+
+def record_uploads(results: list) -> None:
+    """
+    Register files uploaded by `upload_many()` as complete, with their
+    renditions. Best effort: without a record, renditions are just not used.
+    """
+    now = dt.datetime.utcnow()
+    try:
+        uploads.insert_many([
+            {
+                "_id": r["key"],
+                "name": r["name"],
+                "contentType": r["contentType"],
+                "status": "complete",
+                "renditions": r["renditions"],
+                "createdAt": now,
+                "completedAt": now,
+            }
+            for r in results
+        ], ordered=False)
+    except PyMongoError:
+        logger.warning("Could not record %d uploads", len(results), exc_info=True)
+
+
+def delete_keys(keys: list) -> list:
+    """Delete objects in batches of DELETE_BATCH; returns the keys that could not be deleted."""
+    from botocore.exceptions import ClientError  # botocore loads on first S3 request
+
+    failed = []
+    for i in range(0, len(keys), DELETE_BATCH):
+        batch = keys[i:i + DELETE_BATCH]
+        try:
+            response = s3_client.delete_objects(
+                Bucket=BUCKET_NAME,
+                Delete={"Objects": [{"Key": key} for key in batch], "Quiet": True},
+            )
+            failed.extend(error["Key"] for error in response.get("Errors", []))
+        except ClientError:
+            logger.warning("delete_objects failed for %d keys", len(batch), exc_info=True)
+            failed.extend(batch)
+    return failed
@@ -0,0 +1,52 @@
+"""
+Batch validation for bulk write endpoints.
+
+Calling `Model(**item)` once per item of a bulk payload goes through the
+Python call path of every item. `validate_batch()` validates the whole list
+with one call into pydantic-core through a `TypeAdapter(List[Model])`,
+built once per model and cached per process.
+
+A list that fails validation still reports per item:
+
+    valid, errors = validate_batch(Family, payload["families"])
+    # valid:  {index: Family}           items that validated
+    # errors: {index: [error dicts]}    the same dicts `ValidationError.errors()`
+    #                                   gives for that item on its own
+
+The valid items are validated again in one call (they are independent of
+the invalid ones), so a batch never costs more than two calls.
+`scripts/bench_models.py` measures the difference.
+"""
+
+from collections import defaultdict
+from functools import lru_cache
+from typing import List
+
+from pydantic import TypeAdapter, ValidationError
+
+
+@lru_cache(maxsize=None)
+def list_adapter(model) -> TypeAdapter:
+    """The cached `TypeAdapter(List[model])`."""
+    return TypeAdapter(List[model])
+
+
+def _item_errors(error: ValidationError) -> dict:
+    """Group the errors of a list validation by item index, without the index in `loc`."""
+    grouped = defaultdict(list)
+    for err in error.errors():
+        grouped[err["loc"][0]].append({**err, "loc": err["loc"][1:]})
+    return dict(grouped)
+
+
+def validate_batch(model, items: list) -> tuple:
+    """Validate `items` against `model`; returns ({index: instance}, {index: [errors]})."""
+    adapter = list_adapter(model)
+    try:
+        return dict(enumerate(adapter.validate_python(items))), {}
+    except ValidationError as e:
+        errors = _item_errors(e)
+
+    indexes = [i for i in range(len(items)) if i not in errors]
+    valid = dict(zip(indexes, adapter.validate_python([items[i] for i in indexes])))
+    return valid, errors
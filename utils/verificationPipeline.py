@@ -1,17 +1,16 @@
-import requests
-from google import genai
 from datetime import timedelta
 import math
 
 from utils.helpers import nowIST, parse_ist
-from config import GEMINI_API, GEMINI_MODEL
+from utils.images import model_input_bytes
+from config import GEMINI_MODEL, genai_client
 
 
 # ---------------- GEMINI SETUP ----------------
 
 
-client = genai.Client(api_key=GEMINI_API
-)
+# built on first use, once per process (utils/resources.py)
+client = genai_client
 
 
 # ---------------- HAVERSINE DISTANCE ----------------
@@ -85,7 +84,8 @@ def classify_stage(image_url, stage_map):
 
     try:
 
-        image_bytes = requests.get(image_url, timeout=10).content
+        # the small "model" rendition of uploaded photos (utils/images.py)
+        image_bytes = model_input_bytes(image_url)
 
         stage_text = "\n".join(
             [
@@ -0,0 +1,167 @@
+"""
+Materialized per-village dashboard statistics.
+
+The dashboard used to fan out into one aggregation per widget (family counts,
+option stages, building stages, home counts, ...). `village_stats` holds one
+document per village with all of them:
+
+    {
+        "_id": "<villageId>",
+        "families": {"total", "byOption": {opt: n}, "byOptionStage": {opt: {stageId: n}}},
+        "plots": {"total", "byType": {typeId: {stageId: n}}},
+        "houses": {"total", "homeCountStats": {"1", "2", "3"}, "byType": {typeId: {stageId: n}}},
+        "facilityVerifications": {"total", "byStatus": {status: n}},
+        "materialUpdates": {"total", "byStatus": {status: n}},
+        "lastActivity": {"updateTime", "type", "action", "userId"} | None,
+        "builtAt": datetime, "stale": bool,
+    }
+
+Write routes call `mark_village_stats_stale(villageId)` after changing
+families, plots, houses or verification records. A stale document (or one
+older than VILLAGE_STATS_MAX_AGE seconds) is rebuilt on the next read, and
+`python scripts/build_village_stats.py` rebuilds every village ahead of time.
+"""
+
+import datetime as dt
+import logging
+import os
+
+from pymongo import DESCENDING, errors as mongo_errors
+
+from config import db
+from utils.helpers import nowIST
+
+logger = logging.getLogger(__name__)
+
+VILLAGE_STATS_MAX_AGE = float(os.getenv("VILLAGE_STATS_MAX_AGE", "600"))
+
+village_stats = db.village_stats
+families = db.testing
+plots = db.plots
+houses = db.house
+facility_updates = db.facilityUpdates
+material_updates = db.materialUpdates
+logs = db.logs
+
+UNASSIGNED = "unassigned"   # key for documents without an option / stage / status
+
+
+def _key(value) -> str:
+    # Mongo field names: no None, no dots, no leading "$"
+    if value is None or value == "":
+        return UNASSIGNED
+    return str(value).replace(".", "_").lstrip("$") or UNASSIGNED
+
+
+def _nested(rows, outer: str, inner: str) -> dict:
+    """[{_id: {outer, inner}, count}] -> {outer: {inner: count}}"""
+    result = {}
+    for row in rows:
+        bucket = result.setdefault(_key(row["_id"].get(outer)), {})
+        bucket[_key(row["_id"].get(inner))] = row["count"]
+    return result
+
+
+def _by_status(collection, village_id: str) -> dict:
+    rows = list(collection.aggregate([
+        {"$match": {"villageId": village_id}},
+        {"$group": {"_id": "$status", "count": {"$sum": 1}}},
+    ]))
+    return {
+        "total": sum(r["count"] for r in rows),
+        "byStatus": {_key(r["_id"]): r["count"] for r in rows},
+    }
+
+
+def compute_village_stats(village_id: str) -> dict:
+    """Runs one aggregation per source collection for `village_id`."""
+    family_rows = list(families.aggregate([
+        {"$match": {"villageId": village_id}},
+        {"$group": {
+            "_id": {"option": "$relocationOption", "stage": "$currentStage"},
+            "count": {"$sum": 1},
+        }},
+    ]))
+    by_option = {}
+    for row in family_rows:
+        option = _key(row["_id"].get("option"))
+        by_option[option] = by_option.get(option, 0) + row["count"]
+
+    plot_rows = list(plots.aggregate([
+        {"$match": {"villageId": village_id, "deleted": False}},
+        {"$group": {"_id": {"type": "$typeId", "stage": "$currentStage"}, "count": {"$sum": 1}}},
+    ]))
+
+    house_facets = next(houses.aggregate([
+        {"$match": {"villageId": village_id, "deleted": False}},
+        {"$facet": {
+            "homeCount": [{"$group": {"_id": "$numberOfHome", "count": {"$sum": 1}}}],
+            "stages": [
+                {"$unwind": "$homeDetails"},
+                {"$group": {
+                    "_id": {"type": "$typeId", "stage": "$homeDetails.currentStage"},
+                    "count": {"$sum": 1},
+                }},
+            ],
+        }},
+    ]), {"homeCount": [], "stages": []})
+    home_count = {"1": 0, "2": 0, "3": 0}
+    for row in house_facets["homeCount"]:
+        if row["_id"] in (1, 2, 3):
+            home_count[str(row["_id"])] = row["count"]
+
+    last_log = logs.find_one(
+        {"villageId": village_id},
+        {"_id": 0, "updateTime": 1, "type": 1, "action": 1, "userId": 1},
+        sort=[("updateTime", DESCENDING)],
+    )
+
+    return {
+        "villageId": village_id,
+        "families": {
+            "total": sum(by_option.values()),
+            "byOption": by_option,
+            "byOptionStage": _nested(family_rows, "option", "stage"),
+        },
+        "plots": {
+            "total": sum(r["count"] for r in plot_rows),
+            "byType": _nested(plot_rows, "type", "stage"),
+        },
+        "houses": {
+            "total": sum(r["count"] for r in house_facets["homeCount"]),
+            "homeCountStats": home_count,
+            "byType": _nested(house_facets["stages"], "type", "stage"),
+        },
+        "facilityVerifications": _by_status(facility_updates, village_id),
+        "materialUpdates": _by_status(material_updates, village_id),
+        "lastActivity": last_log,
+    }
+
+
+def build_village_stats(village_id: str) -> dict:
+    """Recompute and store the stats document of one village; returns it."""
+    # cleared before aggregating, so a write that lands mid-build marks it stale again
+    village_stats.update_one({"_id": village_id}, {"$set": {"stale": False}}, upsert=True)
+    stats = compute_village_stats(village_id)
+    stats["builtAt"] = dt.datetime.utcnow()
+    stats["builtAtIST"] = nowIST()
+    village_stats.update_one({"_id": village_id}, {"$set": stats})
+    return {**stats, "stale": False}
+
+
+def get_village_stats(village_id: str, refresh: bool = False) -> dict:
+    doc = None if refresh else village_stats.find_one({"_id": village_id})
+    max_age = dt.timedelta(seconds=VILLAGE_STATS_MAX_AGE)
+    if not doc or doc.get("stale") or not doc.get("builtAt") or dt.datetime.utcnow() - doc["builtAt"] > max_age:
+        doc = build_village_stats(village_id)
+    doc.pop("_id", None)
+    return doc
+
+
+def mark_village_stats_stale(*village_ids) -> None:
+    """Flag villages for rebuild on next read; with no ids, every village. Never raises."""
+    query = {"_id": {"$in": [v for v in village_ids if v]}} if village_ids else {}
+    try:
+        village_stats.update_many(query, {"$set": {"stale": True}})
+    except mongo_errors.PyMongoError:
+        logger.warning("Could not mark village stats stale for %s", village_ids or "all villages", exc_info=True)
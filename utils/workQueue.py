@@ -0,0 +1,119 @@
+"""
+Approver work queue: everything waiting for one role, across every kind of
+verification record.
+
+Each kind in APPROVAL_KINDS is queried for
+`villageId in <the approver's villages>` and `status == STATUS_TRANSITIONS[role]`,
+newest first. That query is served by the (villageId, status, insertedAt)
+index of each collection. The per-kind pages are then merged into one feed.
+
+    items, meta = pending_items("ro", ["V001", "V002"], request.args)
+    # items: [{"kind": "material", "materialId", "updateId", "villageId", "insertedAt", ...}]
+    # meta  = {"page", "limit", "next", "prev": None}
+
+Paging is keyset on (insertedAt, _id). The `cursor` token is shared across
+kinds, so page N costs the same as page 1. `?page=N` falls back to skip/limit.
+"""
+
+import heapq
+
+from pymongo import DESCENDING
+
+from config import db
+from utils.approvals import APPROVAL_KINDS, status_filter
+from utils.counts import count_for
+from utils.helpers import STATUS_TRANSITIONS
+from utils.pagination import decode_cursor, encode_cursor, parse_limit
+from utils.search import HIDE_SEARCH_KEYS
+
+QUEUE_SORT = [("insertedAt", DESCENDING), ("_id", DESCENDING)]
+QUEUE_PROJECTION = {**HIDE_SEARCH_KEYS, "statusHistory": 0}
+
+users = db.users
+
+
+def approver_villages(user_id: str) -> list:
+    user = users.find_one({"userId": user_id}, {"_id": 0, "villageID": 1})
+    return (user or {}).get("villageID") or []
+
+
+def parse_kinds(value) -> list:
+    """`?kind=family,plot` -> ["family", "plot"]; every kind when empty. Raises ValueError."""
+    kinds = [k.strip() for k in (value or "").split(",") if k.strip()] or list(APPROVAL_KINDS)
+    unknown = [k for k in kinds if k not in APPROVAL_KINDS]
+    if unknown:
+        raise ValueError(f"kind must be one of {', '.join(APPROVAL_KINDS)}")
+    return kinds
+
+
+def queue_query(role: str, village_ids: list) -> dict:
+    return {"villageId": {"$in": list(village_ids)}, **status_filter(STATUS_TRANSITIONS[role])}
+
+
+def _after(values: list) -> dict:
+    """Documents strictly after (insertedAt, _id) in QUEUE_SORT order."""
+    inserted_at, last_id = values
+    if inserted_at is None:
+        # missing insertedAt sorts last; only older _ids remain
+        return {"insertedAt": None, "_id": {"$lt": last_id}}
+    return {"$or": [
+        {"insertedAt": {"$lt": inserted_at}},
+        {"insertedAt": inserted_at, "_id": {"$lt": last_id}},
+        {"insertedAt": None},
+    ]}
+
+
+def _sort_key(doc: dict) -> tuple:
+    # QUEUE_SORT as a merge key (merged with reverse=True): missing insertedAt last
+    inserted_at = doc.get("insertedAt")
+    return (inserted_at is not None, inserted_at or "", doc["_id"])
+
+
+def pending_items(role: str, village_ids: list, args, kinds=None, default_limit: int = 15):
+    """
+    One page of records waiting for `role` in `village_ids`, newest first.
+    Reads `cursor`, `page` and `limit` from `args`. Raises ValueError on bad values.
+    """
+    kinds = kinds or list(APPROVAL_KINDS)
+    limit = parse_limit(args, default_limit)
+    query = queue_query(role, village_ids)
+    token = args.get("cursor")
+    page, skip = None, 0
+
+    if token:
+        values, direction = decode_cursor(token)
+        if direction != "next" or len(values) != 2:
+            raise ValueError("Invalid cursor")
+        query = {"$and": [query, _after(values)]}
+    else:
+        page = int(args.get("page", 1))
+        if page < 1:
+            raise ValueError("Invalid pagination values")
+        skip = (page - 1) * limit
+
+    # every kind contributes at most skip + limit + 1 rows to the merged page
+    fetch = skip + limit + 1
+    streams = []
+    for kind in kinds:
+        spec = APPROVAL_KINDS[kind]
+        docs = list(spec["collection"].find(query, QUEUE_PROJECTION).sort(QUEUE_SORT).limit(fetch))
+        for doc in docs:
+            doc["kind"] = kind
+        streams.append(docs)
+
+    merged = list(heapq.merge(*streams, key=_sort_key, reverse=True))[skip:fetch]
+    has_next = len(merged) > limit
+    items = merged[:limit]
+
+    meta = {"page": page, "limit": limit, "next": None, "prev": None}
+    if items and has_next:
+        meta["next"] = encode_cursor([items[-1].get("insertedAt"), items[-1]["_id"]], "next")
+    for doc in items:
+        doc.pop("_id", None)
+    return items, meta
+
+
+def pending_counts(role: str, village_ids: list, args=None, kinds=None) -> dict:
+    """{kind: {"count", "countIsLowerBound"}} for the same queue (cached by utils.counts)."""
+    query = queue_query(role, village_ids)
+    return {kind: count_for(APPROVAL_KINDS[kind]["collection"], query, args) for kind in kinds or APPROVAL_KINDS}